@@ -0,0 +1,151 @@
+"""
+Benchmark of the native clusterer against the cd-hit binary.
+
+Each input is clustered with both backends at the pipeline's settings
+(c=0.4, n=2) and the wall time, number of clusters, share of common
+representatives and adjusted Rand index of the two partitions are reported.
+By default the merged PTM files and filtered negative sets of the pipeline are
+used; without them, a synthetic set of protein families is generated. If
+cd-hit is not on the PATH, only the native backend is timed.
+
+Usage:
+    python benchmarks/bench_cluster.py [--fasta FILE ...] [--threads T]
+"""
+
+import argparse
+import glob
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from sklearn.metrics import adjusted_rand_score
+
+sys.path.append(os.path.abspath("data_preprocess"))
+
+import cluster
+import native_cluster
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+DATASETS = ["data/ptms/*/merged.fasta", "data/no_ptm/filtered_no_*.fasta"]
+
+
+def write_families(filepath, families, members, divergence, seed=42):
+    """
+    Write a multi-FASTA file of synthetic protein families.
+
+    Every member is a copy of its family's ancestor with a fraction of
+    substituted residues, a few short indels and a random N-terminal trim.
+
+    Args:
+        filepath (str): Output path.
+        families (int): Number of families.
+        members (int): Sequences per family.
+        divergence (float): Substitution rate per residue.
+        seed (int): Random seed.
+    """
+    rng = random.Random(seed)
+    with open(filepath, "w") as f:
+        for fam in range(families):
+            length = min(int(rng.lognormvariate(6.0, 0.5)), 3000) + 20
+            ancestor = rng.choices(AMINO_ACIDS, k=length)
+            for m in range(members):
+                seq = [
+                    rng.choice(AMINO_ACIDS) if rng.random() < divergence else a
+                    for a in ancestor
+                ]
+                for _ in range(3):
+                    pos = rng.randrange(len(seq))
+                    if rng.random() < 0.5:
+                        del seq[pos : pos + 3]
+                    else:
+                        seq[pos:pos] = rng.choices(AMINO_ACIDS, k=3)
+                seq = "".join(seq[rng.randrange(10) :])
+                f.write(f">F{fam:05d}_{m}\n{seq}\n")
+
+
+def timed_run(input_path, output_path, backend, threads):
+    """
+    Cluster a file and read back the partition.
+
+    Returns:
+        tuple: (wall time in seconds, list of (representative, members))
+    """
+    start = time.perf_counter()
+    cluster.run(input_path, output_path, T=threads, backend=backend)
+    seconds = time.perf_counter() - start
+    return seconds, native_cluster.parse_clstr(f"{output_path}.clstr")
+
+
+def agreement(ref, other):
+    """
+    Compare two partitions read from '.clstr' files.
+
+    Returns:
+        tuple: (share of common representatives, adjusted Rand index over the
+        sequences present in both)
+    """
+    labels = [{}, {}]
+    for part, clusters in zip(labels, (ref, other)):
+        for number, (_, members) in enumerate(clusters):
+            for name in members:
+                part[name] = number
+    common = sorted(labels[0].keys() & labels[1].keys())
+    ari = adjusted_rand_score(
+        [labels[0][n] for n in common], [labels[1][n] for n in common]
+    )
+    reps = [{rep for rep, _ in clusters} for clusters in (ref, other)]
+    return len(reps[0] & reps[1]) / max(1, len(reps[0])), ari
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fasta", nargs="+", help="multi-FASTA files")
+    parser.add_argument("--threads", type=int, default=cluster.cpu_count())
+    parser.add_argument("--families", type=int, default=500)
+    parser.add_argument("--members", type=int, default=4)
+    parser.add_argument("--divergence", type=float, default=0.3)
+    args = parser.parse_args()
+
+    have_cd_hit = shutil.which("cd-hit") is not None
+    if not have_cd_hit:
+        print("cd-hit not found on PATH, timing the native backend only")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = args.fasta or sorted(
+            path for pattern in DATASETS for path in glob.glob(pattern)
+        )
+        if not inputs:
+            synthetic = os.path.join(tmp, "families.fasta")
+            write_families(
+                synthetic, args.families, args.members, args.divergence
+            )
+            inputs = [synthetic]
+
+        for input_path in inputs:
+            output = os.path.join(tmp, "native.fasta")
+            native_s, native = timed_run(
+                input_path, output, "native", args.threads
+            )
+            line = (
+                f"{input_path}: native {native_s:8.2f} s "
+                f"{len(native):6d} clusters"
+            )
+            if have_cd_hit:
+                output = os.path.join(tmp, "cd-hit.fasta")
+                ref_s, ref = timed_run(
+                    input_path, output, "cd-hit", args.threads
+                )
+                reps, ari = agreement(ref, native)
+                line += (
+                    f" | cd-hit {ref_s:8.2f} s {len(ref):6d} clusters"
+                    f" | common reps {reps:.1%} ARI {ari:.3f}"
+                    f" | x{ref_s / native_s:.2f}"
+                )
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Throughput benchmark of the batch level-2 encoder against iCAN.
+
+Synthetic sequences with UniProt-like lengths are encoded with
+batch_encoder.encode and, one sequence at a time, with a per-sequence table
+lookup. If iCAN is importable from Source/, a subset is also encoded through
+the full iCAN path, its output is compared with the batch encoder and its
+throughput is reported; otherwise the residue table is random and only the
+two in-repo paths are timed.
+
+Usage:
+    python benchmarks/bench_encoder.py [--sequences N] [--ican-sequences M]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath("rfc"))
+
+import batch_encoder
+
+
+def synthetic(count, seed=42):
+    """
+    Random sequences with log-normal lengths.
+
+    Args:
+        count (int): Number of sequences.
+        seed (int): Random seed.
+
+    Returns:
+        list of str: Sequences.
+    """
+    rng = random.Random(seed)
+    return [
+        "".join(
+            rng.choices(
+                batch_encoder.RESIDUES,
+                k=min(int(rng.lognormvariate(5.5, 0.6)), 2000) + 2,
+            )
+        )
+        for _ in range(count)
+    ]
+
+
+def per_sequence(seqs, table):
+    """Encode sequences one at a time, as the per-sequence path does."""
+    return [batch_encoder.encode_batch([seq], table)[0] for seq in seqs]
+
+
+def report(name, seconds, seqs):
+    residues = sum(len(seq) for seq in seqs)
+    print(
+        f"{name:22} {seconds:8.3f} s  {len(seqs) / seconds:12.0f} seqs/s  "
+        f"{residues / seconds:14.0f} residues/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sequences", type=int, default=20000)
+    parser.add_argument("--ican-sequences", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    seqs = synthetic(args.sequences)
+    try:
+        import ican_memo
+
+        table = ican_memo.load_table()
+    except ImportError:
+        ican_memo, table = None, None
+    if table is None:
+        print("iCAN or a valid residue table unavailable, using random table")
+        table = np.random.default_rng(0).random(
+            (4, len(batch_encoder.RESIDUES), batch_encoder.N_ATOMS),
+            dtype=np.float32,
+        )
+
+    start = time.perf_counter()
+    rows = batch_encoder.encode(seqs, table, batch_size=args.batch_size)
+    report("batch_encoder.encode", time.perf_counter() - start, seqs)
+
+    start = time.perf_counter()
+    single = per_sequence(seqs, table)
+    report("per-sequence lookup", time.perf_counter() - start, seqs)
+    assert all(np.array_equal(a, b) for a, b in zip(rows, single))
+
+    if ican_memo is not None:
+        subset = seqs[: args.ican_sequences]
+        start = time.perf_counter()
+        matrix, _ = ican_memo.encode_with_ican(subset)
+        report("iCAN", time.perf_counter() - start, subset)
+        batch = batch_encoder.encode_batch(subset, table)
+        print(f"iCAN columns reproduced: {np.allclose(matrix, batch)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Micro-benchmark of fasta_reader against Bio.SeqIO on a UniProt-sized file.
+
+Without an input file, a synthetic multi-FASTA with the size of the human
+reviewed proteome (~20k entries, UniProt-style headers, 60-column lines) is
+generated in a temporary directory.
+
+Usage:
+    python benchmarks/bench_fasta_reader.py [--fasta FILE] [--entries N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from Bio import SeqIO
+from Bio.SeqIO.FastaIO import SimpleFastaParser
+
+sys.path.append(os.path.abspath("data_preprocess"))
+
+import fasta_reader
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def write_synthetic(filepath, entries, seed=42):
+    """
+    Write a synthetic UniProt-like multi-FASTA file.
+
+    Args:
+        filepath (str): Output path.
+        entries (int): Number of entries.
+        seed (int): Random seed.
+    """
+    rng = random.Random(seed)
+    with open(filepath, "w") as f:
+        for i in range(entries):
+            length = min(int(rng.lognormvariate(6.0, 0.7)), 35000) + 2
+            seq = "".join(rng.choices(AMINO_ACIDS, k=length))
+            f.write(
+                f">sp|P{i:05d}|PROT{i}_HUMAN Protein {i} OS=Homo sapiens "
+                f"OX=9606 GN=GENE{i} PE=1 SV=1\n"
+            )
+            for j in range(0, length, 60):
+                f.write(seq[j : j + 60] + "\n")
+
+
+def seqio(filepath):
+    return [
+        (record.description, str(record.seq))
+        for record in SeqIO.parse(filepath, "fasta")
+    ]
+
+
+def simple_parser(filepath):
+    with open(filepath) as handle:
+        return list(SimpleFastaParser(handle))
+
+
+def raw_reader(filepath):
+    return list(fasta_reader.read_fasta(filepath))
+
+
+def bench(fn, filepath, repeats):
+    """
+    Time a reader function.
+
+    Args:
+        fn (callable): Reader taking a file path.
+        filepath (str): Multi-FASTA file.
+        repeats (int): Number of timed runs.
+
+    Returns:
+        tuple: (best wall time in seconds, result of the last run)
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(filepath)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fasta", help="existing multi-FASTA file")
+    parser.add_argument("--entries", type=int, default=20400)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = args.fasta
+        if filepath is None:
+            filepath = os.path.join(tmp, "synthetic.fasta")
+            write_synthetic(filepath, args.entries)
+        size_mb = os.path.getsize(filepath) / 2**20
+        print(f"{filepath}: {size_mb:.1f} MB")
+
+        reference = None
+        for name, fn in [
+            ("Bio.SeqIO.parse", seqio),
+            ("SimpleFastaParser", simple_parser),
+            ("fasta_reader.read_fasta", raw_reader),
+        ]:
+            seconds, result = bench(fn, filepath, args.repeats)
+            if reference is None:
+                reference = (seconds, result)
+            assert result == reference[1], f"{name} output differs"
+            print(
+                f"{name:25} {seconds:8.3f} s  "
+                f"{len(result) / seconds:12.0f} entries/s  "
+                f"x{reference[0] / seconds:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
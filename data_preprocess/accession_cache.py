@@ -0,0 +1,333 @@
+"""
+Persistent local store of UniProt entries keyed by accession.
+
+Downloads, disease lookup and negative set generation all need overlapping
+UniProt entries. They share this SQLite store, which holds the FASTA header,
+entry name, MIM annotations, sequence and fetch time of every entry. An entry
+is fetched from UniProt only when it is missing or older than the TTL, so each
+entry is downloaded at most once across stages and pipeline runs.
+
+Requested IDs are mapped to their primary accession through an alias table
+(secondary accessions, isoform suffixes), which also remembers IDs UniProt
+did not return so they are not requested again before the TTL expires.
+
+Entries are fetched as TSV, so the FASTA header is rebuilt from TSV fields in
+UniProt's layout ('sp|P12345|NAME_HUMAN Name OS=... OX=... GN=... PE=...
+SV=...'). The first word, on which merge, cluster and class_generator key
+records, is identical to UniProt's own header; the description can differ
+(alternative protein names are dropped). HEADER_FORMAT versions this layout;
+the pipeline fingerprints it, so FASTA files written with another layout
+(e.g. downloaded before the cache existed) are regenerated instead of being
+mixed with rebuilt headers.
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import time
+from io import StringIO
+
+import uniprot_client
+
+CACHE_PATH = os.path.join("data", "cache", "uniprot.sqlite")
+TTL_DAYS = 30
+# 1: UniProt's own FASTA headers (before the cache), 2: rebuilt from TSV.
+HEADER_FORMAT = 2
+CHUNK_SIZE = 500
+
+FIELDS = (
+    "accession,id,reviewed,protein_name,organism_name,organism_id,"
+    "gene_primary,protein_existence,sequence_version,cc_disease,sec_acc,"
+    "sequence"
+)
+
+PROTEIN_EXISTENCE = {
+    "Evidence at protein level": "1",
+    "Evidence at transcript level": "2",
+    "Inferred from homology": "3",
+    "Predicted": "4",
+    "Uncertain": "5",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    accession TEXT PRIMARY KEY,
+    entry_name TEXT NOT NULL,
+    header TEXT NOT NULL,
+    mims TEXT NOT NULL,
+    sequence TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    accession TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def connect(db_path=CACHE_PATH):
+    """
+    Open the cache database, creating it if needed.
+
+    Args:
+        db_path (str): Path of the SQLite file.
+
+    Returns:
+        sqlite3.Connection: Open connection.
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _header(row):
+    """
+    Rebuild a UniProt-style FASTA header from a TSV row.
+
+    Args:
+        row (dict): TSV row with the columns requested in FIELDS.
+
+    Returns:
+        str: Header without the leading '>'.
+    """
+    db = "sp" if row.get("Reviewed") == "reviewed" else "tr"
+    name = row.get("Protein names", "").split(" (")[0].split(" [")[0]
+    organism = row.get("Organism", "").split(" (")[0]
+    header = f"{db}|{row['Entry']}|{row['Entry Name']} {name} OS={organism}"
+    header += f" OX={row.get('Organism (ID)', '')}"
+    if row.get("Gene Names (primary)"):
+        header += f" GN={row['Gene Names (primary)']}"
+    pe = PROTEIN_EXISTENCE.get(row.get("Protein existence", ""))
+    if pe:
+        header += f" PE={pe}"
+    return header + f" SV={row.get('Sequence version', '')}"
+
+
+def _parse_rows(rows):
+    """
+    Convert UniProt TSV rows into cache entries.
+
+    Args:
+        rows (iterable of dict): TSV rows with the columns of FIELDS.
+
+    Returns:
+        list of tuple: (entry, aliases) with entry as
+        (accession, entry name, header, MIM string, sequence).
+    """
+    parsed = []
+    for row in rows:
+        acc = row.get("Entry", "")
+        mim_ids = re.findall(
+            r"\[MIM:(\d+)", row.get("Involvement in disease", "")
+        )
+        mims = " ".join([f"MIM:{m}" for m in mim_ids])
+        entry = (
+            acc,
+            row.get("Entry Name", ""),
+            _header(row),
+            mims,
+            row.get("Sequence", ""),
+        )
+        aliases = [acc] + row.get("Secondary accession", "").replace(
+            ";", " "
+        ).split()
+        parsed.append((entry, aliases))
+    return parsed
+
+
+def _lookup(conn, ids, min_time):
+    """
+    Map requested IDs to fresh cached accessions.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        ids (list of str): Requested IDs.
+        min_time (float): Oldest acceptable fetch time.
+
+    Returns:
+        dict: ID mapped to its primary accession, or None if UniProt did not
+        return it. IDs that are missing or stale are left out.
+    """
+    found = {}
+    for i in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[i : i + CHUNK_SIZE]
+        marks = ",".join("?" * len(chunk))
+        for alias, acc in conn.execute(
+            f"SELECT alias, accession FROM aliases "
+            f"WHERE fetched_at >= ? AND alias IN ({marks})",
+            [min_time, *chunk],
+        ):
+            found[alias] = acc
+    return found
+
+
+def _fetch(conn, ids, url, session, max_workers):
+    """
+    Fetch entries from UniProt and store them in the cache.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        ids (list of str): IDs to fetch.
+        url (str): UniProt stream endpoint.
+        session (requests.Session): Session to use, or None for the shared one.
+        max_workers (int): Maximum number of concurrent requests.
+    """
+    batches = uniprot_client.accession_batches(
+        ids, CHUNK_SIZE, format="tsv", fields=FIELDS
+    )
+    for params, response in uniprot_client.fetch_ordered(
+        batches, url=url, session=session, max_workers=max_workers
+    ):
+        if response is None or not response.ok:
+            status = getattr(response, "status_code", None)
+            print("(Cache) Batch download failed:", status)
+            continue
+        now = time.time()
+        requested = [
+            clause.split(":", 1)[1] for clause in params["query"].split(" OR ")
+        ]
+        aliases = _store(
+            conn, csv.DictReader(StringIO(response.text), delimiter="\t"), now
+        )
+        for uid in requested:
+            acc = aliases.get(uid, aliases.get(uid.split("-")[0]))
+            aliases.setdefault(uid, acc)
+        _store_aliases(conn, aliases, now)
+        conn.commit()
+
+
+def _store(conn, rows, now):
+    """
+    Insert UniProt TSV rows into the entries table.
+
+    Args:
+        conn (sqlite3.Connection): Open cache connection.
+        rows (iterable of dict): TSV rows with the columns of FIELDS.
+        now (float): Fetch time of the rows.
+
+    Returns:
+        dict: Alias (primary and secondary accessions) mapped to the
+        accession of every stored entry.
+    """
+    aliases = {}
+    for entry, entry_aliases in _parse_rows(rows):
+        conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+            (*entry, now),
+        )
+        for alias in entry_aliases:
+            aliases[alias] = entry[0]
+    return aliases
+
+
+def _store_aliases(conn, aliases, now):
+    """Insert alias to accession mappings into the aliases table."""
+    conn.executemany(
+        "INSERT OR REPLACE INTO aliases VALUES (?, ?, ?)",
+        [(alias, acc, now) for alias, acc in aliases.items()],
+    )
+
+
+def store_rows(rows, now=None, db_path=CACHE_PATH):
+    """
+    Add entries from a UniProt TSV listing to the cache.
+
+    Lets callers that already download entries in bulk (e.g. the SwissProt
+    listing of the negatives) fill the cache from the same response instead
+    of fetching every entry a second time.
+
+    Args:
+        rows (iterable of dict): TSV rows with the columns of FIELDS.
+        now (float): Fetch time of the rows (default: now).
+        db_path (str): Path of the SQLite cache.
+    """
+    now = time.time() if now is None else now
+    conn = connect(db_path)
+    try:
+        _store_aliases(conn, _store(conn, rows, now), now)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_entries(
+    uniprot_ids,
+    ttl_days=TTL_DAYS,
+    db_path=CACHE_PATH,
+    url=uniprot_client.STREAM_URL,
+    session=None,
+    max_workers=uniprot_client.MAX_WORKERS,
+):
+    """
+    Return UniProt entries for IDs, fetching only missing or stale ones.
+
+    Args:
+        uniprot_ids (iterable of str): UniProt accessions (primary, secondary
+            or isoform IDs).
+        ttl_days (float): Entries older than this are fetched again.
+        db_path (str): Path of the SQLite cache.
+        url (str): UniProt stream endpoint.
+        session (requests.Session): Session to use, or None for the shared one.
+        max_workers (int): Maximum number of concurrent requests.
+
+    Returns:
+        dict: Primary accession mapped to a dict with keys 'accession',
+        'entry_name', 'header', 'mims' and 'sequence', in request order.
+        IDs unknown to UniProt are left out.
+    """
+    ids = list(dict.fromkeys(uniprot_ids))
+    min_time = time.time() - ttl_days * 86400
+
+    conn = connect(db_path)
+    try:
+        found = _lookup(conn, ids, min_time)
+        missing = [uid for uid in ids if uid not in found]
+        if missing:
+            _fetch(conn, missing, url, session, max_workers)
+            found.update(_lookup(conn, missing, 0))
+
+        accessions = list(
+            dict.fromkeys(found[uid] for uid in ids if found.get(uid))
+        )
+        entries = {}
+        for i in range(0, len(accessions), CHUNK_SIZE):
+            chunk = accessions[i : i + CHUNK_SIZE]
+            marks = ",".join("?" * len(chunk))
+            for row in conn.execute(
+                f"SELECT accession, entry_name, header, mims, sequence "
+                f"FROM entries WHERE accession IN ({marks})",
+                chunk,
+            ):
+                entries[row[0]] = dict(
+                    zip(
+                        (
+                            "accession",
+                            "entry_name",
+                            "header",
+                            "mims",
+                            "sequence",
+                        ),
+                        row,
+                    )
+                )
+    finally:
+        conn.close()
+
+    return {acc: entries[acc] for acc in accessions if acc in entries}
+
+
+def write_fasta(entries, filepath):
+    """
+    Write cached entries to a multi-FASTA file.
+
+    Args:
+        entries (iterable of dict): Entries as returned by get_entries.
+        filepath (str): Output path.
+    """
+    with open(filepath, "w") as f:
+        for entry in entries:
+            f.write(f">{entry['header']}\n{entry['sequence']}\n")
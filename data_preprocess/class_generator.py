@@ -4,17 +4,49 @@ for PTM and non-PTM datasets.
 
 The module downsamples the majority class to match a predefined
 imbalance factor, then saves the sequences and corresponding
-class labels.
+class labels. With a cluster membership table from joint clustering,
+the cluster of every sequence is saved as well.
 """
 
+import csv
 import os
 import random
 
-import numpy as np
-from Bio import SeqIO
+import fasta_reader
+import fasta_stats
 
 
-def main(positive, negative, output, db="", factor=1.0):
+def read_membership(path):
+    """
+    Read the cluster membership table written by cluster.joint.
+
+    Sequence ids need not be unique, so members are keyed on their record
+    number in the clustered multi-FASTA file of their label.
+
+    Args:
+        path (str): Path to the clusters.tsv file.
+
+    Returns:
+        dict: (label, record number) -> cluster number, for the sequences
+        written to the clustered files.
+    """
+    with open(path, newline="") as f:
+        return {
+            (int(row["label"]), int(row["position"])): int(row["cluster"])
+            for row in csv.DictReader(f, delimiter="\t")
+            if int(row["position"]) >= 0
+        }
+
+
+def main(
+    positive,
+    negative,
+    output,
+    db="",
+    factor=1.0,
+    percentile=95,
+    membership=None,
+):
     """
     Generate balanced multi-FASTA and class label files from
     positive and negative multi-FASTA datasets.
@@ -25,19 +57,22 @@ def main(positive, negative, output, db="", factor=1.0):
         output (str): Directory where output files will be saved.
         db (str): Optional prefix for output files.
         factor (float): Ratio of majority to minority class (default 1.0).
+        percentile (float): Percentile of positive sequence lengths used as
+            length cutoff (default 95).
+        membership (str): Optional clusters.tsv from joint clustering; if
+            given, the cluster of every sequence is written to groups.txt.
     """
-    lens_pos = [len(record.seq) for record in SeqIO.parse(positive, "fasta")]
-    cutoff = np.percentile(lens_pos, 95)
+    cutoff = fasta_stats.percentile_cutoff(positive, percentile)
     records_pos = [
-        str(record.seq)
-        for record in SeqIO.parse(positive, "fasta")
-        if len(record.seq) <= cutoff
+        (position, seq)
+        for position, (_, seq) in enumerate(fasta_reader.read_fasta(positive))
+        if len(seq) <= cutoff
     ]
     print(f"{positive} len after cutoff {len(records_pos)}")
     records_neg = [
-        str(record.seq)
-        for record in SeqIO.parse(negative, "fasta")
-        if len(record.seq) <= cutoff
+        (position, seq)
+        for position, (_, seq) in enumerate(fasta_reader.read_fasta(negative))
+        if len(seq) <= cutoff
     ]
     print(f"{negative} len after cutoff {len(records_neg)}")
 
@@ -56,9 +91,21 @@ def main(positive, negative, output, db="", factor=1.0):
 
     with open(os.path.join(output, db + "seqs.fasta"), "w") as file:
         i = 1
-        for record in records_pos:
+        for _, record in records_pos:
             file.write(f">Seq{i}\n{record}\n")
             i += 1
-        for record in records_neg:
+        for _, record in records_neg:
             file.write(f">Seq{i}\n{record}\n")
             i += 1
+
+    groups_path = os.path.join(output, db + "groups.txt")
+    if membership is None:
+        if os.path.exists(groups_path):
+            os.remove(groups_path)
+        return
+
+    clusters = read_membership(membership)
+    with open(groups_path, "w") as file:
+        for label, records in ((1, records_pos), (0, records_neg)):
+            for position, _ in records:
+                file.write(f"{clusters[(label, position)]}\n")
@@ -1,15 +1,69 @@
 """
-Module to cluster multi-FASTA files using CD-HIT.
+Module to cluster multi-FASTA files using CD-HIT or the native clusterer.
 
-This script applies CD-HIT to cluster sequences in PTM and non-PTM datasets
-to remove redundancy. Clustered sequences are saved in new multi-FASTA files.
+This script clusters sequences in PTM and non-PTM datasets to remove
+redundancy, either with the CD-HIT binary or with the in-process greedy
+clusterer in native_cluster. Both backends write the representatives to a new
+multi-FASTA file and the cluster listing to a '.clstr' file next to it.
+
+Positives and negatives are either clustered separately (main) or together in
+a single pass (joint), which keeps sequences of one cluster on one side of the
+dataset and records the cluster of every sequence.
 """
 
+import os
 import subprocess
+import tempfile
 from pathlib import Path
 
+import fasta_reader
+import native_cluster
+
+BACKENDS = ["cd-hit", "native"]
+MIXED_POLICIES = ["drop_negatives", "drop_cluster"]
+# 1: clusters.tsv keyed on sequence ids, 2: adds the record number.
+MEMBERSHIP_FORMAT = 2
+
+
+def cpu_count():
+    """
+    Number of CPUs available to this process.
+
+    Returns:
+        int: Usable CPU count.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
 
-def run_cd_hit(input_path, output_path, c=0.4, n=2, M=16000, T=8):
+def memory_mb():
+    """
+    Total physical memory of the host.
+
+    Returns:
+        int: Memory in MB.
+    """
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+
+
+def budget(jobs=1, memory_fraction=0.8):
+    """
+    Split CPU threads and memory between concurrent clustering jobs.
+
+    Args:
+        jobs (int): Number of clustering jobs running at the same time.
+        memory_fraction (float): Fraction of physical memory to hand out.
+
+    Returns:
+        tuple: (threads per job for -T, memory in MB per job for -M)
+    """
+    threads = max(1, cpu_count() // jobs)
+    memory = max(1000, int(memory_mb() * memory_fraction / jobs))
+    return threads, memory
+
+
+def run_cd_hit(input_path, output_path, c=0.4, n=2, M=None, T=None):
     """
     Run CD-HIT to cluster sequences in a multi-FASTA file.
 
@@ -18,9 +72,10 @@ def run_cd_hit(input_path, output_path, c=0.4, n=2, M=16000, T=8):
         output_path (Path): Path where the clustered multi-FASTA will be saved.
         c (float): Sequence identity threshold (default 0.4).
         n (int): Word length (default 2, recommended for protein sequences).
-        M (int): Memory limit in MB (default 16000).
-        T (int): Number of threads (default 8).
+        M (int): Memory limit in MB (default: sized to the host).
+        T (int): Number of threads (default: all usable CPUs).
     """
+    threads, memory = budget()
     cmd = [
         "cd-hit",
         "-i",
@@ -32,26 +87,54 @@ def run_cd_hit(input_path, output_path, c=0.4, n=2, M=16000, T=8):
         "-n",
         str(n),
         "-M",
-        str(M),
+        str(M or memory),
         "-T",
-        str(T),
+        str(T or threads),
     ]
     subprocess.run(cmd, check=True)
 
 
-def main(merged_path_str):
+def run(input_path, output_path, c=0.4, n=2, M=None, T=None, backend="cd-hit"):
+    """
+    Cluster a multi-FASTA file with the selected backend.
+
+    Args:
+        input_path (Path): Path to the input multi-FASTA file.
+        output_path (Path): Path where the clustered multi-FASTA will be saved.
+        c (float): Sequence identity threshold (default 0.4).
+        n (int): Word length (default 2).
+        M (int): CD-HIT memory limit in MB (default: sized to the host).
+        T (int): Number of threads (default: all usable CPUs).
+        backend (str): 'cd-hit' for the external binary or 'native' for the
+            in-process clusterer.
+    """
+    if backend == "cd-hit":
+        run_cd_hit(input_path, output_path, c=c, n=n, M=M, T=T)
+    elif backend == "native":
+        native_cluster.run(
+            input_path, output_path, c=c, n=n, threads=T or cpu_count()
+        )
+    else:
+        raise ValueError(f"unknown clustering backend: {backend}")
+
+
+def main(merged_path_str, T=None, M=None, backend="cd-hit"):
     """
-    Cluster PTM and corresponding non-PTM multi-FASTA files using CD-HIT.
+    Cluster PTM and corresponding non-PTM multi-FASTA files.
 
     Args:
         merged_path_str (str): Path to the merged PTM multi-FASTA file.
+        T (int): Number of threads per run (default: all usable CPUs).
+        M (int): CD-HIT memory limit in MB per run (default: sized to the
+            host).
+        backend (str): Clustering backend, one of BACKENDS.
     """
     merged_path = Path(merged_path_str)
     clustered_path = merged_path.with_name(
         merged_path.stem.replace("merged", "clustered") + merged_path.suffix
     )
 
-    run_cd_hit(merged_path, clustered_path)
+    run(merged_path, clustered_path, M=M, T=T, backend=backend)
 
     ptm_name = merged_path.parent.name
     base_dir = merged_path.parents[1]
@@ -61,4 +144,134 @@ def main(merged_path_str):
         no_ptm_path.stem.replace("filtered", "clustered") + no_ptm_path.suffix
     )
 
-    run_cd_hit(no_ptm_path, clustered_no_ptm_path)
+    run(no_ptm_path, clustered_no_ptm_path, M=M, T=T, backend=backend)
+
+
+def _label_clusters(listing, policy):
+    """
+    Assign the members of a joint clustering to their final clusters.
+
+    Args:
+        listing (list of tuple): Output of native_cluster.parse_clstr with
+            synthetic ids 'P<i>' for positives and 'N<i>' for negatives.
+        policy (str): Handling of clusters with both labels, one of
+            MIXED_POLICIES.
+
+    Returns:
+        list of tuple: (cluster number, label, index, kept) per member, label
+        1 for positives and 0 for negatives.
+    """
+    rows = []
+    for number, (_, members) in enumerate(listing):
+        labels = {name[0] for name in members}
+        for name in members:
+            label = int(name[0] == "P")
+            kept = len(labels) == 1 or (policy == "drop_negatives" and label)
+            rows.append((number, label, int(name[1:]), kept))
+    return rows
+
+
+def joint(
+    merged_path_str,
+    T=None,
+    M=None,
+    backend="cd-hit",
+    policy="drop_negatives",
+    members="representatives",
+):
+    """
+    Cluster the positives of a PTM together with its negatives.
+
+    The union of both sets is clustered once under synthetic ids, so a
+    cluster never spans the two classes of the dataset. Clusters with both
+    labels are resolved by the policy: 'drop_negatives' keeps the positives
+    and discards the negatives, 'drop_cluster' discards the whole cluster.
+    Besides the two clustered multi-FASTA files, a 'clusters.tsv' table with
+    the cluster, label and fate of every input sequence is written to the PTM
+    directory, together with the record number of every written sequence in
+    its clustered file (-1 if it was not written).
+
+    Args:
+        merged_path_str (str): Path to the merged PTM multi-FASTA file.
+        T (int): Number of threads (default: all usable CPUs).
+        M (int): CD-HIT memory limit in MB (default: sized to the host).
+        backend (str): Clustering backend, one of BACKENDS.
+        policy (str): Handling of mixed clusters, one of MIXED_POLICIES.
+        members (str): 'representatives' writes one sequence per cluster and
+            label, 'all' writes every kept member so redundancy can instead
+            be handled by cluster-grouped cross-validation.
+    """
+    if policy not in MIXED_POLICIES:
+        raise ValueError(f"unknown mixed cluster policy: {policy}")
+
+    merged_path = Path(merged_path_str)
+    ptm_name = merged_path.parent.name
+    no_ptm_dir = merged_path.parents[1].with_name("no_ptm")
+    sets = [
+        fasta_reader.read_batch(
+            str(no_ptm_dir / f"filtered_no_{ptm_name}.fasta")
+        ),
+        fasta_reader.read_batch(str(merged_path)),
+    ]
+
+    with tempfile.TemporaryDirectory(dir=merged_path.parent) as tmp:
+        union = Path(tmp) / "union.fasta"
+        with open(union, "w", buffering=2**20) as out:
+            for label, prefix in ((1, "P"), (0, "N")):
+                for i, seq in enumerate(sets[label][1]):
+                    out.write(f">{prefix}{i}\n{seq}\n")
+        output = Path(tmp) / "joint.fasta"
+        run(union, output, M=M, T=T, backend=backend)
+        listing = native_cluster.parse_clstr(f"{output}.clstr")
+
+    rows = _label_clusters(listing, policy)
+    chosen = {}
+    for number, label, index, kept in rows:
+        if not kept:
+            continue
+        if members == "all":
+            chosen[(number, label, index)] = index
+            continue
+        best = chosen.get((number, label))
+        seqs = sets[label][1]
+        if best is None or len(seqs[index]) > len(seqs[best]):
+            chosen[(number, label)] = index
+    written = {(key[1], index) for key, index in chosen.items()}
+
+    # Record number of every written sequence in its clustered file; ids
+    # need not be unique, so the membership table is keyed on these.
+    positions = {}
+    counts = [0, 0]
+    for _, label, index, _ in rows:
+        if (label, index) in written:
+            positions[(label, index)] = counts[label]
+            counts[label] += 1
+
+    outputs = [
+        no_ptm_dir / f"clustered_no_{ptm_name}.fasta",
+        merged_path.with_name("clustered.fasta"),
+    ]
+    for label, path in enumerate(outputs):
+        headers, seqs = sets[label]
+        with open(path, "w", buffering=2**20) as out:
+            for number, lab, index, _ in rows:
+                if lab == label and (label, index) in written:
+                    out.write(f">{headers[index]}\n{seqs[index]}\n")
+
+    with open(merged_path.with_name("clusters.tsv"), "w") as out:
+        out.write("id\tlabel\tcluster\twritten\tposition\n")
+        for number, label, index, _ in rows:
+            seq_id = sets[label][0][index].split()[0]
+            written_flag = int((label, index) in written)
+            position = positions.get((label, index), -1)
+            out.write(
+                f"{seq_id}\t{label}\t{number}\t{written_flag}\t{position}\n"
+            )
+
+    mixed = len(
+        {r[0] for r in rows if r[1] == 1} & {r[0] for r in rows if r[1] == 0}
+    )
+    print(
+        f"{ptm_name}: {len(listing)} joint clusters, {mixed} mixed "
+        f"({policy}), {len(written)} sequences written"
+    )
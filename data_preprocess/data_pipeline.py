@@ -10,115 +10,395 @@ This script:
 6. Generates class labels for positives and negatives.
 7. Computes and visualizes sequence length distributions (with 95th-percentile cutoff).
 8. Prepares directories for downstream feature importances.
+
+The steps are grouped into the stages download -> merge -> negatives ->
+cluster -> classes. Each stage records its input hashes and parameters in a
+manifest (see manifest.py); stages whose inputs are unchanged are skipped and
+a crashed run resumes from the first unfinished stage.
 """
 
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
 
+import accession_cache
 import class_generator
 import cluster
 import disease
 import download_all
+import fasta_stats
+import manifest
 import matplotlib.pyplot as plt
 import merge
 import negatives
 import numpy as np
+import uniprot_client
 import venn_diagrams
-from Bio import SeqIO
-
-
-def main():
-    """Run the full PTM preprocessing pipeline."""
-
-    download_all.main()
-
-    ptms_dir = os.path.join("data", "ptms")
-
-    os.makedirs(ptms_dir, exist_ok=True)
-
-    for ptm in os.listdir(ptms_dir):
-        dir_path = os.path.join(ptms_dir, ptm)
-        if os.path.isdir(dir_path):
-            databases_path = os.path.join(dir_path, "databases")
-            merge.main(databases_path, dir_path)
-
-    disease.disease_stacked(ptms_dir)
-    venn_diagrams.main(ptms_dir)
-
-    negatives.main()
-
-    for ptm in os.listdir(ptms_dir):
-        dir_path = os.path.join(ptms_dir, ptm)
-        if os.path.isdir(dir_path):
-            databases_path = os.path.join(dir_path, "databases")
-            labels = []
-            all_lens100 = []
-            all_lens95 = []
-            for db in os.listdir(databases_path):
-                if db.endswith(".fasta"):
-                    filepath = os.path.join(databases_path, db)
-                    labels.append(db.split(".")[0])
-                    lens_100 = [
-                        len(record.seq)
-                        for record in SeqIO.parse(filepath, "fasta")
-                    ]
-                    all_lens100.append(lens_100)
-                    cutoff = np.percentile(lens_100, 95)
-                    lens_95 = [y for y in lens_100 if y <= cutoff]
-                    all_lens95.append(lens_95)
-                    print(
-                        f"{filepath} {max(lens_100)} {max(lens_95)} len: {len(lens_100)}"
-                    )
-                    short_seqs = [
-                        str(record.seq)
-                        for record in SeqIO.parse(filepath, "fasta")
-                        if len(record.seq) <= 10
-                    ]
-                    print(short_seqs)
-
-            fig, ax = plt.subplots(figsize=(5, 6))
-            ax.set_ylabel("Sequence length", fontsize=14)
-            bplot = ax.boxplot(all_lens95, tick_labels=labels)
-            plt.xticks(rotation=45)
-            ax.tick_params(axis="both", labelsize=14)
-            plt.tight_layout()
-            plt.savefig(os.path.join(dir_path, "seq_lens_boxp_95.pdf"))
-            plt.clf()
-
-            fig, ax = plt.subplots(figsize=(5, 6))
-            ax.set_ylabel("Sequence length", fontsize=14)
-            bplot = ax.boxplot(all_lens100, tick_labels=labels)
-            plt.xticks(rotation=45)
-            ax.tick_params(axis="both", labelsize=14)
-            plt.tight_layout()
-            plt.savefig(os.path.join(dir_path, "seq_lens_boxp.pdf"))
-            plt.clf()
-
-
-            merged = os.path.join(dir_path, 'merged.fasta')
-            cluster.main(merged)
-
-            clustered = os.path.join(dir_path, "clustered.fasta")
-            class_generator.main(
-                clustered,
-                clustered_neg,
-                dir_path,
-                factor=1,
+
+PTMS_DIR = os.path.join("data", "ptms")
+NO_PTM_DIR = os.path.join("data", "no_ptm")
+
+STAGES = ["download", "merge", "negatives", "cluster", "classes"]
+
+
+def ptm_dirs(ptms_dir=PTMS_DIR):
+    """
+    List the PTM directories.
+
+    Args:
+        ptms_dir (str): Directory containing one subdirectory per PTM.
+
+    Returns:
+        list of str: Paths of the PTM directories.
+    """
+    return [
+        os.path.join(ptms_dir, ptm)
+        for ptm in sorted(os.listdir(ptms_dir))
+        if os.path.isdir(os.path.join(ptms_dir, ptm))
+    ]
+
+
+def plot_database_lengths(dir_path):
+    """
+    Plot boxplots of the sequence lengths per source database of a PTM.
+
+    Args:
+        dir_path (str): PTM directory containing a 'databases' subdirectory.
+    """
+    databases_path = os.path.join(dir_path, "databases")
+    labels = []
+    all_lens100 = []
+    all_lens95 = []
+    for db in sorted(os.listdir(databases_path)):
+        if db.endswith(".fasta"):
+            filepath = os.path.join(databases_path, db)
+            labels.append(db.split(".")[0])
+            stats = fasta_stats.get_stats(filepath)
+            lens_100 = stats["lengths"]
+            all_lens100.append(lens_100)
+            cutoff = np.percentile(lens_100, 95)
+            lens_95 = lens_100[lens_100 <= cutoff]
+            all_lens95.append(lens_95)
+            print(
+                f"{filepath} {max(lens_100)} {max(lens_95)} len: {len(lens_100)}"
             )
+            print(stats["short_seqs"])
+
+    fig, ax = plt.subplots(figsize=(5, 6))
+    ax.set_ylabel("Sequence length", fontsize=14)
+    ax.boxplot(all_lens95, tick_labels=labels)
+    plt.xticks(rotation=45)
+    ax.tick_params(axis="both", labelsize=14)
+    plt.tight_layout()
+    plt.savefig(os.path.join(dir_path, "seq_lens_boxp_95.pdf"))
+    plt.clf()
+
+    fig, ax = plt.subplots(figsize=(5, 6))
+    ax.set_ylabel("Sequence length", fontsize=14)
+    ax.boxplot(all_lens100, tick_labels=labels)
+    plt.xticks(rotation=45)
+    ax.tick_params(axis="both", labelsize=14)
+    plt.tight_layout()
+    plt.savefig(os.path.join(dir_path, "seq_lens_boxp.pdf"))
+    plt.clf()
+
+
+def run_per_ptm(function, args_list, workers):
+    """
+    Run independent per-PTM branches in a process pool.
+
+    The workers share the UniProt connection limit of the parent, so the
+    pool together never exceeds uniprot_client.HOST_CONNECTIONS requests.
+
+    Args:
+        function (callable): Top-level function run once per PTM.
+        args_list (list of tuple): Arguments per PTM.
+        workers (int): Maximum number of concurrent processes; runs in the
+            current process if 1.
+    """
+    if workers <= 1 or len(args_list) <= 1:
+        for args in args_list:
+            function(*args)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=uniprot_client.use_host_slots,
+        initargs=(uniprot_client.shared_host_slots(),),
+    ) as executor:
+        futures = [executor.submit(function, *args) for args in args_list]
+        for future in futures:
+            future.result()
+
+
+def merge_ptm(dir_path):
+    """
+    Merge the source databases of a PTM and plot their lengths.
+
+    Args:
+        dir_path (str): PTM directory.
+    """
+    databases_path = os.path.join(dir_path, "databases")
+    merge.main(databases_path, dir_path, streaming=True)
+    plot_database_lengths(dir_path)
+
+
+def classes_ptm(dir_path, percentile):
+    """
+    Generate balanced class labels and sequences for a PTM.
+
+    Args:
+        dir_path (str): PTM directory.
+        percentile (float): Percentile of positive lengths used as cutoff.
+    """
+    ptm = os.path.basename(dir_path)
+    merged = os.path.join(dir_path, "merged.fasta")
+    clustered = os.path.join(dir_path, "clustered.fasta")
+    clustered_neg = os.path.join(NO_PTM_DIR, f"clustered_no_{ptm}.fasta")
+    membership = os.path.join(dir_path, "clusters.tsv")
+    class_generator.main(
+        clustered,
+        clustered_neg,
+        dir_path,
+        factor=1,
+        percentile=percentile,
+        membership=membership if os.path.exists(membership) else None,
+    )
+
+    unique = fasta_stats.count(merged)
+
+    clustered_count = fasta_stats.count(clustered)
+    uni_clus = clustered_count / unique
+
+    neg = fasta_stats.count(clustered_neg)
+
+    print(
+        f"{ptm} unique {unique} clustered {clustered_count} per {uni_clus} neg_clus {neg} \n"
+    )
+
+
+def merge_stage(workers):
+    """
+    Merge the source databases of every PTM and plot overlaps and lengths.
+
+    Args:
+        workers (int): Number of PTMs processed concurrently.
+    """
+    run_per_ptm(merge_ptm, [(d,) for d in ptm_dirs()], workers)
+
+    disease.disease_stacked(PTMS_DIR)
+    venn_diagrams.main(PTMS_DIR)
+
+
+def cluster_stage(
+    workers, backend="cd-hit", joint=False, members="representatives"
+):
+    """
+    Cluster the positive and negative sequences of every PTM.
+
+    Threads and memory are divided between the concurrent PTMs so the machine
+    is saturated without being oversubscribed.
+
+    Args:
+        workers (int): Number of PTMs clustered concurrently.
+        backend (str): Clustering backend, one of cluster.BACKENDS.
+        joint (bool): Cluster positives and negatives together in one pass
+            and record the cluster membership in clusters.tsv.
+        members (str): In joint mode, 'representatives' or 'all' members of
+            every cluster are written (see cluster.joint).
+    """
+    dirs = ptm_dirs()
+    threads, memory = cluster.budget(min(workers, len(dirs)) or 1)
+    print(f"{backend} budget per PTM: -T {threads} -M {memory}")
+    args_list = [
+        (os.path.join(d, "merged.fasta"), threads, memory, backend)
+        for d in dirs
+    ]
+    if joint:
+        args_list = [args + ("drop_negatives", members) for args in args_list]
+        run_per_ptm(cluster.joint, args_list, workers)
+        return
+
+    for d in dirs:
+        membership = os.path.join(d, "clusters.tsv")
+        if os.path.exists(membership):
+            os.remove(membership)
+    run_per_ptm(cluster.main, args_list, workers)
+
+
+def classes_stage(percentile, workers):
+    """
+    Generate balanced class labels and sequences for every PTM.
+
+    Args:
+        percentile (float): Percentile of positive lengths used as cutoff.
+        workers (int): Number of PTMs processed concurrently.
+    """
+    run_per_ptm(classes_ptm, [(d, percentile) for d in ptm_dirs()], workers)
 
 
-            unique = sum(1 for _ in SeqIO.parse(merged, "fasta"))
+def main(
+    force=(),
+    percentile=95,
+    workers=None,
+    near_identical=False,
+    cluster_backend="cd-hit",
+    joint_clustering=False,
+    cluster_members="representatives",
+):
+    """
+    Run the full PTM preprocessing pipeline, skipping up-to-date stages.
 
-            clustered_count = sum(1 for _ in SeqIO.parse(clustered, "fasta"))
-            uni_clus = clustered_count/unique
+    Args:
+        force (iterable of str): Stages to run even if they are up to date.
+        percentile (float): Percentile of positive lengths used as cutoff.
+        workers (int): Number of PTM branches run in parallel processes;
+            defaults to the four PTMs, capped at the CPU count.
+        near_identical (bool): Also drop negatives that contain, or are
+            contained in, a positive sequence of the same PTM.
+        cluster_backend (str): Clustering backend, one of cluster.BACKENDS.
+        joint_clustering (bool): Cluster positives and negatives together,
+            dropping negatives that share a cluster with positives, and write
+            the cluster of every training sequence to groups.txt.
+        cluster_members (str): 'representatives' or 'all' members of every
+            joint cluster are kept.
+    """
+    os.makedirs(PTMS_DIR, exist_ok=True)
+    state = manifest.load()
+    if workers is None:
+        workers = min(4, cluster.cpu_count())
+    force = set(force)
 
-            clustered_neg = f'data/no_ptm/clustered_no_{ptm}.fasta'
-            neg = sum(1 for _ in SeqIO.parse(clustered_neg, "fasta"))
+    databases = os.path.join(PTMS_DIR, "*", "databases", "*.fasta")
+    merged = os.path.join(PTMS_DIR, "*", "merged.fasta")
+    filtered = os.path.join(NO_PTM_DIR, "filtered_no_*.fasta")
 
-            print(f'{ptm} unique {unique} clustered {clustered_count} per {uni_clus} neg_clus {neg} \n')
+    stages = [
+        (
+            "download",
+            download_all.main,
+            [],
+            {"header_format": accession_cache.HEADER_FORMAT},
+            [databases],
+        ),
+        (
+            "merge",
+            lambda: merge_stage(workers),
+            [databases],
+            {},
+            [merged],
+        ),
+        (
+            "negatives",
+            lambda: negatives.main(near_identical=near_identical),
+            [merged],
+            {
+                "near_identical": near_identical,
+                "header_format": accession_cache.HEADER_FORMAT,
+            },
+            [filtered],
+        ),
+        (
+            "cluster",
+            lambda: cluster_stage(
+                workers, cluster_backend, joint_clustering, cluster_members
+            ),
+            [merged, filtered],
+            {
+                "c": 0.4,
+                "n": 2,
+                "backend": cluster_backend,
+                "joint": joint_clustering,
+                "members": cluster_members,
+                "membership_format": cluster.MEMBERSHIP_FORMAT,
+            },
+            [
+                os.path.join(PTMS_DIR, "*", "clustered.fasta"),
+                os.path.join(NO_PTM_DIR, "clustered_no_*.fasta"),
+                os.path.join(PTMS_DIR, "*", "clusters.tsv"),
+            ],
+        ),
+        (
+            "classes",
+            lambda: classes_stage(percentile, workers),
+            [
+                os.path.join(PTMS_DIR, "*", "clustered.fasta"),
+                os.path.join(NO_PTM_DIR, "clustered_no_*.fasta"),
+                os.path.join(PTMS_DIR, "*", "clusters.tsv"),
+            ],
+            {"factor": 1, "percentile": percentile},
+            [
+                os.path.join(PTMS_DIR, "*", "classes.txt"),
+                os.path.join(PTMS_DIR, "*", "seqs.fasta"),
+                os.path.join(PTMS_DIR, "*", "groups.txt"),
+            ],
+        ),
+    ]
 
+    for name, function, inputs, params, outputs in stages:
+        manifest.run_stage(
+            state,
+            name,
+            function,
+            inputs,
+            params,
+            outputs,
+            force=name in force,
+        )
 
-    os.makedirs('data/feature_importances', exist_ok=True)
+    os.makedirs("data/feature_importances", exist_ok=True)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the PTM pipeline.")
+    parser.add_argument(
+        "--force",
+        nargs="+",
+        choices=STAGES,
+        default=[],
+        help="stages to re-run even if their inputs are unchanged",
+    )
+    parser.add_argument(
+        "--percentile",
+        type=float,
+        default=95,
+        help="length cutoff as percentile of positive lengths (default 95)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="PTM branches processed in parallel (default: up to 4)",
+    )
+    parser.add_argument(
+        "--near-identical",
+        action="store_true",
+        help="also filter negatives near-identical to positives",
+    )
+    parser.add_argument(
+        "--cluster-backend",
+        choices=cluster.BACKENDS,
+        default="cd-hit",
+        help="clustering backend (default: cd-hit)",
+    )
+    parser.add_argument(
+        "--joint-clustering",
+        action="store_true",
+        help="cluster positives and negatives together in one pass",
+    )
+    parser.add_argument(
+        "--cluster-members",
+        choices=["representatives", "all"],
+        default="representatives",
+        help="with --joint-clustering, keep one sequence per cluster or all",
+    )
+    args = parser.parse_args()
+    main(
+        force=args.force,
+        percentile=args.percentile,
+        workers=args.workers,
+        near_identical=args.near_identical,
+        cluster_backend=args.cluster_backend,
+        joint_clustering=args.joint_clustering,
+        cluster_members=args.cluster_members,
+    )
@@ -4,23 +4,41 @@ disease-related multi-label datasets for PTMs.
 
 Functions include:
 - Extracting UniProt IDs from multi-FASTA files
-- Downloading disease annotations via UniProt API
+- Looking up disease annotations via the local UniProt accession cache
 - Visualizing disease frequency
 - Generating multi-label datasets combining PTM and disease info
 """
 
-import csv
+import itertools
 import os
-import re
 from collections import Counter
-from io import StringIO
 
+import accession_cache
+import fasta_reader
 import matplotlib.pyplot as plt
 import pandas as pd
-import requests
 from Bio import SeqIO
 
 
+def uniprot_id(record):
+    """
+    Extract the UniProt accession from a SeqIO record header.
+
+    Args:
+        record (SeqRecord): Record parsed from a multi-FASTA file.
+
+    Returns:
+        str or None: UniProt accession without isoform version, or None for
+        non-UniProt records.
+    """
+    if record.id.startswith("sp|") or record.id.startswith("tr|"):
+        name = record.id.split("|")[1]
+        if name[-2] == ".":
+            name = name[:-2]
+        return name
+    return None
+
+
 def get_ids(filepath):
     """
     Extract UniProt IDs from a multi-FASTA file.
@@ -34,56 +52,84 @@ def get_ids(filepath):
     uniprot_ids = []
     other_records = []
     for record in SeqIO.parse(filepath, "fasta"):
-        if record.id.startswith("sp|") or record.id.startswith("tr|"):
-            name = record.id.split("|")[1]
-            if name[-2] == ".":
-                name = name[:-2]
+        name = uniprot_id(record)
+        if name is not None:
             uniprot_ids.append(name)
         else:
             other_records.append(record)
     return uniprot_ids, other_records
 
 
-def get_records(uniprot_ids, chunk_size=100):
+def iter_ids(filepath):
     """
-    Download disease annotations for a list of UniProt IDs.
+    Lazily yield UniProt IDs from a multi-FASTA file.
 
     Args:
-        uniprot_ids (list): List of UniProt IDs.
+        filepath (str): Path to a multi-FASTA file.
 
-    Returns:
-        set: Set of tuples containing (accession, entry name, MIM string, sequence)
+    Yields:
+        str: UniProt ID of each UniProt record.
+    """
+    for record in SeqIO.parse(filepath, "fasta"):
+        name = uniprot_id(record)
+        if name is not None:
+            yield name
+
+
+def iter_other_records(filepath):
+    """
+    Lazily yield the non-UniProt records of a multi-FASTA file.
+
+    Args:
+        filepath (str): Path to a multi-FASTA file.
+
+    Yields:
+        SeqRecord: Records without a UniProt accession.
     """
-    records = set()
+    for record in SeqIO.parse(filepath, "fasta"):
+        if uniprot_id(record) is None:
+            yield record
 
-    base_url = "https://rest.uniprot.org/uniprotkb/stream"
-    fields = "accession,id,cc_disease,sequence"
 
-    for i in range(0, len(uniprot_ids), chunk_size):
-        chunk = uniprot_ids[i : i + chunk_size]
-        query = " OR ".join([f"accession:{uid}" for uid in chunk])
+def iter_records(uniprot_ids, chunk_size=500):
+    """
+    Look up disease annotations for UniProt IDs, yielding them batch by batch.
 
-        params = {"format": "tsv", "fields": fields, "query": query}
+    Entries come from the local accession cache, which only contacts UniProt
+    for entries that are missing or stale.
 
-        response = requests.get(base_url, params=params, timeout=120)
+    Args:
+        uniprot_ids (iterable): UniProt IDs, consumed lazily.
+        chunk_size (int): Number of IDs looked up at once.
 
-        if response.ok:
-            tsv_data = StringIO(response.text)
-            reader = csv.DictReader(tsv_data, delimiter="\t")
-            for row in reader:
-                acc = row.get("Entry", "")
-                name = row.get("Entry Name", "")
-                disease = row.get("Involvement in disease", "")
-                mim_ids = re.findall(r"\[MIM:(\d+)", disease)
-                mim_string = " ".join([f"MIM:{m}" for m in mim_ids])
-                seq = row.get("Sequence", "")
-                records.add((acc, name, mim_string, seq))
-        else:
-            print(
-                f"(Disease) Batch download failed: {response.status_code} - {response.text[:200]}"
+    Yields:
+        tuple: (accession, entry name, MIM string, sequence)
+    """
+    uniprot_ids = iter(uniprot_ids)
+    while chunk := list(itertools.islice(uniprot_ids, chunk_size)):
+        for entry in accession_cache.get_entries(chunk).values():
+            yield (
+                entry["accession"],
+                entry["entry_name"],
+                entry["mims"],
+                entry["sequence"],
             )
 
-    return records
+
+def get_records(uniprot_ids, chunk_size=500):
+    """
+    Download disease annotations for a list of UniProt IDs.
+
+    Records are returned in the order of the IDs, without repeats, so the
+    merge writes them in the same order as the streaming merge.
+
+    Args:
+        uniprot_ids (list): List of UniProt IDs.
+
+    Returns:
+        list: Tuples containing (accession, entry name, MIM string, sequence)
+    """
+    return list(dict.fromkeys(iter_records(uniprot_ids, chunk_size)))
 
 
 def vis_disease(dir_path):
@@ -94,9 +140,11 @@ def vis_disease(dir_path):
         dir_path (str): Directory containing 'merged.fasta' for a PTM.
     """
     diseases = []
-    for record in SeqIO.parse(os.path.join(dir_path, "merged.fasta"), "fasta"):
-        if "MIM:" in record.description:
-            parts = record.description.split(" MIM:")
+    for header, _ in fasta_reader.read_fasta(
+        os.path.join(dir_path, "merged.fasta")
+    ):
+        if "MIM:" in header:
+            parts = header.split(" MIM:")
             for disease_part in parts[1:]:
                 diseases.append(disease_part)
 
@@ -151,11 +199,11 @@ def disease_stacked(ptms_dir):
         ptm_path = os.path.join(ptms_dir, ptm)
         if os.path.isdir(ptm_path):
             diseases = []
-            for record in SeqIO.parse(
-                os.path.join(ptm_path, "merged.fasta"), "fasta"
+            for header, _ in fasta_reader.read_fasta(
+                os.path.join(ptm_path, "merged.fasta")
             ):
-                if "MIM:" in record.description:
-                    parts = record.description.split(" MIM:")
+                if "MIM:" in header:
+                    parts = header.split(" MIM:")
                     for disease_part in parts[1:]:
                         diseases.append(disease_part)
             diseases_per_ptm[ptm] = diseases
@@ -218,7 +266,7 @@ def main(filepath):
         filepath (str): Path to a PTM multi-FASTA file.
 
     Returns:
-        tuple: (set of disease records, list of non-UniProt records)
+        tuple: (list of disease records, list of non-UniProt records)
     """
     ids, other_records = get_ids(filepath)
     records = get_records(ids)
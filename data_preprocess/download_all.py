@@ -4,50 +4,296 @@ PTMD, PTMcode2, qPTM, UniPep). Handles extraction of UniProt IDs/names and retri
 FASTA sequences for specific post-translational modifications (PTMs).
 """
 
+import collections
+import csv
 import gzip
+import io
+import json
 import os
+import re
 import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from io import StringIO
+from urllib.parse import urlparse
 
+import accession_cache
 import pandas as pd
 import requests
+import uniprot_client
 from Bio import Entrez
 from bs4 import BeautifulSoup
 
-
-def get_uniprot_seqs(uniprot_ids, filepath):
+NAME_CACHE = os.path.join("data", "cache", "uniprot_names.json")
+_name_cache_lock = threading.Lock()
+
+PTM_CODE2_URL = (
+    "https://ptmcode.embl.de/data/PTMcode2_associations_within_proteins.txt.gz"
+)
+UNIPEP_URL = "https://db.systemsbiology.net/sbeams/cgi/Glycopeptide/browse_glycopeptides.cgi"
+NCBI_HOST = "eutils.ncbi.nlm.nih.gov"
+UNIPROT_HOST = "rest.uniprot.org"
+
+# Concurrent tasks per host. Requests to UniProt are bounded separately, by
+# uniprot_client.HOST_CONNECTIONS, because one task sends several at once.
+HOST_LIMITS = {
+    UNIPROT_HOST: 4,
+    NCBI_HOST: 1,
+    "biomics.lab.nycu.edu.tw": 2,
+    "ptmd.biocuckoo.cn": 2,
+    "ptmcode.embl.de": 1,
+    "db.systemsbiology.net": 1,
+}
+
+
+def get_uniprot_seqs(
+    uniprot_ids,
+    filepath,
+    url=uniprot_client.STREAM_URL,
+    session=None,
+    max_workers=uniprot_client.MAX_WORKERS,
+):
     """
     Download UniProt sequences by accession IDs in batches and save to a multi-FASTA file.
 
+    Entries are served from the local accession cache; only missing or stale
+    entries are fetched, concurrently over a pooled session with retries.
+
     Parameters
     ----------
     uniprot_ids : list of str
         UniProt accession IDs.
     filepath : str
         Path to the output multi-FASTA file.
+    url : str
+        UniProt stream endpoint (overridable to test against a stub server).
+    session : requests.Session, optional
+        Session to use instead of the shared pooled session.
+    max_workers : int
+        Maximum number of concurrent batch requests.
     """
-    if os.path.exists(filepath):
-        os.remove(filepath)
-    url = "https://rest.uniprot.org/uniprotkb/stream"
-    chunk_size = 500
-    for i in range(0, len(uniprot_ids), chunk_size):
-        chunk = uniprot_ids[i : (i + chunk_size)]
-        params = {
-            "format": "fasta",
-            "query": " OR ".join([f"accession:{uid}" for uid in chunk]),
-        }
-        response = requests.get(url, params=params, timeout=30)
-        if response.ok:
-            with open(filepath, "a") as f:
-                f.write(response.text)
+    entries = accession_cache.get_entries(
+        uniprot_ids, url=url, session=session, max_workers=max_workers
+    )
+    accession_cache.write_fasta(entries.values(), filepath)
+
+
+def _protein_names(field):
+    """
+    Split a UniProt 'Protein names' field into its names.
+
+    The recommended name is followed by alternative names in parentheses and
+    by cleaved chains in brackets, e.g. ``Insulin [Cleaved into: Insulin B
+    chain; Insulin A chain]``.
+
+    Parameters
+    ----------
+    field : str
+        Value of the 'Protein names' column.
+
+    Returns
+    -------
+    set of str
+        Lower-cased names.
+    """
+    field = field.lower().replace("cleaved into:", "")
+    return {
+        name.strip()
+        for name in re.split(r"[()\[\];]|, ", field)
+        if name.strip()
+    }
+
+
+def _best_accession(name, rows):
+    """
+    Pick the UniProt entry that best matches a protein or gene name.
+
+    Exact gene name matches win over whole protein name matches; the primary
+    gene name wins over synonyms and reviewed entries win over unreviewed
+    ones. Names are never matched as substrings, so a short name such as
+    "ATM" does not pick an entry merely mentioning it.
+
+    Parameters
+    ----------
+    name : str
+        Protein or gene name that was searched.
+    rows : list of dict
+        TSV rows returned for the batched search.
+
+    Returns
+    -------
+    str or None
+        Accession of the best match, or None if no row matches the name.
+    """
+    key = name.lower()
+    best = None
+    best_score = None
+    for row in rows:
+        genes = row.get("Gene Names", "").lower().split()
+        if key in genes:
+            score = (2, genes[0] == key)
+        elif key in _protein_names(row.get("Protein names", "")):
+            score = (1, False)
         else:
-            print("Batch download failed:", response.status_code)
+            continue
+        score += (row.get("Reviewed", "") == "reviewed",)
+        if best_score is None or score > best_score:
+            best, best_score = row["Entry"], score
+    return best
+
+
+def _read_name_cache(cache_path):
+    """Load the name cache, or an empty one if it does not exist yet."""
+    if not os.path.exists(cache_path):
+        return {}
+    with open(cache_path) as f:
+        return json.load(f)
+
+
+def _is_cached(value, min_time):
+    """Whether a name cache value is an accession or a recent miss."""
+    if isinstance(value, str):
+        return True
+    return isinstance(value, (int, float)) and value >= min_time
+
+
+def _update_name_cache(cache_path, updates):
+    """
+    Merge newly resolved names into the on-disk name cache.
+
+    The cache maps a name to its accession, or to the time of the search
+    for names without a match, so misses expire like accession cache
+    entries.
+
+    Tasks resolving names run in parallel threads, so the cache is re-read
+    under a lock and written through a unique temporary file that replaces
+    it atomically; names resolved by another task are kept.
+
+    Parameters
+    ----------
+    cache_path : str
+        Path of the name to accession JSON cache.
+    updates : dict
+        Names resolved by the caller.
+    """
+    directory = os.path.dirname(cache_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with _name_cache_lock:
+        cache = _read_name_cache(cache_path)
+        cache.update(updates)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def resolve_names(
+    uniprot_names,
+    cache_path=NAME_CACHE,
+    chunk_size=50,
+    url=uniprot_client.STREAM_URL,
+    session=None,
+    max_workers=uniprot_client.MAX_WORKERS,
+    ttl_days=accession_cache.TTL_DAYS,
+):
+    """
+    Resolve human protein/gene names to UniProt accessions in batches.
+
+    Many ``protein_name``/``gene`` clauses are OR-combined per search query
+    and the batches are sent concurrently. Resolved names are stored in an
+    on-disk JSON cache so reruns skip them; names without a match are
+    searched again once they are older than ``ttl_days``.
+
+    Parameters
+    ----------
+    uniprot_names : list of str
+        Protein or gene names to search in UniProt.
+    cache_path : str
+        Path of the name to accession JSON cache.
+    chunk_size : int
+        Number of names per search query.
+    url : str
+        UniProt stream endpoint.
+    session : requests.Session, optional
+        Session to use instead of the shared pooled session.
+    max_workers : int
+        Maximum number of concurrent search requests.
+    ttl_days : float
+        Names without a match are searched again after this many days.
+
+    Returns
+    -------
+    resolved : dict
+        Name mapped to its accession, or None if it was not found.
+    failed : int
+        Number of names whose search request failed.
+    """
+    with _name_cache_lock:
+        cache = _read_name_cache(cache_path)
+
+    now = time.time()
+    min_time = now - ttl_days * 86400
+    todo = [
+        name
+        for name in uniprot_names
+        if not _is_cached(cache.get(name), min_time)
+    ]
+
+    chunks = {}
+    for i in range(0, len(todo), chunk_size):
+        chunk = todo[i : i + chunk_size]
+        clauses = " OR ".join(
+            f'protein_name:"{n}" OR gene:"{n}"'
+            for n in (name.replace('"', "") for name in chunk)
+        )
+        chunks[f"({clauses}) AND organism_id:9606"] = chunk
+
+    queries = (
+        {
+            "format": "tsv",
+            "fields": "accession,gene_names,protein_name,reviewed",
+            "query": query,
+        }
+        for query in chunks
+    )
+
+    failed = 0
+    updates = {}
+    for params, response in uniprot_client.fetch_ordered(
+        queries, url=url, session=session, max_workers=max_workers
+    ):
+        chunk = chunks[params["query"]]
+        if response is None or not response.ok:
+            failed += len(chunk)
+            continue
+        rows = list(csv.DictReader(StringIO(response.text), delimiter="\t"))
+        for name in chunk:
+            updates[name] = _best_accession(name, rows) or now
+
+    _update_name_cache(cache_path, updates)
+    cache.update(updates)
+
+    resolved = {
+        name: cache[name] if isinstance(cache[name], str) else None
+        for name in uniprot_names
+        if name in cache
+    }
+    return resolved, failed
 
 
 def get_uniprot_seqs_from_names(uniprot_names, filepath):
     """
     Search UniProt by protein/gene names, download corresponding sequences, and save to multi-FASTA.
 
+    Names are resolved to accessions in batches (see :func:`resolve_names`)
+    and the sequences are then fetched with :func:`get_uniprot_seqs`.
+
     Parameters
     ----------
     uniprot_names : list of str
@@ -55,48 +301,15 @@ def get_uniprot_seqs_from_names(uniprot_names, filepath):
     filepath : str
         Path to the output multi-FASTA file.
     """
-    if os.path.exists(filepath):
-        os.remove(filepath)
-
-    base_search_url = "https://rest.uniprot.org/uniprotkb/search"
-    base_fasta_url = "https://rest.uniprot.org/uniprotkb/{}.fasta"
-
-    not_found = downloaded = failed = d_failed = 0
-
-    with open(filepath, "w") as out_f:
-        for name in uniprot_names:
-            params = {
-                "query": f'(protein_name:"{name}" OR gene:"{name}") AND organism_id:9606',
-                "fields": "accession",
-                "format": "json",
-                "size": 1,
-            }
-
-            search_resp = requests.get(
-                base_search_url, params=params, timeout=30
-            )
-            if search_resp.ok:
-                results = search_resp.json()
-                if results.get("results"):
-                    accession = results["results"][0]["primaryAccession"]
-                    fasta_resp = requests.get(
-                        base_fasta_url.format(accession), timeout=30
-                    )
-                    if fasta_resp.ok:
-                        out_f.write(fasta_resp.text)
-                        downloaded += 1
-                    else:
-                        d_failed += 1
-                else:
-                    not_found += 1
-            else:
-                failed += 1
+    resolved, failed = resolve_names(uniprot_names)
+    accessions = sorted({acc for acc in resolved.values() if acc is not None})
+    not_found = sum(1 for acc in resolved.values() if acc is None)
+
+    get_uniprot_seqs(accessions, filepath)
 
     print(f"\nDid not find {not_found} entries")
     print(f"{failed} entries failed")
-    print(
-        f"Downloaded {downloaded} entries and {d_failed} failed to download\n"
-    )
+    print(f"Resolved {len(accessions)} unique accessions\n")
 
 
 def swiss_prot(ptm_dir, url):
@@ -144,48 +357,107 @@ def ncbi(ptm_dir, query):
     print("NCBI download successful")
 
 
-def db_ptm(ptm_dir, urls):
+def stream_gzip_lines(url):
     """
-    Download and extract UniProt IDs from dbPTM, then fetch corresponding FASTA sequences.
+    Stream a remote gzip archive and yield its decompressed lines.
+
+    The archive is decompressed on the fly; neither the compressed nor the
+    decompressed file is written to disk.
+
+    Parameters
+    ----------
+    url : str
+        URL of a .gz file.
+
+    Yields
+    ------
+    str
+        Decoded lines; undecodable bytes are replaced.
+    """
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with gzip.GzipFile(fileobj=response.raw) as gz:
+            yield from io.TextIOWrapper(gz, errors="replace")
+
+
+def scan_db_ptm(urls):
+    """
+    Extract human UniProt IDs from dbPTM archives in a single streamed pass.
 
     Parameters
     ----------
-    ptm_dir : str
-        Directory to store the output files.
     urls : list of str
         Download URLs for dbPTM .gz files.
-    """
-    zippath = os.path.join(ptm_dir, "dbPTM.gz")
-    txtpath = os.path.join(ptm_dir, "dbPTM.txt")
-    filepath = os.path.join(ptm_dir, "dbPTM.fasta")
 
+    Returns
+    -------
+    list of str
+        Unique UniProt IDs.
+    """
+    uniprot_ids = set()
     for url in urls:
-        response = requests.get(url, timeout=30)
-        if response.ok:
-            with open(zippath, "wb") as f:
-                f.write(response.content)
-        else:
-            print("Failed to download file:", response.status_code)
-        with gzip.open(zippath, "rb") as f_in, open(txtpath, "ab") as f_out:
-            shutil.copyfileobj(f_in, f_out)
-
-    uniprot_ids = []
-    with open(txtpath, "r") as f:
-        for line in f:
+        for line in stream_gzip_lines(url):
             if "\x00" in line:
                 continue
             idx = line.find("HUMAN")
             if idx != -1:
                 words = line[idx + len("HUMAN") :].strip().split()
                 if words:
-                    uniprot_ids.append(words[0])
+                    uniprot_ids.add(words[0])
+    return sorted(uniprot_ids)
 
-    get_uniprot_seqs(list(set(uniprot_ids)), filepath)
 
-    if os.path.exists(zippath):
-        os.remove(zippath)
-    if os.path.exists(txtpath):
-        os.remove(txtpath)
+def scan_ptm_code2(ptm_code2_words):
+    """
+    Extract human protein names for several PTM keywords from PTMcode2.
+
+    The PTMcode2 archive is downloaded once and scanned once for all keywords.
+
+    Parameters
+    ----------
+    ptm_code2_words : list of str
+        Keywords to filter PTMcode2 entries for each target PTM.
+
+    Returns
+    -------
+    dict
+        Keyword mapped to the sorted list of unique protein names.
+    """
+    uniprot_names = {word: set() for word in ptm_code2_words}
+    for line in stream_gzip_lines(PTM_CODE2_URL):
+        idx = line.find("Homo sapiens")
+        if idx == -1:
+            continue
+        words = line[:idx].strip().split()
+        if not words:
+            continue
+        for word, names in uniprot_names.items():
+            if word in line:
+                names.add(words[0])
+    return {word: sorted(names) for word, names in uniprot_names.items()}
+
+
+def db_ptm(ptm_dir, urls, uniprot_ids=None):
+    """
+    Download and extract UniProt IDs from dbPTM, then fetch corresponding FASTA sequences.
+
+    Parameters
+    ----------
+    ptm_dir : str
+        Directory to store the output files.
+    urls : list of str
+        Download URLs for dbPTM .gz files.
+    uniprot_ids : list of str, optional
+        IDs already extracted by the shared archive stage; the archives are
+        only scanned here if this is None.
+    """
+    filepath = os.path.join(ptm_dir, "dbPTM.fasta")
+
+    if uniprot_ids is None:
+        uniprot_ids = scan_db_ptm(urls)
+
+    get_uniprot_seqs(uniprot_ids, filepath)
 
     print("dbPTM download successful")
 
@@ -234,7 +506,7 @@ def ptmd(ptm_dir, ptm, url, ptmd_word):
     print("ptmd download successful")
 
 
-def ptm_code2(ptm_dir, ptm_code2_word):
+def ptm_code2(ptm_dir, ptm_code2_word, uniprot_names=None):
     """
     Download PTMcode2 data, extract human proteins, and fetch corresponding FASTA sequences.
 
@@ -244,38 +516,16 @@ def ptm_code2(ptm_dir, ptm_code2_word):
         Directory to store the output files.
     ptm_code2_word : str
         Keyword to filter PTMcode2 entries for the target PTM.
+    uniprot_names : list of str, optional
+        Names already extracted by the shared archive stage; the archive is
+        only scanned here if this is None.
     """
-    zippath = os.path.join(ptm_dir, "PTMcode2.zip")
-    txtpath = os.path.join(ptm_dir, "PTMcode2_associations_within_proteins.txt")
     filepath = os.path.join(ptm_dir, "PTMcode2.fasta")
-    url = "https://ptmcode.embl.de/data/PTMcode2_associations_within_proteins.txt.gz"
-
-    response = requests.get(url, timeout=30)
-    if response.ok:
-        with open(zippath, "wb") as f:
-            f.write(response.content)
-    else:
-        print("Failed to download file:", response.status_code)
 
-    with gzip.open(zippath, "rb") as f_in, open(txtpath, "ab") as f_out:
-        shutil.copyfileobj(f_in, f_out)
+    if uniprot_names is None:
+        uniprot_names = scan_ptm_code2([ptm_code2_word])[ptm_code2_word]
 
-    uniprot_names = []
-    with open(txtpath, "r") as f:
-        for line in f:
-            if ptm_code2_word in line:
-                idx = line.find("Homo sapiens")
-                if idx != -1:
-                    words = line[:idx].strip().split()
-                    if words:
-                        uniprot_names.append(words[0])
-
-    get_uniprot_seqs_from_names(list(set(uniprot_names)), filepath)
-
-    if os.path.exists(zippath):
-        os.remove(zippath)
-    if os.path.exists(txtpath):
-        os.remove(txtpath)
+    get_uniprot_seqs_from_names(uniprot_names, filepath)
 
     print("PTMcode2 download successful")
 
@@ -316,7 +566,7 @@ def unipep(ptm_dir):
         Directory to store the output file.
     """
     filepath = os.path.join(ptm_dir, "unipep.fasta")
-    url = "https://db.systemsbiology.net/sbeams/cgi/Glycopeptide/browse_glycopeptides.cgi"
+    url = UNIPEP_URL
 
     response = requests.get(url, timeout=30)
     if response.ok:
@@ -332,7 +582,145 @@ def unipep(ptm_dir):
     print("Unipep download successful")
 
 
-def databases(
+def _host(url):
+    """Return the host name of a URL, used as its concurrency-limit key."""
+    return urlparse(url).hostname
+
+
+def run_scheduled(tasks, host_limits=HOST_LIMITS):
+    """
+    Run download tasks concurrently with per-host concurrency limits.
+
+    A task is only started when its host has a free slot, so independent
+    sources run side by side while each server sees at most its configured
+    number of concurrent downloads. Failing tasks are reported and do not stop
+    the remaining ones; callers pass the results to :func:`raise_failures`.
+
+    Parameters
+    ----------
+    tasks : list of tuple
+        ``(label, host, function, args)`` per task. Tasks whose host is not in
+        ``host_limits`` (e.g. local files) are not limited.
+    host_limits : dict
+        Maximum number of concurrent tasks per host.
+
+    Returns
+    -------
+    list of tuple
+        ``(label, seconds, error)`` per task in completion order; ``error`` is
+        None for successful tasks.
+    """
+    pending = collections.deque(tasks)
+    running = {}
+    active = collections.Counter()
+    results = []
+
+    def timed(function, args):
+        start = time.perf_counter()
+        function(*args)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, len(tasks))) as executor:
+        while pending or running:
+            for _ in range(len(pending)):
+                label, host, function, args = pending.popleft()
+                if active[host] >= host_limits.get(host, len(tasks)):
+                    pending.append((label, host, function, args))
+                    continue
+                active[host] += 1
+                running[executor.submit(timed, function, args)] = (
+                    label,
+                    host,
+                    time.perf_counter(),
+                )
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                label, host, start = running.pop(future)
+                active[host] -= 1
+                error = future.exception()
+                seconds = time.perf_counter() - start
+                if error is None:
+                    seconds = future.result()
+                    print(f"[{seconds:7.1f}s] {label} done")
+                else:
+                    print(f"[{seconds:7.1f}s] {label} FAILED: {error!r}")
+                results.append((label, seconds, error))
+
+    failed = [label for label, _, error in results if error is not None]
+    print(f"\n{len(results) - len(failed)}/{len(results)} downloads successful")
+    for label in failed:
+        print(f"Failed: {label}")
+    return results
+
+
+def raise_failures(results, what):
+    """
+    Raise if any task of :func:`run_scheduled` failed.
+
+    Parameters
+    ----------
+    results : list of tuple
+        Results returned by :func:`run_scheduled`.
+    what : str
+        Description of the tasks for the error message.
+
+    Raises
+    ------
+    RuntimeError
+        Listing the labels of the failed tasks.
+    """
+    failed = [label for label, _, error in results if error is not None]
+    if failed:
+        raise RuntimeError(f"{what} failed: {', '.join(failed)}")
+
+
+def _collect(results, key, function, *args):
+    """Store the return value of ``function(*args)`` under ``results[key]``."""
+    results[key] = function(*args)
+
+
+def archive_stage(archive_configs):
+    """
+    Download the shared dbPTM and PTMcode2 archives once for all PTMs.
+
+    Each archive is streamed through gzip decompression without temporary
+    files. PTMcode2 is scanned once for the keywords of every PTM; the dbPTM
+    archives of the PTMs are scanned concurrently.
+
+    Parameters
+    ----------
+    archive_configs : list of tuple
+        ``(ptm_dir, db_ptm_urls, ptm_code2_word)`` per PTM.
+
+    Returns
+    -------
+    dict
+        ``{"dbPTM": {ptm_dir: ids}, "PTMcode2": {ptm_code2_word: names}}``
+        to fan out to the PTM directories via :func:`database_tasks`.
+    """
+    archives = {"dbPTM": {}}
+    words = [word for _, _, word in archive_configs]
+    tasks = [
+        (
+            "archives/PTMcode2",
+            _host(PTM_CODE2_URL),
+            _collect,
+            (archives, "PTMcode2", scan_ptm_code2, words),
+        )
+    ]
+    for ptm_dir, urls, _ in archive_configs:
+        tasks.append((
+            f"archives/{ptm_dir}/dbPTM",
+            _host(urls[0]),
+            _collect,
+            (archives["dbPTM"], ptm_dir, scan_db_ptm, urls),
+        ))
+
+    raise_failures(run_scheduled(tasks), "Archive download")
+    return archives
+
+
+def database_tasks(
     ptm_dir,
     swiss_prot_url,
     query,
@@ -341,9 +729,10 @@ def databases(
     ptmd_url,
     ptmd_word,
     ptm_code2_word,
+    archives=None,
 ):
     """
-    Orchestrates downloading all databases for a specific PTM.
+    Build the download tasks of all databases for a specific PTM.
 
     Parameters
     ----------
@@ -363,22 +752,112 @@ def databases(
         Keyword to filter PTMD entries.
     ptm_code2_word : str
         Keyword to filter PTMcode2 entries.
+    archives : dict, optional
+        Output of :func:`archive_stage`. If given, the dbPTM and PTMcode2
+        tasks reuse the IDs extracted there instead of downloading the
+        archives again.
+
+    Returns
+    -------
+    list of tuple
+        Tasks for :func:`run_scheduled`, labelled ``<ptm_dir>/<source>``.
     """
-    swiss_prot(ptm_dir, swiss_prot_url)
-    ncbi(ptm_dir, query)
-    db_ptm(ptm_dir, db_ptm_urls)
-    ptmd(ptm_dir, ptm, ptmd_url, ptmd_word)
-    ptm_code2(ptm_dir, ptm_code2_word)
+    db_ptm_args = (ptm_dir, db_ptm_urls)
+    ptm_code2_args = (ptm_dir, ptm_code2_word)
+    db_ptm_host = _host(db_ptm_urls[0])
+    ptm_code2_host = _host(PTM_CODE2_URL)
+    if archives is not None:
+        db_ptm_args += (archives["dbPTM"][ptm_dir],)
+        ptm_code2_args += (archives["PTMcode2"][ptm_code2_word],)
+        db_ptm_host = ptm_code2_host = UNIPROT_HOST
+
+    tasks = [
+        (
+            "swissProt",
+            _host(swiss_prot_url),
+            swiss_prot,
+            (ptm_dir, swiss_prot_url),
+        ),
+        ("ncbi", NCBI_HOST, ncbi, (ptm_dir, query)),
+        ("dbPTM", db_ptm_host, db_ptm, db_ptm_args),
+        ("ptmd", _host(ptmd_url), ptmd, (ptm_dir, ptm, ptmd_url, ptmd_word)),
+        ("PTMcode2", ptm_code2_host, ptm_code2, ptm_code2_args),
+    ]
 
     if ptm != "S-Nitrosylation":
-        qptm(ptm_dir, ptm)
+        tasks.append(("qPTM", None, qptm, (ptm_dir, ptm)))
         if ptm == "Glycosylation":
-            unipep(ptm_dir)
+            tasks.append(("unipep", _host(UNIPEP_URL), unipep, (ptm_dir,)))
+
+    return [
+        (f"{ptm_dir}/{label}", host, function, args)
+        for label, host, function, args in tasks
+    ]
+
+
+def databases(
+    ptm_dir,
+    swiss_prot_url,
+    query,
+    db_ptm_urls,
+    ptm,
+    ptmd_url,
+    ptmd_word,
+    ptm_code2_word,
+):
+    """
+    Orchestrates downloading all databases for a specific PTM.
+
+    The sources are downloaded concurrently (see :func:`run_scheduled`).
+
+    Parameters
+    ----------
+    ptm_dir : str
+        Directory to store database files.
+    swiss_prot_url : str
+        URL for SwissProt FASTA download.
+    query : str
+        NCBI query string for the PTM.
+    db_ptm_urls : list of str
+        List of dbPTM download URLs.
+    ptm : str
+        Target PTM type.
+    ptmd_url : str
+        URL for PTMD download.
+    ptmd_word : str
+        Keyword to filter PTMD entries.
+    ptm_code2_word : str
+        Keyword to filter PTMcode2 entries.
+
+    Raises
+    ------
+    RuntimeError
+        If any source failed to download.
+    """
+    results = run_scheduled(
+        database_tasks(
+            ptm_dir,
+            swiss_prot_url,
+            query,
+            db_ptm_urls,
+            ptm,
+            ptmd_url,
+            ptmd_word,
+            ptm_code2_word,
+        )
+    )
+    raise_failures(results, "Download")
 
 
 def main():
     """
-    Main entry point: sets up directories and downloads all PTM datasets sequentially.
+    Main entry point: sets up directories and downloads all PTM datasets concurrently.
+
+    Raises
+    ------
+    RuntimeError
+        If any source failed to download, so the pipeline does not record
+        the download stage as complete.
     """
     print("Starting downloads...")
 
@@ -436,6 +915,7 @@ def main():
         ),
     ]
 
+    configs = []
     for (
         ptm_name,
         kw,
@@ -448,10 +928,7 @@ def main():
     ) in ptm_configs:
         dir_name = os.path.join("data", "ptms", ptm_name, "databases")
         os.makedirs(dir_name, exist_ok=True)
-
-        print("=====\t", ptmd_word, "\t=====")
-
-        databases(
+        configs.append((
             dir_name,
             f"https://rest.uniprot.org/uniprotkb/stream?format=fasta&query=((organism_id:9606) AND (reviewed:true) AND (keyword:{kw}))",
             query,
@@ -460,8 +937,22 @@ def main():
             ptmd_url,
             ptmd_word,
             ptm_code2_word,
-        )
+        ))
+
+    start = time.perf_counter()
+    archives = archive_stage([
+        (dir_name, db_urls, ptm_code2_word)
+        for dir_name, _, _, db_urls, _, _, _, ptm_code2_word in configs
+    ])
+
+    tasks = []
+    for config in configs:
+        tasks += database_tasks(*config, archives=archives)
+
+    results = run_scheduled(tasks)
+    print(f"Downloads finished in {time.perf_counter() - start:.1f}s")
 
+    raise_failures(results, "Download")
     print("All downloads successful\n")
 
 
@@ -0,0 +1,96 @@
+"""
+Lightweight multi-FASTA reader for hot paths.
+
+Most stages only need the header line and the sequence string of each entry.
+Instead of building a SeqRecord per entry like Bio.SeqIO, this reader maps the
+file into memory and splits it on record boundaries, yielding plain
+(header, sequence) string pairs or a columnar batch of them.
+"""
+
+import mmap
+import os
+
+_WHITESPACE = b" \t\r\n"
+
+
+def _iter_raw(mm):
+    """
+    Split a memory-mapped multi-FASTA file into raw records.
+
+    Args:
+        mm (mmap.mmap): Memory-mapped file contents.
+
+    Yields:
+        tuple: (header bytes, sequence bytes) for each record.
+    """
+    if mm[:1] == b">":
+        start = 0
+    else:
+        start = mm.find(b"\n>")
+        if start == -1:
+            return
+        start += 1
+    size = len(mm)
+    while start < size:
+        line_end = mm.find(b"\n", start)
+        if line_end == -1:
+            yield mm[start + 1 :].rstrip(), b""
+            return
+        next_start = mm.find(b"\n>", line_end)
+        end = size if next_start == -1 else next_start
+        header = mm[start + 1 : line_end].rstrip()
+        seq = mm[line_end + 1 : end].translate(None, _WHITESPACE)
+        yield header, seq
+        if next_start == -1:
+            return
+        start = next_start + 1
+
+
+def read_fasta(filepath):
+    """
+    Iterate over the entries of a multi-FASTA file.
+
+    Args:
+        filepath (str): Path to a multi-FASTA file.
+
+    Yields:
+        tuple: (header, sequence) strings. The header is the description line
+        without the leading '>', as in SeqRecord.description.
+    """
+    with open(filepath, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for header, seq in _iter_raw(mm):
+                yield header.decode(errors="replace"), seq.decode()
+
+
+def read_sequences(filepath):
+    """
+    Read only the sequences of a multi-FASTA file.
+
+    Args:
+        filepath (str): Path to a multi-FASTA file.
+
+    Returns:
+        list of str: Sequences in file order.
+    """
+    return [seq for _, seq in read_fasta(filepath)]
+
+
+def read_batch(filepath):
+    """
+    Read a multi-FASTA file into a columnar batch.
+
+    Args:
+        filepath (str): Path to a multi-FASTA file.
+
+    Returns:
+        tuple: (list of headers, list of sequences) in file order.
+    """
+    headers = []
+    seqs = []
+    for header, seq in read_fasta(filepath):
+        headers.append(header)
+        seqs.append(seq)
+    return headers, seqs
@@ -0,0 +1,185 @@
+"""
+Single-pass statistics for multi-FASTA files.
+
+Sequence lengths, counts and short sequences are collected in one pass over a
+file and cached per file, keyed on its path, modification time and size.
+Later pipeline stages asking for the same file reuse the cached result instead
+of parsing it again; rewriting the file invalidates the entry. Results are
+kept in memory and in a sidecar file under STATS_DIR, so separate stage runs
+share them too.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import fasta_reader
+import numpy as np
+
+SHORT_LEN = 10
+STATS_DIR = os.path.join("data", "cache", "fasta_stats")
+
+_CACHE = {}
+
+
+def _scan(filepath, short_len):
+    """
+    Collect lengths and short sequences of a multi-FASTA file in one pass.
+
+    Args:
+        filepath (str): Path to a multi-FASTA file.
+        short_len (int): Sequences up to this length are collected.
+
+    Returns:
+        dict: Statistics with keys 'count', 'lengths' and 'short_seqs'.
+    """
+    lengths = []
+    short_seqs = []
+    for _, seq in fasta_reader.read_fasta(filepath):
+        lengths.append(len(seq))
+        if len(seq) <= short_len:
+            short_seqs.append(seq)
+    return {
+        "count": len(lengths),
+        "lengths": np.array(lengths, dtype=np.int32),
+        "short_seqs": short_seqs,
+    }
+
+
+def _sidecar(path, stats_dir):
+    """
+    Sidecar file holding the statistics of a FASTA file.
+
+    Args:
+        path (str): Absolute path of the FASTA file.
+        stats_dir (str): Directory of the sidecar files.
+
+    Returns:
+        str: Path of the sidecar file.
+    """
+    digest = hashlib.blake2b(path.encode(), digest_size=16).hexdigest()
+    return os.path.join(stats_dir, digest + ".npz")
+
+
+def _load_sidecar(sidecar, path, signature):
+    """
+    Read cached statistics, if they were stored for this file version.
+
+    Args:
+        sidecar (str): Path of the sidecar file.
+        path (str): Absolute path of the FASTA file.
+        signature (tuple): Modification time, size and short length.
+
+    Returns:
+        dict or None: Statistics, or None when missing or stale.
+    """
+    try:
+        with np.load(sidecar) as data:
+            if (
+                str(data["path"]) != path
+                or tuple(data["signature"].tolist()) != signature
+            ):
+                return None
+            return {
+                "count": len(data["lengths"]),
+                "lengths": data["lengths"].astype(np.int32),
+                "short_seqs": data["short_seqs"].tolist(),
+            }
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _save_sidecar(sidecar, path, signature, stats):
+    """
+    Write statistics through a temporary file that replaces the sidecar.
+
+    Args:
+        sidecar (str): Path of the sidecar file.
+        path (str): Absolute path of the FASTA file.
+        signature (tuple): Modification time, size and short length.
+        stats (dict): Statistics of the file.
+    """
+    directory = os.path.dirname(sidecar)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                path=np.array(path),
+                signature=np.array(signature, dtype=np.int64),
+                lengths=stats["lengths"],
+                short_seqs=np.array(stats["short_seqs"], dtype=str),
+            )
+        os.replace(tmp_path, sidecar)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def get_stats(filepath, short_len=SHORT_LEN, stats_dir=STATS_DIR):
+    """
+    Return the statistics of a multi-FASTA file, parsing it at most once.
+
+    Args:
+        filepath (str): Path to a multi-FASTA file.
+        short_len (int): Sequences up to this length are reported as short.
+        stats_dir (str): Directory of the sidecar files.
+
+    Returns:
+        dict: Statistics with keys 'count' (int), 'lengths' (np.ndarray of
+        int32) and 'short_seqs' (list of str).
+    """
+    path = os.path.abspath(filepath)
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size, short_len)
+    cached = _CACHE.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    sidecar = _sidecar(path, stats_dir)
+    stats = _load_sidecar(sidecar, path, signature)
+    if stats is None:
+        stats = _scan(path, short_len)
+        _save_sidecar(sidecar, path, signature, stats)
+    _CACHE[path] = (signature, stats)
+    return stats
+
+
+def count(filepath):
+    """
+    Count the sequences of a multi-FASTA file.
+
+    Args:
+        filepath (str): Path to a multi-FASTA file.
+
+    Returns:
+        int: Number of sequences.
+    """
+    return get_stats(filepath)["count"]
+
+
+def lengths(filepath):
+    """
+    Sequence lengths of a multi-FASTA file in file order.
+
+    Args:
+        filepath (str): Path to a multi-FASTA file.
+
+    Returns:
+        np.ndarray: Lengths as int32.
+    """
+    return get_stats(filepath)["lengths"]
+
+
+def percentile_cutoff(filepath, percentile=95):
+    """
+    Length cutoff at the given percentile of a multi-FASTA file.
+
+    Args:
+        filepath (str): Path to a multi-FASTA file.
+        percentile (float): Percentile of sequence lengths (default 95).
+
+    Returns:
+        float: Length at the requested percentile.
+    """
+    return np.percentile(lengths(filepath), percentile)
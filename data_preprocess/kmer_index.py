@@ -0,0 +1,140 @@
+"""
+Minimizer sketch index for near-identical sequence matching.
+
+Finds indexed sequences that contain a query sequence or are contained in it
+(isoforms, fragments, extended precursors) without comparing every pair.
+Each sequence is reduced to its (w, k)-minimizers: the smallest hashed k-mer
+of every window of w consecutive k-mers. If one sequence is a substring of
+another, every minimizer of the shorter one is also a minimizer of the
+longer one, so candidates are found by a sorted-array lookup and confirmed
+with an exact substring test.
+
+Sequences shorter than k + w - 1 residues have no complete window and are
+only matched exactly by the caller.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+K = 5
+W = 8
+
+_HASH_MULT = np.uint64(0x9E3779B97F4A7C15)
+
+
+def minimizers(seq, k=K, w=W):
+    """
+    Compute the unique (w, k)-minimizer hashes of a sequence.
+
+    Args:
+        seq (str): Protein sequence.
+        k (int): k-mer length.
+        w (int): Number of consecutive k-mers per window.
+
+    Returns:
+        np.ndarray: Sorted unique uint64 minimizer hashes; empty if the
+        sequence is shorter than k + w - 1.
+    """
+    if len(seq) < k + w - 1:
+        return np.empty(0, dtype=np.uint64)
+    codes = np.frombuffer(seq.encode(), dtype=np.uint8).astype(np.uint64)
+    shifts = np.arange(k, dtype=np.uint64) * np.uint64(8)
+    kmers = np.bitwise_or.reduce(
+        sliding_window_view(codes, k) << shifts, axis=1
+    )
+    hashes = kmers * _HASH_MULT
+    return np.unique(sliding_window_view(hashes, w).min(axis=1))
+
+
+def build_index(seqs, k=K, w=W):
+    """
+    Build a containment index over sequences.
+
+    Args:
+        seqs (list of str): Sequences to index.
+        k (int): k-mer length.
+        w (int): Number of consecutive k-mers per window.
+
+    Returns:
+        dict: Index with the sequences, sorted minimizer/id arrays for all
+        minimizers, and sorted representative (smallest) minimizers per
+        sequence.
+    """
+    all_hashes = []
+    all_ids = []
+    rep_hashes = []
+    rep_ids = []
+    for i, seq in enumerate(seqs):
+        mins = minimizers(seq, k, w)
+        if len(mins) == 0:
+            continue
+        all_hashes.append(mins)
+        all_ids.append(np.full(len(mins), i, dtype=np.int32))
+        rep_hashes.append(mins[0])
+        rep_ids.append(i)
+
+    def sorted_pairs(hashes, ids):
+        order = np.argsort(hashes, kind="stable")
+        return hashes[order], ids[order]
+
+    if all_hashes:
+        hashes, ids = sorted_pairs(
+            np.concatenate(all_hashes), np.concatenate(all_ids)
+        )
+    else:
+        hashes = np.empty(0, dtype=np.uint64)
+        ids = np.empty(0, dtype=np.int32)
+    reps, rep_ids = sorted_pairs(
+        np.array(rep_hashes, dtype=np.uint64), np.array(rep_ids, dtype=np.int32)
+    )
+    return {
+        "seqs": seqs,
+        "k": k,
+        "w": w,
+        "hashes": hashes,
+        "ids": ids,
+        "reps": reps,
+        "rep_ids": rep_ids,
+    }
+
+
+def _lookup(keys, values, queries):
+    left = np.searchsorted(keys, queries, side="left")
+    right = np.searchsorted(keys, queries, side="right")
+    if not np.any(right > left):
+        return np.empty(0, dtype=np.int32)
+    return np.unique(
+        np.concatenate([values[a:b] for a, b in zip(left, right) if b > a])
+    )
+
+
+def find_containing(index, seq):
+    """
+    Find indexed sequences that contain ``seq`` or are contained in it.
+
+    Args:
+        index (dict): Index built with build_index.
+        seq (str): Query sequence.
+
+    Returns:
+        list of int: Positions of matching sequences in the indexed list.
+    """
+    mins = minimizers(seq, index["k"], index["w"])
+    if len(mins) == 0:
+        return []
+    seqs = index["seqs"]
+    matches = []
+
+    # indexed sequence contained in the query: its smallest minimizer is
+    # one of the query's minimizers
+    for i in _lookup(index["reps"], index["rep_ids"], mins):
+        if seqs[i] in seq:
+            matches.append(int(i))
+
+    # query contained in an indexed sequence: the query's smallest minimizer
+    # is one of the indexed sequence's minimizers
+    for i in _lookup(index["hashes"], index["ids"], mins[:1]):
+        if len(seqs[i]) > len(seq) and seq in seqs[i]:
+            matches.append(int(i))
+
+    return sorted(set(matches))
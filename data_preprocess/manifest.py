@@ -0,0 +1,169 @@
+"""
+Stage manifest for incremental, resumable pipeline runs.
+
+Every pipeline stage records a fingerprint of its input files (content
+hashes) and parameters, together with the hashes of the files it produced. A
+stage is skipped when its fingerprint is unchanged and its recorded outputs
+are still on disk untouched. The manifest is written after each completed
+stage, so a crashed run resumes from the first stage that did not finish.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_PATH = os.path.join("data", "pipeline_manifest.json")
+
+_HASHES = {}
+
+
+def file_hash(path):
+    """
+    Content hash of a file, cached per path on modification time and size.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        str: Hex BLAKE2b digest of the file contents.
+    """
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _HASHES.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(2**20):
+            digest.update(chunk)
+    _HASHES[path] = (signature, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def expand(patterns):
+    """
+    Expand glob patterns into a sorted list of existing files.
+
+    Args:
+        patterns (list of str): File paths or glob patterns.
+
+    Returns:
+        list of str: Matching files.
+    """
+    return sorted({path for p in patterns for path in glob.glob(p)})
+
+
+def fingerprint(inputs, params):
+    """
+    Fingerprint of a stage's input files and parameters.
+
+    Args:
+        inputs (list of str): File paths or glob patterns.
+        params (dict): JSON-serialisable stage parameters.
+
+    Returns:
+        str: Hex digest identifying the inputs and parameters.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    for path in expand(inputs):
+        digest.update(f"{path}\0{file_hash(path)}\0".encode())
+    return digest.hexdigest()
+
+
+def load(path=MANIFEST_PATH):
+    """
+    Load the manifest.
+
+    Args:
+        path (str): Path of the manifest JSON file.
+
+    Returns:
+        dict: Stage name mapped to its recorded entry; empty if none exists.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(manifest, path=MANIFEST_PATH):
+    """
+    Atomically write the manifest.
+
+    Args:
+        manifest (dict): Stage entries.
+        path (str): Path of the manifest JSON file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_current(entry, key, outputs):
+    """
+    Check whether a recorded stage entry is still valid.
+
+    Args:
+        entry (dict): Recorded manifest entry of the stage, or None.
+        key (str): Current fingerprint of the stage.
+        outputs (list of str): Output file paths or glob patterns.
+
+    Returns:
+        bool: True if fingerprint and all recorded outputs are unchanged.
+    """
+    if entry is None or entry.get("fingerprint") != key:
+        return False
+    recorded = entry.get("outputs", {})
+    if not recorded or expand(outputs) != sorted(recorded):
+        return False
+    return all(
+        os.path.exists(path) and file_hash(path) == digest
+        for path, digest in recorded.items()
+    )
+
+
+def run_stage(
+    manifest, name, function, inputs, params, outputs, force=False, path=None
+):
+    """
+    Run a pipeline stage unless its inputs, parameters and outputs are unchanged.
+
+    Args:
+        manifest (dict): Manifest as returned by load; updated in place.
+        name (str): Stage name.
+        function (callable): Runs the stage; called without arguments.
+        inputs (list of str): Input file paths or glob patterns.
+        params (dict): JSON-serialisable stage parameters.
+        outputs (list of str): Output file paths or glob patterns.
+        force (bool): Run the stage even if it is up to date.
+        path (str): Manifest path; MANIFEST_PATH if None.
+
+    Returns:
+        bool: True if the stage ran, False if it was skipped.
+    """
+    key = fingerprint(inputs, params)
+    if not force and is_current(manifest.get(name), key, outputs):
+        print(f"===== {name}: up to date, skipped =====\n")
+        return False
+
+    print(f"===== {name} =====")
+    start = time.perf_counter()
+    manifest.pop(name, None)
+    save(manifest, path or MANIFEST_PATH)
+
+    function()
+
+    manifest[name] = {
+        "fingerprint": key,
+        "params": params,
+        "outputs": {p: file_hash(p) for p in expand(outputs)},
+        "seconds": round(time.perf_counter() - start, 1),
+        "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    save(manifest, path or MANIFEST_PATH)
+    return True
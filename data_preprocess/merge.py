@@ -3,14 +3,229 @@ Merge existing multi-FASTA files from different databases, remove duplicate sequ
 and generate sequence length visualizations. Also integrates disease annotation.
 """
 
+import hashlib
+import itertools
 import os
+import tempfile
+from array import array
 
 import disease
 import matplotlib.pyplot as plt
-from Bio import SeqIO
 
 
-def main(input_dir, output_dir):
+def seq_digest(seq):
+    """
+    Compute a fixed-size digest of a protein sequence for duplicate detection.
+
+    Parameters
+    ----------
+    seq : str or Bio.Seq.Seq
+        Protein sequence.
+
+    Returns
+    -------
+    bytes
+        16-byte BLAKE2b digest of the sequence.
+    """
+    return hashlib.blake2b(str(seq).encode(), digest_size=16).digest()
+
+
+def format_mims(mims):
+    """
+    Format a set of MIM annotations for a FASTA header.
+
+    Parameters
+    ----------
+    mims : set of str
+        MIM annotations, e.g. ``{"MIM:168600"}``.
+
+    Returns
+    -------
+    str
+        Space-prefixed, sorted MIM annotations or an empty string.
+    """
+    if not mims:
+        return ""
+    return " " + " ".join(sorted(mims))
+
+
+def dedup_records(records, rec_without_disease):
+    """
+    Remove duplicate sequences in a single pass, merging disease annotations.
+
+    Records are keyed on the digest of their sequence. Disease-annotated
+    records take precedence; duplicates of an already seen sequence have their
+    MIM annotations unioned into the first record. Records without disease
+    information are only kept if their sequence was not seen before.
+
+    Parameters
+    ----------
+    records : iterable of tuple
+        Disease records ``(accession, entry name, MIM string, sequence)``.
+    rec_without_disease : iterable of list of Bio.SeqRecord.SeqRecord
+        Non-UniProt records per database file.
+
+    Returns
+    -------
+    merged : dict
+        Digest mapped to ``[accession, name, set of MIMs, sequence]``. For
+        records without disease information the accession is ``None`` and
+        the name holds the full FASTA description.
+    stats : dict
+        Counts of input records, unique sequences, removed duplicates and
+        duplicates whose disease annotations were merged.
+    """
+    merged = {}
+    stats = {
+        "records": 0,
+        "unique": 0,
+        "duplicates": 0,
+        "merged_annotations": 0,
+    }
+
+    for acc, name, mim_string, seq in records:
+        stats["records"] += 1
+        mims = set(mim_string.split())
+        key = seq_digest(seq)
+        entry = merged.get(key)
+        if entry is None:
+            merged[key] = [acc, name, mims, seq]
+            continue
+        stats["duplicates"] += 1
+        if not mims <= entry[2]:
+            entry[2] |= mims
+            stats["merged_annotations"] += 1
+
+    for recs in rec_without_disease:
+        for r in recs:
+            stats["records"] += 1
+            seq = str(r.seq)
+            key = seq_digest(seq)
+            if key in merged:
+                stats["duplicates"] += 1
+            else:
+                merged[key] = [None, r.description, set(), seq]
+
+    stats["unique"] = len(merged)
+    return merged, stats
+
+
+def merge_in_memory(fasta_files, merged_file):
+    """
+    Merge multi-FASTA files into ``merged_file`` after loading all records.
+
+    Parameters
+    ----------
+    fasta_files : list of str
+        Multi-FASTA files to merge.
+    merged_file : str
+        Path of the merged multi-FASTA file to write.
+
+    Returns
+    -------
+    lens : list of int
+        Lengths of the written sequences.
+    stats : dict
+        Counts as returned by :func:`dedup_records`.
+    """
+    records = []
+    rec_without_disease = []
+    for filepath in fasta_files:
+        with_d, without_d = disease.main(filepath)
+        records.append(with_d)
+        rec_without_disease.append(without_d)
+
+    merged, stats = dedup_records(
+        itertools.chain.from_iterable(records), rec_without_disease
+    )
+
+    lens = []
+    with open(merged_file, "w") as merged_out:
+        for acc, name, mims, seq in merged.values():
+            if acc is None:
+                merged_out.write(f">{name}\n{seq}\n")
+            else:
+                merged_out.write(f">{acc}|{name}{format_mims(mims)}\n{seq}\n")
+            lens.append(len(seq))
+    return lens, stats
+
+
+def merge_streaming(fasta_files, merged_file):
+    """
+    Merge multi-FASTA files into ``merged_file`` without holding them in memory.
+
+    Disease records are streamed batch by batch from UniProt and their
+    sequences spooled to an anonymous temporary file in the directory of
+    ``merged_file``, which is removed even if the merge fails; only a digest
+    index with entry names and MIM annotations is kept in memory.
+    Records without disease information are streamed from the input files in
+    a second pass and appended directly.
+
+    Parameters
+    ----------
+    fasta_files : list of str
+        Multi-FASTA files to merge.
+    merged_file : str
+        Path of the merged multi-FASTA file to write.
+
+    Returns
+    -------
+    lens : array.array
+        Lengths of the written sequences.
+    stats : dict
+        Same counts as returned by :func:`dedup_records`.
+    """
+    index = {}
+    lens = array("I")
+    stats = {
+        "records": 0,
+        "unique": 0,
+        "duplicates": 0,
+        "merged_annotations": 0,
+    }
+    spool_dir = os.path.dirname(merged_file) or "."
+
+    with tempfile.TemporaryFile(dir=spool_dir) as spool:
+        for filepath in fasta_files:
+            ids = disease.iter_ids(filepath)
+            for acc, name, mim_string, seq in disease.iter_records(ids):
+                stats["records"] += 1
+                mims = set(mim_string.split())
+                key = seq_digest(seq)
+                entry = index.get(key)
+                if entry is None:
+                    index[key] = (acc, name, mims, len(seq))
+                    spool.write(seq.encode())
+                    continue
+                stats["duplicates"] += 1
+                if not mims <= entry[2]:
+                    entry[2].update(mims)
+                    stats["merged_annotations"] += 1
+
+        spool.seek(0)
+        with open(merged_file, "w") as merged_out:
+            for key, (acc, name, mims, length) in index.items():
+                seq = spool.read(length).decode()
+                merged_out.write(f">{acc}|{name}{format_mims(mims)}\n{seq}\n")
+                lens.append(length)
+                index[key] = None
+
+            for filepath in fasta_files:
+                for r in disease.iter_other_records(filepath):
+                    stats["records"] += 1
+                    key = seq_digest(r.seq)
+                    if key in index:
+                        stats["duplicates"] += 1
+                        continue
+                    index[key] = None
+                    merged_out.write(f">{r.description}\n{r.seq}\n")
+                    lens.append(len(r.seq))
+
+    stats["unique"] = len(index)
+    return lens, stats
+
+
+def main(input_dir, output_dir, streaming=False):
     """
     Merge multi-FASTA files from a directory, remove duplicate sequences,
     annotate sequences with disease information, and generate histograms and boxplots.
@@ -21,58 +236,30 @@ def main(input_dir, output_dir):
         Directory containing multi-FASTA files to merge.
     output_dir : str
         Directory to save the merged multi-FASTA file and visualizations.
+    streaming : bool
+        Stream the databases into the merged file instead of loading every
+        record into memory first (see :func:`merge_streaming`).
     """
     merged_file = os.path.join(output_dir, "merged.fasta")
     if os.path.exists(merged_file):
         os.remove(merged_file)
 
-    records = []
-    new_records = []
-    rec_without_disease = []
-    labels = []
-    all_lens = []
-
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".fasta"):
-            filepath = os.path.join(input_dir, filename)
-            with_d, without_d = disease.main(filepath)
-            rec_without_disease.append(without_d)
-            for record in with_d:
-                new_records.append(record)
-            all_records = records + new_records
-            all_records = list(set(all_records))
-            records = all_records
-            new_records = []
-            labels.append(filename.split(".")[0])
-            lens = [
-                len(record.seq) for record in SeqIO.parse(filepath, "fasta")
-            ]
-            all_lens.append(lens)
-
-    removed_duplicates = []
-    seen_seqs = []
-    for rec in records:
-        if rec[3] not in seen_seqs:
-            seen_seqs.append(rec[3])
-            removed_duplicates.append(rec)
-        else:
-            for i, sublist in enumerate(removed_duplicates):
-                if rec[3] == sublist[3]:
-                    mims = sublist[2] + rec[2]
-                    removed_duplicates.pop(i)
-                    removed_duplicates.append([rec[0], rec[1], mims, rec[3]])
+    fasta_files = [
+        os.path.join(input_dir, filename)
+        for filename in os.listdir(input_dir)
+        if filename.endswith(".fasta")
+    ]
 
-    lens = []
-    with open(merged_file, "w") as merged:
-        for rec in removed_duplicates:
-            merged.write(f">{rec[0]}|{rec[1]}{rec[2]}\n{rec[3]}\n")
-            lens.append(len(rec[3]))
-        for recs in rec_without_disease:
-            for r in recs:
-                if r.seq not in seen_seqs:
-                    merged.write(f">{r.description}\n{r.seq}\n")
-                    seen_seqs.append(r.seq)
-                    lens.append(len(r.seq))
+    if streaming:
+        lens, stats = merge_streaming(fasta_files, merged_file)
+    else:
+        lens, stats = merge_in_memory(fasta_files, merged_file)
+
+    print(
+        f"{output_dir}: {stats['records']} records, {stats['unique']} unique, "
+        f"{stats['duplicates']} duplicates removed, "
+        f"{stats['merged_annotations']} disease annotations merged"
+    )
 
     fig, axes = plt.subplots(1, 3)
     axes[0].hist(lens, bins=100)
@@ -3,114 +3,229 @@ Module for downloading and preparing negative (non-PTM) protein sequences.
 
 This script downloads protein sequences from SwissProt that do NOT have
 the specified PTMs and filters out sequences that overlap with positive
-PTM datasets to avoid false negatives.
+PTM datasets to avoid false negatives. A new PTM only needs an entry in
+KEYWORDS; its negatives are partitioned from the same download.
 
 Directory structure:
 - NO_PTM_DIR: stores the negative sequences
-- DIRS: paths to PTM directories for comparison
+- DIRS: paths to PTM directories for comparison, in the order of KEYWORDS
 """
 
+import csv
 import os
+import time
 
-import requests
-from Bio import SeqIO
+import accession_cache
+import fasta_reader
+import kmer_index
+import merge
+import uniprot_client
 
 NO_PTM_DIR = os.path.join("data", "no_ptm")
 
-DIRS = [
-    os.path.join("data", "ptms", "glycosylation"),
-    os.path.join("data", "ptms", "s_nitrosylation"),
-    os.path.join("data", "ptms", "acetylation"),
-    os.path.join("data", "ptms", "methylation"),
-]
+LISTING_PATH = os.path.join(NO_PTM_DIR, "swissprot_entries.tsv")
+
+KEYWORDS = {
+    "glycosylation": "KW-0325",
+    "s_nitrosylation": "KW-0702",
+    "acetylation": "KW-0007",
+    "methylation": "KW-0488",
+}
+
+# Bit i of the positive index and the i-th negative file both refer to the
+# i-th PTM of KEYWORDS.
+DIRS = [os.path.join("data", "ptms", ptm) for ptm in KEYWORDS]
+
+
+def swiss_prot_keywords(ttl_days=accession_cache.TTL_DAYS):
+    """
+    List all human reviewed SwissProt accessions with their keywords.
+
+    The listing is downloaded in a single request, together with every field
+    of the accession cache, and cached in NO_PTM_DIR; the cached file is
+    reused until it is older than ``ttl_days``. A fresh listing also fills
+    the accession cache, so the entries are not transferred a second time.
+
+    Args:
+        ttl_days (float): Maximum age of the cached listing in days.
+
+    Returns:
+        list of tuple: (accession, set of keyword IDs) per entry.
+    """
+    if not (
+        os.path.exists(LISTING_PATH)
+        and time.time() - os.path.getmtime(LISTING_PATH) < ttl_days * 86400
+    ):
+        params = {
+            "format": "tsv",
+            "fields": accession_cache.FIELDS + ",keywordid",
+            "query": "(organism_id:9606) AND (reviewed:true)",
+        }
+        tmp_path = LISTING_PATH + ".tmp"
+        with uniprot_client.host_slot(uniprot_client.STREAM_URL):
+            with uniprot_client.get_session().get(
+                uniprot_client.STREAM_URL,
+                params=params,
+                stream=True,
+                timeout=120,
+            ) as request:
+                request.raise_for_status()
+                with open(tmp_path, "wb") as f:
+                    for chunk in request.iter_content(chunk_size=2**20):
+                        f.write(chunk)
+        with open(tmp_path, newline="") as f:
+            accession_cache.store_rows(csv.DictReader(f, delimiter="\t"))
+        os.replace(tmp_path, LISTING_PATH)
+
+    with open(LISTING_PATH, newline="") as f:
+        rows = csv.DictReader(f, delimiter="\t")
+        return [
+            (
+                row["Entry"],
+                set(row.get("Keyword ID", "").replace(";", " ").split()),
+            )
+            for row in rows
+        ]
 
 
 def swiss_prot(files):
     """
     Download negative sequences from SwissProt for each PTM.
 
-    Each URL queries UniProt for human reviewed sequences excluding
-    the given PTM.
+    The human reviewed proteome is listed once with its keywords and the
+    negatives of every PTM are partitioned locally in a single pass: an entry
+    is written to each negative set whose PTM keyword it lacks. The listing
+    fills the local accession cache, from which the sequences are served.
 
     Args:
-        files (list of str): filenames to save downloaded sequences
+        files (list of str): filenames ``no_<ptm>.fasta`` to save the
+            sequences to; the PTM keyword is looked up in KEYWORDS.
     """
-    urls = [
-        "https://rest.uniprot.org/uniprotkb/stream?format=fasta&query=%28%28organism_id%3A9606%29+AND+%28reviewed%3Atrue%29+NOT+%28keyword%3AKW-0325%29%29",
-        "https://rest.uniprot.org/uniprotkb/stream?format=fasta&query=%28%28organism_id%3A9606%29+AND+%28reviewed%3Atrue%29+NOT+%28keyword%3AKW-0702%29%29",
-        "https://rest.uniprot.org/uniprotkb/stream?format=fasta&query=%28%28organism_id%3A9606%29+AND+%28reviewed%3Atrue%29+NOT+%28keyword%3AKW-0007%29%29",
-        "https://rest.uniprot.org/uniprotkb/stream?format=fasta&query=%28%28organism_id%3A9606%29+AND+%28reviewed%3Atrue%29+NOT+%28keyword%3AKW-0488%29%29",
+    keywords = [KEYWORDS[f[len("no_") : -len(".fasta")]] for f in files]
+    listing = swiss_prot_keywords()
+    entries = accession_cache.get_entries(acc for acc, _ in listing)
+
+    outputs = [
+        open(os.path.join(NO_PTM_DIR, f), "w", buffering=2**20) for f in files
     ]
+    try:
+        for acc, entry_keywords in listing:
+            entry = entries.get(acc)
+            if entry is None:
+                continue
+            record = f">{entry['header']}\n{entry['sequence']}\n"
+            for kw, out in zip(keywords, outputs):
+                if kw not in entry_keywords:
+                    out.write(record)
+    finally:
+        for out in outputs:
+            out.close()
+
+
+def positive_index(dirs=DIRS):
+    """
+    Build one hashed index of the positive sequences of all PTMs.
 
-    for i, url in enumerate(urls):
-        filepath = os.path.join(NO_PTM_DIR, files[i])
+    Args:
+        dirs (list of str): PTM directories containing 'merged.fasta'.
 
-        with requests.get(url, stream=True, timeout=120) as request:
-            request.raise_for_status()
-            with open(filepath, "wb") as f:
-                for chunk in request.iter_content(chunk_size=2**20):
-                    f.write(chunk)
+    Returns:
+        tuple: (dict mapping sequence digest to a bitmask of the PTMs in
+        ``dirs`` containing it, list of unique sequences, list of unique
+        positive counts per PTM)
+    """
+    index = {}
+    seqs = []
+    counts = []
+    for bit, ptm_dir in enumerate(dirs):
+        ptm_seqs = set(
+            fasta_reader.read_sequences(os.path.join(ptm_dir, "merged.fasta"))
+        )
+        counts.append(len(ptm_seqs))
+        for seq in ptm_seqs:
+            key = merge.seq_digest(seq)
+            if key not in index:
+                index[key] = 0
+                seqs.append(seq)
+            index[key] |= 1 << bit
+    return index, seqs, counts
 
 
-def filter_false_negatives(files):
+def filter_false_negatives(files, near_identical=False):
     """
     Remove sequences from negative datasets that also exist in positive PTM datasets.
 
-    This avoids potential false negatives when training models.
+    This avoids potential false negatives when training models. The positive
+    sequences of all PTMs are indexed once; each negative file is then
+    streamed once and written with buffered output.
 
     Args:
-        files (list of str): filenames of negative sequences to filter
+        files (list of str): filenames ``no_<ptm>.fasta`` of negative
+            sequences to filter; the PTM is looked up in KEYWORDS
+        near_identical (bool): Also remove negatives that contain, or are
+            contained in, a positive sequence of the same PTM (isoforms,
+            fragments), using a minimizer index (see kmer_index.py).
     """
-    for i, file in enumerate(files):
-        compare_path = os.path.join(DIRS[i], "merged.fasta")
+    index, positives, counts = positive_index()
+    sketch = None
+    if near_identical:
+        sketch = kmer_index.build_index(positives)
+        masks = [index[merge.seq_digest(seq)] for seq in positives]
+
+    ptms = list(KEYWORDS)
+    for file in files:
+        i = ptms.index(file[len("no_") : -len(".fasta")])
+        bit = 1 << i
         target_path = os.path.join(NO_PTM_DIR, file)
+        filtered_path = os.path.join(NO_PTM_DIR, f"filtered_{file}")
 
-        compare_seqs = {
-            str(record.seq) for record in SeqIO.parse(compare_path, "fasta")
-        }
-        target_seqs = {
-            str(record.seq) for record in SeqIO.parse(target_path, "fasta")
-        }
+        target_seqs = set()
+        filtered_seqs = set()
+        common_seqs = set()
+        near_seqs = set()
+
+        with open(filtered_path, "w", buffering=2**20) as filtered:
+            for header, seq in fasta_reader.read_fasta(target_path):
+                key = merge.seq_digest(seq)
+                target_seqs.add(key)
+                if index.get(key, 0) & bit:
+                    common_seqs.add(key)
+                    continue
+                if sketch is not None and any(
+                    masks[j] & bit
+                    for j in kmer_index.find_containing(sketch, seq)
+                ):
+                    near_seqs.add(key)
+                    continue
+                filtered_seqs.add(key)
+                filtered.write(f">{header}\n{seq}\n")
 
-        common_seqs = compare_seqs & target_seqs
         print(DIRS[i])
         print(f"Count of common sequences: {len(common_seqs)}")
-
-        filtered_path = os.path.join(NO_PTM_DIR, f"filtered_{file}")
-        if os.path.exists(filtered_path):
-            os.remove(filtered_path)
-
-        with open(filtered_path, "w") as filtered:
-            for record in SeqIO.parse(target_path, "fasta"):
-                if record.seq not in common_seqs:
-                    SeqIO.write(record, filtered, "fasta")
-
-        filtered_seqs = {
-            str(record.seq) for record in SeqIO.parse(filtered_path, "fasta")
-        }
+        if sketch is not None:
+            print(f"Count of near-identical sequences: {len(near_seqs)}")
         print(
-            f"PTM: {len(compare_seqs)}, NO_PTM: {len(filtered_seqs)}, before Filter: {len(target_seqs)}"
+            f"PTM: {counts[i]}, NO_PTM: {len(filtered_seqs)}, before Filter: {len(target_seqs)}"
         )
         print(
             f"percent shared/filtered {len(filtered_seqs) / len(target_seqs)} \n"
         )
 
 
-def main():
+def main(near_identical=False):
     """
     Main function to download negative sequences and filter false negatives.
+
+    Args:
+        near_identical (bool): Also filter negatives that are near-identical
+            (substring containment) to a positive sequence.
     """
     os.makedirs(NO_PTM_DIR, exist_ok=True)
 
-    files = [
-        "no_glycosylation.fasta",
-        "no_s_nitrosylation.fasta",
-        "no_acetylation.fasta",
-        "no_methylation.fasta",
-    ]
+    files = [f"no_{ptm}.fasta" for ptm in KEYWORDS]
 
     swiss_prot(files)
     print("Downloads of negative sequences successful\n")
 
-    filter_false_negatives(files)
+    filter_false_negatives(files, near_identical=near_identical)
     print("\nFiltered out all false negatives")
@@ -0,0 +1,200 @@
+"""
+Pooled, concurrent client for the UniProt REST API.
+
+All UniProt requests share one requests.Session whose connection pool is sized
+to the number of concurrent requests. Transient failures (HTTP 429 and 5xx)
+are retried with exponential backoff, honouring Retry-After. Batches are
+fetched concurrently but handed back in submission order, so callers can
+stream results straight into an output file.
+
+Every request holds a slot of a per-host semaphore shared by all callers in
+the process, so parallel download tasks together never open more than
+HOST_CONNECTIONS requests to one server. Process pools extend the limit to
+their workers by creating the semaphores with shared_host_slots in the parent
+and installing them with use_host_slots as the pool's initializer.
+"""
+
+import collections
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+STREAM_URL = "https://rest.uniprot.org/uniprotkb/stream"
+SEARCH_URL = "https://rest.uniprot.org/uniprotkb/search"
+
+MAX_WORKERS = 4
+RETRIES = 5
+BACKOFF = 1.0
+RETRY_STATUS = (429, 500, 502, 503, 504)
+HOST_CONNECTIONS = 4
+
+_session = None
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+def make_session(pool_size=MAX_WORKERS, retries=RETRIES, backoff=BACKOFF):
+    """
+    Create a session with a connection pool and retry/backoff policy.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host.
+        retries (int): Maximum number of retries per request.
+        backoff (float): Backoff factor in seconds between retries.
+
+    Returns:
+        requests.Session: Configured session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Return the module-wide shared session, creating it on first use.
+
+    Returns:
+        requests.Session: Shared session.
+    """
+    global _session
+    if _session is None:
+        _session = make_session()
+    return _session
+
+
+def shared_host_slots(urls=(STREAM_URL,)):
+    """
+    Per-host semaphores that can be shared with worker processes.
+
+    Args:
+        urls (iterable of str): URLs of the hosts to bound.
+
+    Returns:
+        dict: Host mapped to a multiprocessing.BoundedSemaphore with
+        HOST_CONNECTIONS slots.
+    """
+    return {
+        urlparse(url).netloc: multiprocessing.BoundedSemaphore(HOST_CONNECTIONS)
+        for url in urls
+    }
+
+
+def use_host_slots(slots):
+    """
+    Bound requests by semaphores created in another process.
+
+    Meant as the initializer of a process pool, so the workers and the
+    parent draw from the same slots.
+
+    Args:
+        slots (dict): Output of shared_host_slots.
+    """
+    with _host_slots_lock:
+        _host_slots.update(slots)
+
+
+def host_slot(url):
+    """
+    Semaphore bounding the concurrent requests to the host of a URL.
+
+    Args:
+        url (str): Request URL.
+
+    Returns:
+        threading.BoundedSemaphore: Semaphore shared by all requests to the
+        host, with HOST_CONNECTIONS slots; the semaphore installed by
+        use_host_slots, if any, which also bounds other processes.
+    """
+    host = urlparse(url).netloc
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(HOST_CONNECTIONS)
+        return _host_slots[host]
+
+
+def _get(session, url, params, timeout):
+    try:
+        with host_slot(url):
+            return session.get(url, params=params, timeout=timeout)
+    except requests.RequestException as e:
+        print(f"Request failed: {e}")
+        return None
+
+
+def fetch_ordered(
+    params_list,
+    url=STREAM_URL,
+    session=None,
+    max_workers=MAX_WORKERS,
+    timeout=60,
+):
+    """
+    Fetch many parameter batches concurrently, yielding them in order.
+
+    At most ``max_workers`` requests of this call, and HOST_CONNECTIONS
+    requests to the host across all calls of the process (and of the other
+    workers of a pool initialised with use_host_slots), are in flight at any
+    time;
+    responses are yielded in the order of ``params_list`` as soon as they are
+    available.
+
+    Args:
+        params_list (iterable of dict): Query parameters per request.
+        url (str): Endpoint to query (e.g. a local stub server in tests).
+        session (requests.Session): Session to use; the shared session if None.
+        max_workers (int): Maximum number of concurrent requests.
+        timeout (float): Timeout per request in seconds.
+
+    Yields:
+        tuple: (params, requests.Response or None if the request failed)
+    """
+    session = session or get_session()
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for params in params_list:
+            pending.append((
+                params,
+                executor.submit(_get, session, url, params, timeout),
+            ))
+            if len(pending) >= max_workers:
+                params, future = pending.popleft()
+                yield params, future.result()
+        while pending:
+            params, future = pending.popleft()
+            yield params, future.result()
+
+
+def accession_batches(uniprot_ids, chunk_size, **params):
+    """
+    Build stream query parameters for chunks of accessions.
+
+    Args:
+        uniprot_ids (list of str): UniProt accession IDs.
+        chunk_size (int): Number of accessions per request.
+        **params: Additional query parameters (e.g. format, fields).
+
+    Yields:
+        dict: Query parameters for one chunk.
+    """
+    for i in range(0, len(uniprot_ids), chunk_size):
+        chunk = uniprot_ids[i : i + chunk_size]
+        query = " OR ".join([f"accession:{uid}" for uid in chunk])
+        yield {**params, "query": query}
@@ -11,8 +11,8 @@ Functions:
 import os
 import re
 
+import fasta_reader
 import matplotlib.pyplot as plt
-from Bio import SeqIO
 from venn import venn
 
 
@@ -31,11 +31,8 @@ def venn_ptm(ptms_dir):
     for d in os.listdir(ptms_dir):
         if os.path.isdir(os.path.join(ptms_dir, d)):
             names.append(d)
-            seq_set = set()
             filepath = os.path.join(ptms_dir, d, "merged.fasta")
-            for record in SeqIO.parse(filepath, "fasta"):
-                seq_set.add(record.seq)
-            sets.append(seq_set)
+            sets.append(set(fasta_reader.read_sequences(filepath)))
     dataset = dict(zip(names, sets))
     colors = ["#7570b3", "#d95f02", "#e7298a", "#1b9e77"]
     ax = venn(dataset, legend_loc=None, cmap=colors)
@@ -66,9 +63,9 @@ def venn_disease_ptm(ptms_dir):
             names.append(d)
             disease_set = set()
             filepath = os.path.join(ptms_dir, d, "merged.fasta")
-            for record in SeqIO.parse(filepath, "fasta"):
-                if "MIM:" in record.description:
-                    disease_set.add(record.seq)
+            for header, seq in fasta_reader.read_fasta(filepath):
+                if "MIM:" in header:
+                    disease_set.add(seq)
             diseases.append(disease_set)
     dataset = dict(zip(names, diseases))
     colors = ["#7570b3", "#d95f02", "#e7298a", "#1b9e77"]
@@ -101,6 +98,15 @@ def venn_mim_ids(ptms_dir):
     seqs = []
     names = []
 
+    annotated = []
+    for d in os.listdir(ptms_dir):
+        if os.path.isdir(os.path.join(ptms_dir, d)):
+            filepath = os.path.join(ptms_dir, d, "merged.fasta")
+            for header, seq in fasta_reader.read_fasta(filepath):
+                diseases_in_record = re.findall(r"MIM:(\d+)", header)
+                if diseases_in_record:
+                    annotated.append((diseases_in_record, seq))
+
     for filename in os.listdir(omim_dir):
         if filename.endswith("tsv") and filename[0] not in "._":
             mim_ids = []
@@ -113,16 +119,10 @@ def venn_mim_ids(ptms_dir):
                     if line[0] in "#*%":
                         mim_ids.append(line.split()[0][1:])
 
-            for d in os.listdir(ptms_dir):
-                if os.path.isdir(os.path.join(ptms_dir, d)):
-                    filepath = os.path.join(ptms_dir, d, "merged.fasta")
-                    for record in SeqIO.parse(filepath, "fasta"):
-                        diseases_in_record = re.findall(
-                            r"MIM:(\d+)", record.description
-                        )
-                        for dis in diseases_in_record:
-                            if dis in mim_ids:
-                                seq_set.add(record.seq)
+            mim_ids = set(mim_ids)
+            for diseases_in_record, seq in annotated:
+                if not mim_ids.isdisjoint(diseases_in_record):
+                    seq_set.add(seq)
             seqs.append(seq_set)
 
     dataset = dict(zip(names, seqs))
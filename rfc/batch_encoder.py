@@ -0,0 +1,146 @@
+"""
+Vectorised batch encoder for iCAN level-2 features.
+
+A batch of sequences is turned into one padded matrix of residue codes and
+one matrix of residue contexts (single, N-terminal, internal, C-terminal);
+the level-2 features of the whole batch are then a single fancy-indexing
+lookup into the residue table calibrated by ican_memo, with padding masked
+out by broadcasting. The columns are laid out as in iCAN's level-2 CSV:
+position by position, N_ATOMS values per position.
+"""
+
+import numpy as np
+
+RESIDUES = "ACDEFGHIKLMNPQRSTVWY"
+SINGLE, N_TERM, INTERNAL, C_TERM = range(4)
+N_ATOMS = 10
+HYDROGEN_COLUMNS = (0, 5)
+BATCH_SIZE = 4096
+
+_CODES = np.full(256, -1, dtype=np.int8)
+for _code, _residue in enumerate(RESIDUES):
+    _CODES[ord(_residue)] = _code
+
+
+def residue_codes(seqs):
+    """
+    Padded matrix of residue codes.
+
+    Args:
+        seqs (list of str): Sequences.
+
+    Returns:
+        tuple: (int8 codes of shape (len(seqs), longest length), -1 in the
+        padding and for unknown residues; int64 sequence lengths)
+    """
+    lengths = np.fromiter((len(seq) for seq in seqs), np.int64, len(seqs))
+    width = int(lengths.max()) if len(seqs) else 0
+    raw = np.frombuffer("".join(seqs).encode(), dtype=np.uint8)
+    rows = np.repeat(np.arange(len(seqs)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    cols = np.arange(len(raw)) - starts
+    codes = np.full((len(seqs), width), -1, dtype=np.int8)
+    codes[rows, cols] = _CODES[raw]
+    return codes, lengths
+
+
+def contexts(lengths, width):
+    """
+    Context matrix of a padded batch.
+
+    Args:
+        lengths (np.ndarray): Sequence lengths.
+        width (int): Padded length.
+
+    Returns:
+        np.ndarray: SINGLE, N_TERM, INTERNAL or C_TERM per position,
+        shape (len(lengths), width).
+    """
+    ctx = np.full((len(lengths), width), INTERNAL, dtype=np.int8)
+    rows = np.arange(len(lengths))
+    ctx[:, 0] = N_TERM
+    ctx[rows, lengths - 1] = C_TERM
+    ctx[lengths == 1, 0] = SINGLE
+    return ctx
+
+
+def encodable(seqs):
+    """
+    Which sequences consist only of residues in the table.
+
+    Args:
+        seqs (list of str): Sequences.
+
+    Returns:
+        np.ndarray: Boolean mask.
+    """
+    known = set(RESIDUES)
+    return np.array([bool(seq) and set(seq) <= known for seq in seqs])
+
+
+def encode_batch(seqs, table, with_hydrogen=True):
+    """
+    Level-2 features of a batch of sequences.
+
+    Args:
+        seqs (list of str): Sequences of residues in RESIDUES.
+        table (np.ndarray): Residue table calibrated by ican_memo, shape
+            (4 contexts, 20 residues, N_ATOMS).
+        with_hydrogen (bool): Keep the hydrogen columns; without them the
+            layout matches the 8 features per position of the
+            without-hydrogen alphabet.
+
+    Returns:
+        np.ndarray: float32 matrix, shape (len(seqs), longest length *
+        features per position), zero-padded like iCAN's CSV.
+    """
+    codes, lengths = residue_codes(seqs)
+    if (codes[np.arange(codes.shape[1]) < lengths[:, None]] < 0).any():
+        raise ValueError("sequences contain residues outside the table")
+    if not with_hydrogen:
+        table = np.delete(table, HYDROGEN_COLUMNS, axis=2)
+    ctx = contexts(lengths, codes.shape[1])
+    features = table[ctx, np.maximum(codes, 0)]
+    features *= (codes >= 0)[:, :, None]
+    return features.reshape(len(seqs), -1)
+
+
+def drop_hydrogen(names):
+    """
+    Remove the hydrogen columns from with-hydrogen feature names.
+
+    Args:
+        names (list of str): Names of a with-hydrogen encoding.
+
+    Returns:
+        list of str: Names of the matching without-hydrogen encoding.
+    """
+    per_position = np.array(names).reshape(-1, N_ATOMS)
+    return list(np.delete(per_position, HYDROGEN_COLUMNS, axis=1).ravel())
+
+
+def encode(seqs, table, with_hydrogen=True, batch_size=BATCH_SIZE):
+    """
+    Encode sequences batch by batch.
+
+    Sequences are grouped by length before batching, so little padding is
+    computed; rows are returned in input order without padding.
+
+    Args:
+        seqs (list of str): Sequences of residues in RESIDUES.
+        table (np.ndarray): Residue table.
+        with_hydrogen (bool): Keep the hydrogen columns.
+        batch_size (int): Sequences per batch.
+
+    Returns:
+        list of np.ndarray: Flattened float32 features per sequence.
+    """
+    per_position = N_ATOMS - (0 if with_hydrogen else 2)
+    order = np.argsort([len(seq) for seq in seqs], kind="stable")
+    rows = [None] * len(seqs)
+    for start in range(0, len(order), batch_size):
+        batch = order[start : start + batch_size]
+        matrix = encode_batch([seqs[i] for i in batch], table, with_hydrogen)
+        for row, i in zip(matrix, batch):
+            rows[i] = row[: len(seqs[i]) * per_position]
+    return rows
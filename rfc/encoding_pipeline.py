@@ -4,97 +4,93 @@ Random Forest classifiers with cross-validation. Supports parallel
 processing with progress bars.
 """
 
-import multiprocessing
+import argparse
 import os
 import sys
-import threading
-import time
 
 from Bio import SeqIO
-from joblib import Parallel, delayed
+from joblib import Parallel, delayed, parallel_config
 
 sys.path.append(os.path.abspath("data_preprocess"))
 sys.path.append(os.path.abspath("Source"))
 
-import ican
+import cluster
+import feature_store
+import ican_memo
+import progress
 import rfc_with_cv
+import shared_encoding
 
 
-def draw_progress(progress_dict, total_steps):
+def cpu_budget(cpus, jobs):
     """
-    Display dynamic terminal progress bars for multiple PTM encoding steps.
+    Split a CPU budget between concurrent PTM jobs and their forests.
 
     Args:
-        progress_dict (multiprocessing.Manager.dict): Dictionary holding
-            current progress for each key.
-        total_steps (dict): Dictionary with total steps for each key.
+        cpus (int): Total number of CPUs to use.
+        jobs (int): Number of PTM datasets to process.
+
+    Returns:
+        tuple: (number of concurrent PTM jobs, threads per job for the
+        Random Forest and BLAS/OpenMP)
     """
-    ESC = "\033"
-    CLEAR = f"{ESC}[2J"
-    HIDE_CURSOR = f"{ESC}[?25l"
-    SHOW_CURSOR = f"{ESC}[?25h"
-
-    sys.stdout.write(CLEAR + HIDE_CURSOR)
-    sys.stdout.flush()
-
-    try:
-        while True:
-            sys.stdout.write(f"{ESC}[H")
-            for key, total in total_steps.items():
-                current = progress_dict[key]
-                percent = current / total
-                bar_length = 40
-                filled = int(bar_length * percent)
-                progress_bar = "█" * filled + "-" * (bar_length - filled)
-                sys.stdout.write(
-                    f"{key:30} |{progress_bar}| {percent * 100:5.1f}%\n"
-                )
-            sys.stdout.flush()
-            time.sleep(0.1)
-            if all(progress_dict[k] >= total_steps[k] for k in progress_dict):
-                break
-    finally:
-        sys.stdout.write(SHOW_CURSOR)
-        sys.stdout.flush()
-
-
-def ican_parallel(seq_file, queue):
+    outer = max(1, min(jobs, cpus))
+    return outer, max(1, cpus // outer)
+
+
+def ican_parallel(seq_file, queue, n_jobs=-1, fast=True, plots=False):
     """
     Run iCAN encoding and Random Forest classification for a single
     multi-FASTA file, reporting progress to a queue.
 
     Args:
         seq_file (str): Path to the multi-FASTA file to encode.
-        queue (multiprocessing.Queue): Queue to report progress increments.
+        queue (progress.Counters): Writer of the progress counters.
+        n_jobs (int): Threads of the Random Forest (default: all CPUs).
+        fast (bool): Log one aggregated run instead of one run per fold.
+        plots (bool): In fast mode, also log the detailed plots of the last
+            fold.
     """
     output_dir = os.path.dirname(seq_file)
     ptm = output_dir.split("/")[-1]
     csv_dir = os.path.join(output_dir, f"iCAN_encoding_{ptm}")
-    sys.argv = [
-        "ican.py",
-        f"--output_path={csv_dir}",
-        "--alphabet_mode=with_hydrogen",
-        seq_file,
-    ]
-
-    ican.main(
+    ican_memo.call_ican(
+        [f"--output_path={csv_dir}", "--alphabet_mode=with_hydrogen", seq_file],
         queue=queue,
         smiles_key=f"{ptm}/smiles",
         encode_key=f"{ptm}/encode",
     )
+    progress.flush(queue)
 
     y_path = seq_file.replace("seqs.fasta", "classes.txt")
-    X_path = f"{csv_dir}/iCAN_level_2_with_hydrogen.csv"
-    rfc_with_cv.main(X_path, y_path, "1", "with_hydrogen")
+    X_path = feature_store.from_csv(f"{csv_dir}/iCAN_level_2_with_hydrogen.csv")
+    rfc_with_cv.main(
+        X_path,
+        y_path,
+        "1",
+        "with_hydrogen",
+        fast=fast,
+        plots=plots,
+        n_jobs=n_jobs,
+    )
 
 
-def run_parallel_with_bars(ptms_dir):
+def run_parallel_with_bars(ptms_dir, cpus=None, fast=True, plots=False):
     """
     Run iCAN encoding in parallel for all PTM directories, with live
     progress bars for each PTM's smiles and encoding steps.
 
+    The CPU budget is divided between the concurrent PTM workers and the
+    threads of each worker's Random Forest; BLAS/OpenMP pools inside the
+    workers are capped to the same share, so the machine is not
+    oversubscribed.
+
     Args:
         ptms_dir (str): Path to the parent directory containing PTM subdirectories.
+        cpus (int): Total CPU budget (default: all usable CPUs).
+        fast (bool): Log one aggregated run per PTM instead of one per fold.
+        plots (bool): In fast mode, also log the detailed plots of the last
+            fold.
     """
 
     def count_fasta_entries(file_path):
@@ -112,30 +108,112 @@ def run_parallel_with_bars(ptms_dir):
             steps_total[f"{ptm_dir}/smiles"] = x
             steps_total[f"{ptm_dir}/encode"] = x
 
-    manager = multiprocessing.Manager()
-    progress_dict = manager.dict({key: 0 for key in steps_total})
-    queue = manager.Queue()
+    queue = progress.start(steps_total)
+
+    jobs, threads = cpu_budget(cpus or cluster.cpu_count(), len(seqs))
+    print(f"{jobs} PTM workers x {threads} threads")
+    with parallel_config(backend="loky", inner_max_num_threads=threads):
+        Parallel(n_jobs=jobs)(
+            delayed(ican_parallel)(seq, queue, threads, fast, plots)
+            for seq in seqs
+        )
+    queue.close()
+
+
+def train_ptm(
+    seq_file, X_path, n_jobs=-1, memory_mb=None, fast=True, plots=False
+):
+    """
+    Train and evaluate the Random Forest of one PTM.
+
+    Args:
+        seq_file (str): Path to the PTM's seqs.fasta.
+        X_path (str): Feature store directory of the PTM.
+        n_jobs (int): Threads of the Random Forest (default: all CPUs).
+        memory_mb (float): Memory budget of the training in MB.
+        fast (bool): Log one aggregated run instead of one run per fold.
+        plots (bool): In fast mode, also log the detailed plots of the last
+            fold.
+    """
+    y_path = seq_file.replace("seqs.fasta", "classes.txt")
+    rfc_with_cv.main(
+        X_path,
+        y_path,
+        "1",
+        "with_hydrogen",
+        fast=fast,
+        plots=plots,
+        n_jobs=n_jobs,
+        memory_mb=memory_mb,
+    )
+
+
+def run_shared(ptms_dir, cpus=None, fast=True, plots=False):
+    """
+    Encode the unique sequences of all PTMs once, then train every PTM.
 
-    threading.Thread(
-        target=draw_progress, args=(progress_dict, steps_total), daemon=True
-    ).start()
+    Sequences occurring in several PTM datasets are encoded a single time
+    into a shared feature store (see shared_encoding), from which the X
+    matrix of every PTM is assembled before the forests are trained in
+    parallel.
 
-    # Queue-Listener updates the progress dictionary
-    def progress_updater():
-        while True:
-            key, delta = queue.get()
-            progress_dict[key] += delta
-            if all(progress_dict[k] >= steps_total[k] for k in steps_total):
-                break
+    Args:
+        ptms_dir (str): Path to the parent directory containing PTM subdirectories.
+        cpus (int): Total CPU budget (default: all usable CPUs).
+        fast (bool): Log one aggregated run per PTM instead of one per fold.
+        plots (bool): In fast mode, also log the detailed plots of the last
+            fold.
+    """
+    cpus = cpus or cluster.cpu_count()
+    seq_files = [
+        os.path.join(ptms_dir, ptm, "seqs.fasta")
+        for ptm in sorted(os.listdir(ptms_dir))
+        if os.path.isdir(os.path.join(ptms_dir, ptm))
+    ]
+    unique, index = shared_encoding.collect(seq_files)
+    total = sum(len(rows) for rows in index.values())
+    print(f"{len(unique)} unique of {total} sequences to encode")
+    ican_memo.prepare(max(len(seq) for seq in unique))
 
-    threading.Thread(target=progress_updater, daemon=True).start()
+    queue = None
+    if not shared_encoding.is_encoded(unique):
+        missing = len(shared_encoding.pending(unique))
+        if missing:
+            queue = progress.start({
+                "shared/smiles": missing,
+                "shared/encode": missing,
+            })
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        store = shared_encoding.encode_unique(unique, queue, shards=cpus)
+    if queue is not None:
+        queue.close()
 
-    Parallel(n_jobs=-1)(delayed(ican_parallel)(seq, queue) for seq in seqs)
+    jobs, threads = cpu_budget(cpus, len(seq_files))
+    memory = cluster.budget(jobs)[1]
+    X_paths = []
+    for seq_file in seq_files:
+        ptm = os.path.basename(os.path.dirname(seq_file))
+        X_paths.append(
+            shared_encoding.ptm_store(
+                store,
+                index[seq_file],
+                unique,
+                os.path.join(
+                    os.path.dirname(seq_file), f"iCAN_encoding_{ptm}", "shared"
+                ),
+                chunk_mb=memory / rfc_with_cv.TRAINING_COPIES,
+            )
+        )
 
-    time.sleep(0.5)
+    print(f"{jobs} PTM workers x {threads} threads")
+    with parallel_config(backend="loky", inner_max_num_threads=threads):
+        Parallel(n_jobs=jobs)(
+            delayed(train_ptm)(seq_file, X_path, threads, memory, fast, plots)
+            for seq_file, X_path in zip(seq_files, X_paths)
+        )
 
 
-def main():
+def main(cpus=None, shared=True, fast=True, plots=False):
     """
     Main function to run the encoding pipeline.
 
@@ -143,10 +221,49 @@ def main():
         1. Optionally run the preprocessing pipeline (commented out).
         2. Run parallel iCAN encoding and Random Forest classification
            with live progress bars for all PTM multi-FASTA datasets.
+
+    Args:
+        cpus (int): Total CPU budget (default: all usable CPUs).
+        shared (bool): Encode sequences shared between PTMs once instead of
+            running iCAN per PTM.
+        fast (bool): Log one aggregated run per PTM instead of one per fold.
+        plots (bool): In fast mode, also log the detailed plots of the last
+            fold.
     """
     # data_pipeline.main()
-    run_parallel_with_bars("data/ptms")
+    if shared:
+        run_shared("data/ptms", cpus, fast, plots)
+    else:
+        run_parallel_with_bars("data/ptms", cpus, fast, plots)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Encode PTMs and train RFs.")
+    parser.add_argument(
+        "--cpus",
+        type=int,
+        default=None,
+        help="total CPU budget shared by PTM workers and forests",
+    )
+    parser.add_argument(
+        "--per-ptm-encoding",
+        action="store_true",
+        help="run iCAN on every PTM separately instead of once on all",
+    )
+    parser.add_argument(
+        "--per-fold",
+        action="store_true",
+        help="log every fold as its own W&B run with all plots",
+    )
+    parser.add_argument(
+        "--plots",
+        action="store_true",
+        help="also log the detailed plots of the last fold in the summary",
+    )
+    args = parser.parse_args()
+    main(
+        cpus=args.cpus,
+        shared=not args.per_ptm_encoding,
+        fast=not args.per_fold,
+        plots=args.plots,
+    )
@@ -0,0 +1,474 @@
+"""
+Binary feature store for iCAN encodings.
+
+The level-2 CSV written by iCAN is converted once, chunk by chunk, into a
+float32 matrix with a JSON sidecar holding the feature names, the storage
+format and the size and modification time of the source CSV.
+
+The matrix is padded to the longest sequence, so most columns of short
+sequences are zero. By default a matrix is stored as CSR (.npz) whenever
+that is smaller than the dense array, so memory follows the number of
+encoded residues rather than the padded length; RandomForestClassifier
+consumes CSR directly. Denser matrices are stored as .npy and memory
+mapped, so only the rows of the current fold are paged in.
+
+Large encodings are written as a chunked store instead: a sequence of
+fixed-size row chunks, each saved as soon as it is encoded, optionally with
+the dataset row of every chunk row. Readers iterate over the chunks, so
+memory is bounded by the chunk size rather than the dataset size.
+"""
+
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+MATRIX = "features.npy"
+SPARSE_MATRIX = "features.npz"
+META = "feature_names.json"
+CHUNK_ROWS = 1000
+# CSR keeps a float32 value and an int32 column index per non-zero (8 bytes)
+# where a dense matrix keeps 4 bytes per cell, so below half non-zero values
+# CSR is the smaller format. Padding to the longest sequence typically keeps
+# iCAN matrices well below that, so they are stored sparse by default.
+DENSITY_CUTOFF = 0.5
+
+
+def clear(directory):
+    """
+    Remove the matrix files of a store, keeping the directory.
+
+    Args:
+        directory (str): Feature store directory.
+    """
+    patterns = [MATRIX, SPARSE_MATRIX, "chunk_*", "positions_*", META]
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(directory, pattern)):
+            os.remove(path)
+
+
+def store_dir(csv_path):
+    """
+    Directory of the feature store belonging to an iCAN CSV.
+
+    Args:
+        csv_path (str): Path to the iCAN CSV file.
+
+    Returns:
+        str: Sibling directory named after the CSV.
+    """
+    return os.path.splitext(csv_path)[0] + "_store"
+
+
+def _source(csv_path):
+    """Size and modification time identifying a CSV file's contents."""
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def is_current(directory, csv_path, sparse="auto"):
+    """
+    Check whether a feature store matches its source CSV.
+
+    Args:
+        directory (str): Feature store directory.
+        csv_path (str): Source CSV file.
+        sparse (bool or str): Requested format, True for CSR, False for
+            dense or 'auto' for either.
+
+    Returns:
+        bool: True if the store exists, was built from the CSV as it is and
+        has the requested format.
+    """
+    try:
+        with open(os.path.join(directory, META)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if meta.get("source") != _source(csv_path):
+        return False
+    if sparse != "auto" and meta.get("sparse") != sparse:
+        return False
+    matrix = SPARSE_MATRIX if meta.get("sparse") else MATRIX
+    return os.path.exists(os.path.join(directory, matrix))
+
+
+def _count_rows(csv_path):
+    """Number of data rows of a CSV file with a header line."""
+    lines = 0
+    last = b"\n"
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(0, lines - 1)
+
+
+def _write_meta(directory, names, sparse, density, source):
+    """Write the JSON sidecar of a single-matrix store."""
+    with open(os.path.join(directory, META), "w") as f:
+        json.dump(
+            {
+                "names": list(names),
+                "sparse": bool(sparse),
+                "density": density,
+                "source": source,
+            },
+            f,
+        )
+
+
+def from_csv(csv_path, directory=None, chunk_rows=CHUNK_ROWS, sparse="auto"):
+    """
+    Convert an iCAN CSV file into a feature store.
+
+    The CSV is read in chunks of rows. In 'auto' mode the format is chosen
+    from the density of the first chunk; every chunk is then written
+    straight into the store (rows of a memory-mapped .npy, or CSR blocks),
+    so neither the float64 frame nor a second copy of the matrix is held in
+    memory.
+
+    Args:
+        csv_path (str): Path to the iCAN CSV file.
+        directory (str): Store directory (default: store_dir(csv_path)).
+        chunk_rows (int): Rows parsed per chunk.
+        sparse (bool or str): Store as CSR (True), dense (False), or CSR if
+            fewer than DENSITY_CUTOFF of the values of the first chunk are
+            non-zero ('auto').
+
+    Returns:
+        str: Path of the store directory.
+
+    Raises:
+        ValueError: If the CSV changed while it was converted.
+    """
+    directory = directory or store_dir(csv_path)
+    if is_current(directory, csv_path, sparse):
+        return directory
+    os.makedirs(directory, exist_ok=True)
+
+    names = list(pd.read_csv(csv_path, nrows=0).columns)
+    n_rows = _count_rows(csv_path)
+    source = _source(csv_path)
+    reader = pd.read_csv(csv_path, chunksize=chunk_rows, dtype=np.float32)
+    clear(directory)
+
+    nnz = 0
+    written = 0
+    blocks = []
+    dense = None
+    tmp = os.path.join(directory, f"{MATRIX}.tmp")
+    for chunk in reader:
+        values = chunk.to_numpy()
+        nonzero = np.count_nonzero(values)
+        if sparse == "auto":
+            sparse = nonzero / max(1, values.size) < DENSITY_CUTOFF
+        if sparse:
+            blocks.append(sp.csr_matrix(values))
+        else:
+            if dense is None:
+                dense = np.lib.format.open_memmap(
+                    tmp, mode="w+", dtype=np.float32, shape=(n_rows, len(names))
+                )
+            dense[written : written + len(values)] = values
+        nnz += nonzero
+        written += len(values)
+    if written != n_rows:
+        raise ValueError(f"{csv_path} changed while it was converted")
+    density = nnz / max(1, n_rows * len(names))
+    if sparse == "auto":
+        sparse = False
+
+    if sparse:
+        matrix = sp.vstack(blocks, format="csr", dtype=np.float32)
+        del blocks
+        tmp = os.path.join(directory, "tmp_" + SPARSE_MATRIX)
+        sp.save_npz(tmp, matrix, compressed=False)
+        os.replace(tmp, os.path.join(directory, SPARSE_MATRIX))
+    else:
+        if dense is None:
+            dense = np.lib.format.open_memmap(
+                tmp, mode="w+", dtype=np.float32, shape=(n_rows, len(names))
+            )
+        dense.flush()
+        del dense
+        os.replace(tmp, os.path.join(directory, MATRIX))
+    _write_meta(directory, names, sparse, density, source)
+    return directory
+
+
+def save(
+    matrix, names, directory, sparse="auto", source=None, chunk_rows=CHUNK_ROWS
+):
+    """
+    Write a feature matrix to a store directory.
+
+    Args:
+        matrix (np.ndarray or scipy.sparse matrix): Feature matrix.
+        names (list of str): Feature names, one per column.
+        directory (str): Store directory, created if needed.
+        sparse (bool or str): Store as CSR (True), dense (False), or CSR if
+            fewer than DENSITY_CUTOFF of the values are non-zero ('auto').
+        source (dict): Identification of the data the matrix was built
+            from, checked by is_current.
+        chunk_rows (int): Rows densified at a time for dense stores.
+
+    Returns:
+        str: Path of the store directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix = sp.csr_matrix(matrix, dtype=np.float32)
+    density = matrix.nnz / max(1, matrix.shape[0] * matrix.shape[1])
+    if sparse == "auto":
+        sparse = density < DENSITY_CUTOFF
+
+    clear(directory)
+    if sparse:
+        tmp = os.path.join(directory, "tmp_" + SPARSE_MATRIX)
+        sp.save_npz(tmp, matrix, compressed=False)
+        os.replace(tmp, os.path.join(directory, SPARSE_MATRIX))
+    else:
+        tmp = os.path.join(directory, f"{MATRIX}.tmp")
+        dense = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=np.float32, shape=matrix.shape
+        )
+        for start in range(0, matrix.shape[0], chunk_rows):
+            dense[start : start + chunk_rows] = matrix[
+                start : start + chunk_rows
+            ].toarray()
+        dense.flush()
+        del dense
+        os.replace(tmp, os.path.join(directory, MATRIX))
+
+    _write_meta(directory, names, sparse, density, source)
+    return directory
+
+
+def _chunk_path(directory, number, sparse):
+    """Path of one chunk of a chunked store."""
+    suffix = "npz" if sparse else "npy"
+    return os.path.join(directory, f"chunk_{number:05d}.{suffix}")
+
+
+def write_chunk(directory, number, matrix, positions=None, sparse="auto"):
+    """
+    Save one row chunk of a chunked store.
+
+    Args:
+        directory (str): Feature store directory, created if needed.
+        number (int): Chunk number, starting at 0.
+        matrix (np.ndarray or scipy.sparse matrix): Rows of the chunk.
+        positions (np.ndarray): Dataset row of every chunk row, if chunks
+            do not hold consecutive rows.
+        sparse (bool or str): Save as CSR (True), dense (False), or CSR if
+            fewer than DENSITY_CUTOFF of the values are non-zero ('auto').
+
+    Returns:
+        dict: Chunk entry for save_chunked.
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix = sp.csr_matrix(matrix, dtype=np.float32)
+    if sparse == "auto":
+        cells = max(1, matrix.shape[0] * matrix.shape[1])
+        sparse = matrix.nnz / cells < DENSITY_CUTOFF
+    path = _chunk_path(directory, number, sparse)
+    if sparse:
+        sp.save_npz(path, matrix, compressed=False)
+    else:
+        np.save(path, matrix.toarray())
+    if positions is not None:
+        np.save(
+            os.path.join(directory, f"positions_{number:05d}.npy"),
+            np.asarray(positions, dtype=np.int64),
+        )
+    return {
+        "rows": matrix.shape[0],
+        "sparse": bool(sparse),
+        "positions": positions is not None,
+    }
+
+
+def save_chunked(directory, names, chunks, source=None):
+    """
+    Complete a chunked store by writing its metadata.
+
+    The metadata is written last, so an interrupted store is never taken
+    for a complete one.
+
+    Args:
+        directory (str): Feature store directory.
+        names (list of str): Feature names, one per column.
+        chunks (list of dict): Entries returned by write_chunk, in order.
+        source (dict): Identification of the data the store was built from.
+
+    Returns:
+        str: Path of the store directory.
+    """
+    with open(os.path.join(directory, META), "w") as f:
+        json.dump(
+            {
+                "names": list(names),
+                "chunks": chunks,
+                "source": source,
+            },
+            f,
+        )
+    return directory
+
+
+def read_meta(path):
+    """
+    Metadata of a store.
+
+    Args:
+        path (str): Feature store directory.
+
+    Returns:
+        dict: Names, format and chunk entries of the store.
+    """
+    with open(os.path.join(path, META)) as f:
+        return json.load(f)
+
+
+def rows_within(memory_mb, n_columns):
+    """
+    Rows of a dense float32 matrix that fit in a memory budget.
+
+    Args:
+        memory_mb (float): Memory budget in MB.
+        n_columns (int): Columns of the matrix.
+
+    Returns:
+        int: Number of rows, at least 1.
+    """
+    return max(1, int(memory_mb * 2**20) // (4 * max(1, n_columns)))
+
+
+def dense_mb(path):
+    """
+    Size of a chunked store's matrix as one dense float32 array.
+
+    Args:
+        path (str): Chunked feature store directory.
+
+    Returns:
+        float: Size in MB.
+    """
+    meta = read_meta(path)
+    rows = sum(chunk["rows"] for chunk in meta["chunks"])
+    return rows * len(meta["names"]) * 4 / 2**20
+
+
+def n_chunks(path):
+    """
+    Number of row chunks of a store.
+
+    Args:
+        path (str): Feature store directory or iCAN CSV file.
+
+    Returns:
+        int: Number of chunks; 1 for a single-matrix store.
+    """
+    if path.endswith(".csv"):
+        return 1
+    return len(read_meta(path).get("chunks", [None]))
+
+
+def read_chunk(path, number, mmap=True):
+    """
+    Load one chunk of a chunked store.
+
+    Args:
+        path (str): Feature store directory.
+        number (int): Chunk number.
+        mmap (bool): Memory map a dense chunk instead of reading it.
+
+    Returns:
+        tuple: (chunk matrix, dataset row of every chunk row)
+    """
+    chunk = read_meta(path)["chunks"][number]
+    chunk_path = _chunk_path(path, number, chunk["sparse"])
+    if chunk["sparse"]:
+        matrix = sp.load_npz(chunk_path).tocsr()
+    else:
+        matrix = np.load(chunk_path, mmap_mode="r" if mmap else None)
+    return matrix, chunk_positions(path, number)
+
+
+def chunk_positions(path, number):
+    """
+    Dataset rows of one chunk, without loading the chunk's matrix.
+
+    Args:
+        path (str): Feature store directory.
+        number (int): Chunk number.
+
+    Returns:
+        np.ndarray: Dataset row of every chunk row.
+    """
+    chunks = read_meta(path)["chunks"]
+    if chunks[number]["positions"]:
+        return np.load(os.path.join(path, f"positions_{number:05d}.npy"))
+    start = sum(c["rows"] for c in chunks[:number])
+    return np.arange(start, start + chunks[number]["rows"])
+
+
+def iter_chunks(path, mmap=True):
+    """
+    Iterate over the chunks of a chunked store.
+
+    Args:
+        path (str): Feature store directory.
+        mmap (bool): Memory map dense chunks instead of reading them.
+
+    Yields:
+        tuple: (chunk matrix, dataset row of every chunk row)
+    """
+    for number in range(n_chunks(path)):
+        yield read_chunk(path, number, mmap)
+
+
+def load(path, mmap=True):
+    """
+    Load a feature matrix and its feature names.
+
+    Chunked stores are assembled in dataset row order: into one dense
+    float32 array if every chunk was written dense, into one CSR matrix
+    otherwise.
+
+    Args:
+        path (str): Feature store directory, or an iCAN CSV file whose store
+            is built or refreshed first.
+        mmap (bool): Memory map a dense matrix instead of reading it.
+
+    Returns:
+        tuple: (float32 feature matrix, dense np.ndarray or
+        scipy.sparse.csr_matrix, list of feature names)
+    """
+    if path.endswith(".csv"):
+        path = from_csv(path)
+    meta = read_meta(path)
+    if "chunks" in meta and not any(c["sparse"] for c in meta["chunks"]):
+        rows = sum(chunk["rows"] for chunk in meta["chunks"])
+        matrix = np.empty((rows, len(meta["names"])), dtype=np.float32)
+        for chunk, positions in iter_chunks(path):
+            matrix[positions] = chunk
+    elif "chunks" in meta:
+        matrices, positions = zip(*iter_chunks(path))
+        matrix = sp.vstack(
+            [sp.csr_matrix(m, dtype=np.float32) for m in matrices],
+            format="csr",
+        )
+        matrix = matrix[np.argsort(np.concatenate(positions), kind="stable")]
+    elif meta.get("sparse"):
+        matrix = sp.load_npz(os.path.join(path, SPARSE_MATRIX)).tocsr()
+    else:
+        matrix = np.load(
+            os.path.join(path, MATRIX), mmap_mode="r" if mmap else None
+        )
+    return matrix, meta["names"]
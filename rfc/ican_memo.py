@@ -0,0 +1,345 @@
+"""
+Memoisation layer for iCAN level-2 encodings.
+
+The level-2 features of a residue depend only on the amino acid and on
+whether it is the first, an inner or the last residue of the peptide. A
+residue -> feature table is calibrated once by encoding short peptides
+through iCAN ('X', 'XGG', 'GXG', 'GGX' for every amino acid X) and is only
+trusted after it reproduces iCAN's output for a set of random validation
+sequences. Independently, every row that iCAN encodes is kept in a
+content-addressed SQLite cache keyed by the digest of the sequence, so a
+sequence is never passed through iCAN twice.
+
+Sequences with residues outside the table and all sequences when the table
+did not validate fall back to the full iCAN path.
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+import queue as queue_module
+import random
+import sqlite3
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath("data_preprocess"))
+sys.path.append(os.path.abspath("Source"))
+
+import batch_encoder
+import feature_store
+import ican
+import merge
+import progress
+
+MEMO_DIR = os.path.join("data", "encoding", "memo")
+DB_PATH = os.path.join(MEMO_DIR, "encodings.sqlite")
+TABLE_PATH = os.path.join(MEMO_DIR, "residue_table.npy")
+META_PATH = os.path.join(MEMO_DIR, "residue_table.json")
+LOCK_PATH = os.path.join(MEMO_DIR, "calibration.lock")
+ALPHABET_MODE = "with_hydrogen"
+N_ATOMS = batch_encoder.N_ATOMS
+CSV_NAME = f"iCAN_level_2_{ALPHABET_MODE}.csv"
+FILLER = "G"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS encodings (
+    digest BLOB PRIMARY KEY,
+    features BLOB NOT NULL
+);
+"""
+
+
+def call_ican(args, **kwargs):
+    """
+    Run ican.main with the given command-line arguments.
+
+    ican.main parses sys.argv, which is set for the call and restored
+    afterwards.
+
+    Args:
+        args (list of str): Command-line arguments after the program name.
+        **kwargs: Keyword arguments of ican.main.
+    """
+    argv = sys.argv
+    sys.argv = ["ican.py", *args]
+    try:
+        ican.main(**kwargs)
+    finally:
+        sys.argv = argv
+
+
+def run_ican(fasta_path, queue, key):
+    """
+    Encode a multi-FASTA file with iCAN.
+
+    Args:
+        fasta_path (str): Multi-FASTA file.
+        queue (progress.Counters): Writer of the progress counters.
+        key (str): Progress key prefix.
+
+    Returns:
+        str: Feature store directory of the encoding.
+    """
+    csv_dir = os.path.splitext(fasta_path)[0]
+    call_ican(
+        [
+            f"--output_path={csv_dir}",
+            f"--alphabet_mode={ALPHABET_MODE}",
+            fasta_path,
+        ],
+        queue=queue,
+        smiles_key=f"{key}/smiles",
+        encode_key=f"{key}/encode",
+    )
+    progress.flush(queue)
+    return feature_store.from_csv(os.path.join(csv_dir, CSV_NAME))
+
+
+def encode_with_ican(seqs):
+    """
+    Encode a small list of sequences with iCAN in a scratch directory.
+
+    Args:
+        seqs (list of str): Sequences.
+
+    Returns:
+        tuple: (dense float32 matrix, list of feature names)
+    """
+    os.makedirs(MEMO_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=MEMO_DIR) as tmp:
+        path = os.path.join(tmp, "seqs.fasta")
+        with open(path, "w") as f:
+            for i, seq in enumerate(seqs):
+                f.write(f">Seq{i}\n{seq}\n")
+        matrix, names = feature_store.load(
+            run_ican(path, queue_module.SimpleQueue(), "memo"), mmap=False
+        )
+        if hasattr(matrix, "toarray"):
+            matrix = matrix.toarray()
+    return np.asarray(matrix, dtype=np.float32), names
+
+
+def calibrate(n_validate=50, seed=42):
+    """
+    Build and validate the residue table through iCAN.
+
+    Args:
+        n_validate (int): Number of random validation sequences.
+        seed (int): Random seed of the validation sequences.
+
+    Returns:
+        tuple: (residue table, True if it reproduces iCAN)
+    """
+    calibration = []
+    for residue in batch_encoder.RESIDUES:
+        calibration += [
+            residue,
+            residue + FILLER * 2,
+            FILLER + residue + FILLER,
+            FILLER * 2 + residue,
+        ]
+    rng = random.Random(seed)
+    validation = [
+        "".join(rng.choices(batch_encoder.RESIDUES, k=rng.randint(2, 60)))
+        for _ in range(n_validate)
+    ]
+    matrix, names = encode_with_ican(calibration + validation)
+
+    n_residues = len(batch_encoder.RESIDUES)
+    table = np.zeros((4, n_residues, N_ATOMS), dtype=np.float32)
+    for code in range(n_residues):
+        rows = matrix[4 * code : 4 * code + 4]
+        for ctx, position in enumerate((0, 0, 1, 2)):
+            table[ctx, code] = rows[
+                ctx, position * N_ATOMS : (position + 1) * N_ATOMS
+            ]
+
+    longest = max(len(seq) for seq in calibration + validation)
+    expected = batch_encoder.encode_batch(validation, table)
+    valid = matrix.shape[1] == longest * N_ATOMS and np.allclose(
+        matrix[len(calibration) :, : expected.shape[1]], expected, atol=1e-5
+    )
+
+    os.makedirs(MEMO_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=MEMO_DIR, suffix=".npy", delete=False
+    ) as f:
+        np.save(f, table)
+    os.replace(f.name, TABLE_PATH)
+    _write_meta({"valid": bool(valid), "names": names})
+    return table, valid
+
+
+def _write_meta(meta):
+    """Replace the calibration metadata atomically."""
+    with tempfile.NamedTemporaryFile(
+        "w", dir=MEMO_DIR, suffix=".json", delete=False
+    ) as f:
+        json.dump(meta, f)
+    os.replace(f.name, META_PATH)
+
+
+@contextlib.contextmanager
+def _calibration_lock():
+    """Hold an exclusive lock on the calibration files."""
+    os.makedirs(MEMO_DIR, exist_ok=True)
+    with open(LOCK_PATH, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _read_meta():
+    """Calibration metadata, or None before the first calibration."""
+    try:
+        with open(META_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def prepare(n_positions=0):
+    """
+    Calibrate the residue table and cover n_positions feature names.
+
+    Calibration and the extension of the feature names run iCAN and write
+    the calibration files, so this is called once in the parent before
+    workers start; concurrent callers are serialised by a file lock and the
+    files are replaced atomically, so readers never see a partial file.
+    Longer sequences than seen before are covered by encoding one filler
+    sequence of that length.
+
+    Args:
+        n_positions (int): Number of residue positions to name.
+
+    Returns:
+        dict: Calibration metadata ('valid' and the feature 'names').
+    """
+    width = n_positions * N_ATOMS
+    meta = _read_meta()
+    if meta is not None and len(meta["names"]) >= width:
+        return meta
+    with _calibration_lock():
+        meta = _read_meta()
+        if meta is None:
+            calibrate()
+            meta = _read_meta()
+        if len(meta["names"]) < width:
+            _, meta["names"] = encode_with_ican([FILLER * n_positions])
+            _write_meta(meta)
+    return meta
+
+
+def load_table():
+    """
+    Load the residue table, calibrating it on first use.
+
+    Returns:
+        np.ndarray: Residue table, or None if it did not reproduce iCAN.
+    """
+    return np.load(TABLE_PATH) if prepare()["valid"] else None
+
+
+def feature_names(n_positions):
+    """
+    iCAN feature names for sequences of up to n_positions residues.
+
+    Names are taken from iCAN's own output (see prepare).
+
+    Args:
+        n_positions (int): Number of residue positions.
+
+    Returns:
+        list of str: n_positions * N_ATOMS feature names.
+    """
+    return prepare(n_positions)["names"][: n_positions * N_ATOMS]
+
+
+def connect(db_path=DB_PATH):
+    """
+    Open the encoding cache, creating it if needed.
+
+    Args:
+        db_path (str): Path of the SQLite file.
+
+    Returns:
+        sqlite3.Connection: Open connection.
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def cached(conn, seqs):
+    """
+    Look up cached encodings.
+
+    Args:
+        conn (sqlite3.Connection): Encoding cache.
+        seqs (list of str): Sequences.
+
+    Returns:
+        dict: Index into seqs -> flattened float32 features, for the
+        sequences found in the cache.
+    """
+    digests = [merge.seq_digest(seq) for seq in seqs]
+    position = {digest: i for i, digest in enumerate(digests)}
+    found = {}
+    for start in range(0, len(digests), 500):
+        chunk = digests[start : start + 500]
+        rows = conn.execute(
+            "SELECT digest, features FROM encodings WHERE digest IN "
+            f"({','.join('?' * len(chunk))})",
+            chunk,
+        )
+        for digest, features in rows:
+            found[position[digest]] = np.frombuffer(features, dtype=np.float32)
+    return found
+
+
+def remember(conn, seqs, rows):
+    """
+    Add encodings to the cache.
+
+    Args:
+        conn (sqlite3.Connection): Encoding cache.
+        seqs (list of str): Sequences.
+        rows (list of np.ndarray): Flattened features of every sequence.
+    """
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO encodings VALUES (?, ?)",
+            (
+                (merge.seq_digest(seq), np.asarray(row, np.float32).tobytes())
+                for seq, row in zip(seqs, rows)
+            ),
+        )
+
+
+def memoised(seqs, conn, table):
+    """
+    Encodings available without running iCAN.
+
+    Args:
+        seqs (list of str): Sequences.
+        conn (sqlite3.Connection): Encoding cache.
+        table (np.ndarray): Residue table, or None.
+
+    Returns:
+        dict: Index into seqs -> flattened float32 features.
+    """
+    found = cached(conn, seqs)
+    if table is not None:
+        todo = [
+            i
+            for i in np.flatnonzero(batch_encoder.encodable(seqs))
+            if i not in found
+        ]
+        rows = batch_encoder.encode([seqs[i] for i in todo], table)
+        found.update(zip(todo, rows))
+    return found
@@ -0,0 +1,205 @@
+"""
+Progress counters shared between processes.
+
+Workers report progress through a queue-compatible object: put((key, delta))
+only adds to a local buffer, which is flushed into an array of counters in
+shared memory every BATCH increments or FLUSH_INTERVAL seconds. Reporting a
+sequence therefore costs an array update instead of a round-trip to a
+manager process. The counters are a memory-mapped file in /dev/shm, so the
+writer can be pickled into loky workers by path; flushes are serialised
+with a file lock.
+
+A renderer thread in the parent polls the counters and draws them as
+progress bars on a terminal, or logs them as plain lines otherwise.
+"""
+
+import fcntl
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BATCH = 64
+FLUSH_INTERVAL = 0.2
+REDRAW_INTERVAL = 0.1
+LOG_INTERVAL = 10.0
+BAR_LENGTH = 40
+SHM_DIR = "/dev/shm"
+
+
+class Counters:
+    """
+    Queue-compatible writer of shared progress counters.
+
+    Args:
+        path (str): File backing the counters.
+        keys (list of str): Progress keys, one counter each.
+    """
+
+    def __init__(self, path, keys):
+        self.path = path
+        self.keys = list(keys)
+        self.slots = {key: i for i, key in enumerate(self.keys)}
+        self.counts = np.memmap(
+            path, dtype=np.int64, mode="r+", shape=(len(self.keys),)
+        )
+        self.pending = np.zeros(len(self.keys), dtype=np.int64)
+        self.n_pending = 0
+        self.flushed = time.monotonic()
+        self.renderer = None
+
+    def __reduce__(self):
+        return Counters, (self.path, self.keys)
+
+    def put(self, item):
+        """
+        Add a (key, delta) increment, flushing the buffer when it is due.
+
+        Args:
+            item (tuple): Progress key and increment.
+        """
+        key, delta = item
+        self.pending[self.slots[key]] += delta
+        self.n_pending += 1
+        if (
+            self.n_pending >= BATCH
+            or time.monotonic() - self.flushed >= FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self):
+        """Add the buffered increments to the shared counters."""
+        if self.n_pending:
+            with open(self.path, "rb") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                self.counts += self.pending
+            self.pending[:] = 0
+            self.n_pending = 0
+        self.flushed = time.monotonic()
+
+    def values(self):
+        """
+        Current counter values.
+
+        Returns:
+            dict: Count per progress key.
+        """
+        return dict(zip(self.keys, self.counts.tolist()))
+
+    def close(self):
+        """Draw the final state, stop the renderer and remove the counters."""
+        self.flush()
+        if self.renderer is not None:
+            thread, stop = self.renderer
+            stop.set()
+            thread.join()
+            self.renderer = None
+        del self.counts
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def flush(queue):
+    """
+    Flush the buffered increments of a progress writer.
+
+    Args:
+        queue: Counters writer; anything else is left alone.
+    """
+    if isinstance(queue, Counters):
+        queue.flush()
+
+
+def draw_bars(values, total_steps):
+    """
+    Redraw the progress bars in place.
+
+    Args:
+        values (dict): Current count per key.
+        total_steps (dict): Total steps per key.
+    """
+    sys.stdout.write("\033[H")
+    for key, total in total_steps.items():
+        percent = min(values[key] / total, 1.0)
+        filled = int(BAR_LENGTH * percent)
+        progress_bar = "█" * filled + "-" * (BAR_LENGTH - filled)
+        sys.stdout.write(f"{key:30} |{progress_bar}| {percent * 100:5.1f}%\n")
+    sys.stdout.flush()
+
+
+def log_lines(values, total_steps, logged):
+    """
+    Print one line per key whose count changed since it was last logged.
+
+    Args:
+        values (dict): Current count per key.
+        total_steps (dict): Total steps per key.
+        logged (dict): Count per key at the last log line, updated in place.
+    """
+    for key, total in total_steps.items():
+        if values[key] != logged.get(key):
+            print(
+                f"{key}: {values[key]}/{total} "
+                f"({values[key] / total * 100:.1f}%)",
+                flush=True,
+            )
+            logged[key] = values[key]
+
+
+def draw_progress(counters, total_steps, stop):
+    """
+    Poll the counters until stopped, as progress bars or log lines.
+
+    Args:
+        counters (Counters): Shared progress counters.
+        total_steps (dict): Total steps per key.
+        stop (threading.Event): Set when the work is done.
+    """
+    if not sys.stdout.isatty():
+        logged = {}
+        while not stop.wait(LOG_INTERVAL):
+            log_lines(counters.values(), total_steps, logged)
+        log_lines(counters.values(), total_steps, logged)
+        return
+
+    sys.stdout.write("\033[2J\033[?25l")
+    try:
+        while not stop.wait(REDRAW_INTERVAL):
+            draw_bars(counters.values(), total_steps)
+        draw_bars(counters.values(), total_steps)
+    finally:
+        sys.stdout.write("\033[?25h")
+        sys.stdout.flush()
+
+
+def start(total_steps):
+    """
+    Create the shared counters and start rendering them.
+
+    Args:
+        total_steps (dict): Total steps per key.
+
+    Returns:
+        Counters: Writer accepting (key, delta) increments; call close() on
+        it when the work is done.
+    """
+    fd, path = tempfile.mkstemp(
+        prefix="progress_",
+        dir=SHM_DIR if os.path.isdir(SHM_DIR) else None,
+    )
+    with os.fdopen(fd, "wb") as f:
+        f.write(np.zeros(len(total_steps), dtype=np.int64).tobytes())
+
+    counters = Counters(path, total_steps)
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=draw_progress,
+        args=(Counters(path, total_steps), dict(total_steps), stop),
+        daemon=True,
+    )
+    thread.start()
+    counters.renderer = (thread, stop)
+    return counters
@@ -7,17 +7,22 @@ logs model performance metrics, visualizes top features, and saves
 a heatmap of feature importances.
 """
 
+import os
+
+import feature_store
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+import splits
 import wandb
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import (
     accuracy_score,
+    auc,
     classification_report,
     matthews_corrcoef,
+    roc_curve,
 )
-from sklearn.model_selection import RepeatedStratifiedKFold
 from wandb.sklearn import (
     plot_class_proportions,
     plot_feature_importances,
@@ -35,24 +40,219 @@ def get_splits(dataset_size):
         dataset_size (int): Number of samples in the dataset.
 
     Returns:
-        int: Number of splits for RepeatedStratifiedKFold.
+        int: Number of folds per cross-validation repeat.
     """
     return int(np.round(dataset_size / (0.2 * dataset_size)))
 
 
-def main(X_dict, y_path, class_imbalance, hydro):
+ROC_GRID = np.linspace(0, 1, 101)
+# In-memory training holds the matrix plus the train and test fold buffers,
+# which together are about as large again.
+TRAINING_COPIES = 2
+
+
+def fit_out_of_core(store, y, train_index, n_jobs=-1, n_trees=100, seed=42):
+    """
+    Fit a Random Forest chunk by chunk on a chunked feature store.
+
+    The chunks are visited in a shuffled order; on each, a share of the
+    trees is grown with warm_start on the chunk's training rows, so only one
+    chunk is held in memory at a time. Chunks whose training rows hold a
+    single class are skipped and their trees are grown on the other chunks,
+    so the forest always has n_trees trees.
+
+    Args:
+        store (str): Chunked feature store directory.
+        y (np.ndarray): Labels of all rows.
+        train_index (np.ndarray): Training rows.
+        n_jobs (int): Threads of the Random Forest.
+        n_trees (int): Total number of trees.
+        seed (int): Seed of the chunk order and the forest.
+
+    Returns:
+        RandomForestClassifier: Fitted forest.
+
+    Raises:
+        ValueError: If no chunk holds training rows of two classes.
+    """
+    in_train = np.zeros(len(y), dtype=bool)
+    in_train[train_index] = True
+    order = np.random.default_rng(seed).permutation(
+        feature_store.n_chunks(store)
+    )
+    usable = []
+    for number in order:
+        positions = feature_store.chunk_positions(store, number)
+        if len(set(y[positions[in_train[positions]]])) > 1:
+            usable.append(number)
+    if not usable:
+        raise ValueError(
+            f"No chunk of {store} holds training rows of both classes"
+        )
+    shares = np.full(len(usable), n_trees // len(usable))
+    shares[: n_trees % len(usable)] += 1
+
+    rfc = RandomForestClassifier(
+        n_jobs=n_jobs, n_estimators=0, warm_start=True, random_state=seed
+    )
+    for number, share in zip(usable, shares):
+        if not share:
+            continue
+        matrix, positions = feature_store.read_chunk(store, number)
+        selected = in_train[positions]
+        rfc.n_estimators += share
+        rfc.fit(matrix[selected], y[positions[selected]])
+    return rfc
+
+
+def predict_proba_out_of_core(rfc, store, test_index):
+    """
+    Class probabilities of test rows, read chunk by chunk.
+
+    Args:
+        rfc (RandomForestClassifier): Fitted forest.
+        store (str): Chunked feature store directory.
+        test_index (np.ndarray): Test rows.
+
+    Returns:
+        np.ndarray: Probabilities in the order of test_index.
+    """
+    slot = np.full(test_index.max() + 1, -1)
+    slot[test_index] = np.arange(len(test_index))
+    probas = np.empty((len(test_index), len(rfc.classes_)))
+    for matrix, positions in feature_store.iter_chunks(store):
+        inside = positions <= test_index.max()
+        targets = np.full(len(positions), -1)
+        targets[inside] = slot[positions[inside]]
+        selected = targets >= 0
+        if selected.any():
+            probas[targets[selected]] = rfc.predict_proba(matrix[selected])
+    return probas
+
+
+def log_summary(ptm, config, metrics, tprs, importances, feature_array, last):
+    """
+    Log one aggregated W&B run for all cross-validation folds.
+
+    Args:
+        ptm (str): PTM name, used as run name.
+        config (dict): Model parameters and dataset settings.
+        metrics (dict): Metric name -> array with one value per fold.
+        tprs (np.ndarray): True positive rates per fold on ROC_GRID.
+        importances (np.ndarray): Feature importances per fold.
+        feature_array (np.ndarray): Feature names.
+        last (tuple): (rfc, X_train, y_train, X_test, y_test, y_pred,
+            y_probas) of the last fold to draw the detailed plots for, or
+            None to skip them.
+    """
+    label_names = ["no_ptm", "has_ptm"]
+    wandb.init(project="bachelor-ptm4", name=ptm, config=config, reinit=True)
+    wandb.config.update({"folds": len(tprs)})
+
+    summary = {}
+    for name, values in metrics.items():
+        summary[f"{name}_mean"] = float(np.mean(values))
+        summary[f"{name}_std"] = float(np.std(values))
+
+    mean_tpr = tprs.mean(axis=0)
+    mean_importances = importances.mean(axis=0)
+    top_n = 10
+    sorted_idx = np.argsort(mean_importances)[::-1][:top_n]
+    table = wandb.Table(
+        data=[
+            (feature_array[i], mean_importances[i], importances[:, i].std())
+            for i in sorted_idx
+        ],
+        columns=["Feature", "Importance", "Std"],
+    )
+    summary["mean_roc_curve"] = wandb.plot.line_series(
+        xs=ROC_GRID,
+        ys=[mean_tpr, mean_tpr - tprs.std(axis=0), mean_tpr + tprs.std(axis=0)],
+        keys=["mean", "mean - std", "mean + std"],
+        title="Mean ROC curve",
+        xname="False positive rate",
+    )
+    summary["top_feature_importance"] = wandb.plot.bar(
+        table,
+        "Feature",
+        "Importance",
+        title=f"Top {top_n} Feature Importances",
+    )
+
+    if last is not None:
+        rfc, X_train, y_train, X_test, y_test, y_pred, y_probas = last
+        summary.update({
+            "class_proportions": plot_class_proportions(
+                y_train, y_test, label_names
+            ),
+            "learning_curve": plot_learning_curve(rfc, X_train, y_train),
+            "roc_curve": plot_roc(y_test, y_probas, label_names),
+            "precision_recall": plot_precision_recall(
+                y_test, y_probas, label_names
+            ),
+            "confusion_matrix": wandb.plot.confusion_matrix(
+                y_true=y_test, preds=y_pred, class_names=label_names
+            ),
+        })
+
+    wandb.log(summary)
+    wandb.finish()
+
+
+def main(
+    X_dict,
+    y_path,
+    class_imbalance,
+    hydro,
+    fast=False,
+    plots=False,
+    n_jobs=-1,
+    memory_mb=None,
+):
     """
     Train Random Forest on encoded PTM features, perform cross-validation,
     log metrics to W&B, and visualize feature importance.
 
+    Folds come from splits.get_splits and are cached next to the labels. If a
+    groups.txt file from joint clustering lies next to the labels, members of
+    one cluster are kept in the same fold.
+
+    By default every fold is logged as its own W&B run with all plots. In
+    fast mode, metrics, ROC curves and importances of all folds are collected
+    in arrays and logged once as mean and standard deviation; the expensive
+    plots (including the learning curve, which refits the forest) are drawn
+    once for the last fold only if requested.
+
     Args:
-        X_csv (str): Path to CSV file containing encoded features.
+        X_dict (str): Feature store directory, or path to the CSV file
+            containing encoded features (converted to a store on first use).
         y_path (str): Path to class labels file (multi-label or binary).
         class_imbalance (float): Imbalance factor for the dataset.
         hydro (bool): Whether hydrogen encoding is included.
+        fast (bool): Log one aggregated run instead of one run per fold;
+            always used when training out of core.
+        plots (bool): In fast mode, also log the detailed plots of the last
+            fold.
+        n_jobs (int): Threads of the Random Forest (default: all CPUs).
+        memory_mb (float): Memory budget of the training in MB. A chunked
+            store that does not fit is trained out of core with
+            fit_out_of_core (default: always train in memory).
     """
-    X = pd.read_csv(X_dict)
-    feature_names = list(X.columns)
+    out_of_core = (
+        memory_mb is not None
+        and feature_store.n_chunks(X_dict) > 1
+        and TRAINING_COPIES * feature_store.dense_mb(X_dict) > memory_mb
+    )
+    if out_of_core:
+        X = None
+        feature_names = feature_store.read_meta(X_dict)["names"]
+        n_rows = sum(
+            c["rows"] for c in feature_store.read_meta(X_dict)["chunks"]
+        )
+        fast, plots = True, False
+    else:
+        X, feature_names = feature_store.load(X_dict)
+        n_rows = X.shape[0]
     feature_array = np.array(feature_names)
 
     y = pd.read_csv(y_path, delimiter="\t", header=None)
@@ -62,32 +262,65 @@ def main(X_dict, y_path, class_imbalance, hydro):
 
     ptm = y_path.split("/")[-2]
 
-    cv = RepeatedStratifiedKFold(
-        n_splits=get_splits(X.shape[0]), n_repeats=10, random_state=42
+    ptm_dir = os.path.dirname(y_path)
+    folds = splits.get_splits(
+        os.path.join(ptm_dir, "splits"),
+        np.unique(y, return_inverse=True)[1],
+        splits.read_groups(os.path.join(ptm_dir, "groups.txt")),
+        n_splits=get_splits(n_rows),
+        n_repeats=10,
+        seed=42,
     )
+    if not out_of_core:
+        train_buffer, test_buffer = splits.fold_buffers(X, folds)
 
-    for i, (train_index, test_index) in enumerate(cv.split(X, y)):
-        X_train, y_train = X.iloc[train_index, :], y[train_index]
-        X_test, y_test = X.iloc[test_index, :], y[test_index]
-
-        rfc = RandomForestClassifier(
-            n_jobs=-1, n_estimators=100, random_state=42
+    if fast:
+        metrics = {
+            name: np.empty(len(folds)) for name in ("accuracy", "MCC", "AUC")
+        }
+        tprs = np.empty((len(folds), len(ROC_GRID)))
+        fold_importances = np.empty(
+            (len(folds), len(feature_names)), dtype=np.float32
         )
-        rfc.fit(X_train, y_train)
 
-        y_pred = rfc.predict(X_test)
-        y_probas = rfc.predict_proba(X_test)
+    for i, (train_index, test_index) in enumerate(folds):
+        y_train, y_test = y[train_index], y[test_index]
+        if out_of_core:
+            rfc = fit_out_of_core(X_dict, y, train_index, n_jobs, seed=42 + i)
+            y_probas = predict_proba_out_of_core(rfc, X_dict, test_index)
+            y_pred = rfc.classes_[y_probas.argmax(axis=1)]
+        else:
+            X_train = splits.take_rows(X, train_index, train_buffer)
+            X_test = splits.take_rows(X, test_index, test_buffer)
+            rfc = RandomForestClassifier(
+                n_jobs=n_jobs, n_estimators=100, random_state=42
+            )
+            rfc.fit(X_train, y_train)
+            y_pred = rfc.predict(X_test)
+            y_probas = rfc.predict_proba(X_test)
         importances = rfc.feature_importances_
         model_params = rfc.get_params()
 
+        if fast:
+            fpr, tpr, _ = roc_curve(
+                y_test, y_probas[:, 1], pos_label=rfc.classes_[1]
+            )
+            metrics["accuracy"][i] = accuracy_score(y_test, y_pred)
+            metrics["MCC"][i] = matthews_corrcoef(y_test, y_pred)
+            metrics["AUC"][i] = auc(fpr, tpr)
+            tprs[i] = np.interp(ROC_GRID, fpr, tpr)
+            tprs[i, 0] = 0.0
+            fold_importances[i] = importances
+            continue
+
         wandb.init(
             project="bachelor-ptm4", name=ptm, config=model_params, reinit=True
         )
 
         wandb.config.update({
             "test_size": 0.2,
-            "train_len": len(X_train),
-            "test_len": len(X_test),
+            "train_len": len(train_index),
+            "test_len": len(test_index),
             "ptm": ptm,
             "class_imbalance": class_imbalance,
             "with_hydrogen": hydro,
@@ -112,7 +345,9 @@ def main(X_dict, y_path, class_imbalance, hydro):
             "precision_recall": plot_precision_recall(
                 y_test, y_probas, label_names
             ),
-            "feature_importance_builtin": plot_feature_importances(rfc),
+            "feature_importance_builtin": plot_feature_importances(
+                rfc, feature_names
+            ),
             "accuracy": accuracy_score(y_test, y_pred),
             "confusion_matrix": wandb.plot.confusion_matrix(
                 y_true=y_test, preds=y_pred, class_names=label_names
@@ -130,6 +365,23 @@ def main(X_dict, y_path, class_imbalance, hydro):
         })
         wandb.finish()
 
+    if fast:
+        config = dict(model_params)
+        config.update({
+            "test_size": 0.2,
+            "ptm": ptm,
+            "class_imbalance": class_imbalance,
+            "with_hydrogen": hydro,
+            "criterion": "gini",
+        })
+        last = None
+        if plots:
+            last = (rfc, X_train, y_train, X_test, y_test, y_pred, y_probas)
+        log_summary(
+            ptm, config, metrics, tprs, fold_importances, feature_array, last
+        )
+        importances = fold_importances.mean(axis=0)
+
     n_atoms = 10 if hydro == "with_hydrogen" else 8
     n_positions = importances.shape[0] // n_atoms
 
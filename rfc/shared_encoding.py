@@ -0,0 +1,306 @@
+"""
+Encode every unique sequence of all PTM datasets once.
+
+Many proteins, and most SwissProt negatives, occur in the seqs.fasta of
+several PTMs. The sequences of all PTMs are deduplicated by digest and
+encoded once, in fixed-size chunks, into a shared chunked feature store.
+Encodings already known to ican_memo (residue table or cache) are reused; the
+remaining sequences of a chunk are sorted by length and split into shards
+that iCAN encodes in parallel. The X matrix of a PTM is then assembled chunk
+by chunk by looking up its rows in the shared store and keeping the columns
+up to its longest sequence, which is the matrix iCAN would have produced for
+the PTM on its own.
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+
+sys.path.append(os.path.abspath("data_preprocess"))
+
+import batch_encoder
+import fasta_reader
+import feature_store
+import ican_memo
+import merge
+
+ENCODING_DIR = "data/encoding"
+CHUNK_SEQS = 5000
+
+
+def collect(seq_files, seed=42):
+    """
+    Deduplicate the sequences of several multi-FASTA files.
+
+    The unique sequences are shuffled with a fixed seed, so every chunk of
+    the shared store holds a random mix of the datasets and classes.
+
+    Args:
+        seq_files (list of str): Paths of the seqs.fasta files.
+        seed (int): Seed of the shuffle.
+
+    Returns:
+        tuple: (list of unique sequences, dict seq_file -> int32 array of
+        row indices into the unique list)
+    """
+    unique = []
+    positions = {}
+    index = {}
+    for seq_file in seq_files:
+        rows = []
+        for seq in fasta_reader.read_sequences(seq_file):
+            digest = merge.seq_digest(seq)
+            if digest not in positions:
+                positions[digest] = len(unique)
+                unique.append(seq)
+            rows.append(positions[digest])
+        index[seq_file] = np.array(rows, dtype=np.int32)
+
+    order = np.random.default_rng(seed).permutation(len(unique))
+    rank = np.argsort(order).astype(np.int32)
+    unique = [unique[i] for i in order]
+    index = {seq_file: rank[rows] for seq_file, rows in index.items()}
+    return unique, index
+
+
+def _fingerprint(seqs):
+    """SHA-256 of the digests of an ordered list of sequences."""
+    digest = hashlib.sha256()
+    for seq in seqs:
+        digest.update(merge.seq_digest(seq))
+    return digest.hexdigest()
+
+
+def is_encoded(seqs, directory=ENCODING_DIR):
+    """
+    Check whether the shared store holds exactly the given sequences.
+
+    Args:
+        seqs (list of str): Unique sequences.
+        directory (str): Directory of the shared encoding.
+
+    Returns:
+        bool: True if the store was built from the same sequences in the
+        same order.
+    """
+    try:
+        with open(os.path.join(directory, "store", feature_store.META)) as f:
+            source = json.load(f)["source"]
+    except (OSError, ValueError, KeyError):
+        return False
+    return source == {"sequences": _fingerprint(seqs)}
+
+
+def pending(seqs):
+    """
+    Sequences that need a full iCAN run.
+
+    Args:
+        seqs (list of str): Unique sequences.
+
+    Returns:
+        list of int: Indices of the sequences unknown to ican_memo.
+    """
+    known = ican_memo.memoised(
+        seqs, ican_memo.connect(), ican_memo.load_table()
+    )
+    return [i for i in range(len(seqs)) if i not in known]
+
+
+def _stack(rows, width):
+    """Stack flattened feature rows of varying length into a CSR matrix."""
+    data, indices, indptr = [], [], [0]
+    for row in rows:
+        nonzero = np.flatnonzero(row)
+        data.append(row[nonzero])
+        indices.append(nonzero)
+        indptr.append(indptr[-1] + len(nonzero))
+    return sp.csr_matrix(
+        (
+            np.concatenate(data).astype(np.float32),
+            np.concatenate(indices),
+            np.array(indptr),
+        ),
+        shape=(len(rows), width),
+    )
+
+
+def _encode_chunk(seqs, conn, table, queue, key, shards, directory):
+    """
+    Encode one chunk of unique sequences.
+
+    Memoised encodings are reused; the rest is encoded by iCAN in shards and
+    added to the memo cache.
+
+    Returns:
+        list of np.ndarray: Flattened features per sequence.
+    """
+    rows = ican_memo.memoised(seqs, conn, table)
+    missing = sorted(
+        (i for i in range(len(seqs)) if i not in rows),
+        key=lambda i: len(seqs[i]),
+    )
+    print(f"{len(seqs) - len(missing)} memoised, {len(missing)} to iCAN")
+
+    if missing:
+        parts = [p for p in np.array_split(missing, shards) if len(p)]
+        paths = []
+        for number, part in enumerate(parts):
+            path = os.path.join(directory, f"shard_{number}.fasta")
+            with open(path, "w") as f:
+                for row in part:
+                    f.write(f">U{row}\n{seqs[row]}\n")
+            paths.append(path)
+
+        stores = Parallel(n_jobs=len(paths))(
+            delayed(ican_memo.run_ican)(path, queue, key) for path in paths
+        )
+
+        for part, shard_store in zip(parts, stores):
+            matrix, _ = feature_store.load(shard_store)
+            matrix = sp.csr_matrix(matrix, dtype=np.float32)
+            encoded = [
+                matrix[k]
+                .toarray()
+                .ravel()[: len(seqs[i]) * batch_encoder.N_ATOMS]
+                for k, i in enumerate(part)
+            ]
+            ican_memo.remember(conn, [seqs[i] for i in part], encoded)
+            rows.update(zip(part.tolist(), encoded))
+    return [rows[i] for i in range(len(seqs))]
+
+
+def encode_unique(
+    seqs,
+    queue,
+    key="shared",
+    shards=1,
+    directory=ENCODING_DIR,
+    chunk_seqs=CHUNK_SEQS,
+):
+    """
+    Encode unique sequences into the shared feature store.
+
+    Sequences are encoded in chunks of chunk_seqs, and every chunk is
+    appended to a chunked store as soon as it is done, so memory is bounded
+    by the chunk size. The store is reused if it was built from the same
+    sequences.
+
+    Args:
+        seqs (list of str): Unique sequences.
+        queue (progress.Counters): Writer of the progress counters.
+        key (str): Progress key prefix.
+        shards (int): Number of iCAN processes run in parallel.
+        directory (str): Directory of the shared encoding.
+        chunk_seqs (int): Sequences per chunk.
+
+    Returns:
+        str: Feature store directory of the shared encoding.
+    """
+    store = os.path.join(directory, "store")
+    if is_encoded(seqs, directory):
+        return store
+    os.makedirs(store, exist_ok=True)
+    feature_store.clear(store)
+
+    conn = ican_memo.connect()
+    table = ican_memo.load_table()
+    max_len = max(len(seq) for seq in seqs)
+    width = max_len * batch_encoder.N_ATOMS
+    chunks = []
+    for number, start in enumerate(range(0, len(seqs), chunk_seqs)):
+        rows = _encode_chunk(
+            seqs[start : start + chunk_seqs],
+            conn,
+            table,
+            queue,
+            key,
+            shards,
+            directory,
+        )
+        chunks.append(
+            feature_store.write_chunk(store, number, _stack(rows, width))
+        )
+    return feature_store.save_chunked(
+        store,
+        ican_memo.feature_names(max_len),
+        chunks,
+        source={"sequences": _fingerprint(seqs)},
+    )
+
+
+def _merge(pieces):
+    """Stack (matrix, positions) pieces into one piece."""
+    return (
+        sp.vstack([matrix for matrix, _ in pieces], format="csr"),
+        np.concatenate([positions for _, positions in pieces]),
+    )
+
+
+def ptm_store(store, rows, seqs, directory, chunk_mb=None):
+    """
+    Assemble the feature store of one PTM from the shared encoding.
+
+    The shared store is read chunk by chunk and the PTM rows found in it are
+    collected until they fill chunk_mb as a dense matrix. A PTM that fits
+    gets a single-matrix store in dataset order; a larger one gets a chunked
+    store of chunks up to chunk_mb, each with the row numbers of its rows in
+    the PTM dataset.
+
+    Args:
+        store (str): Shared feature store directory.
+        rows (np.ndarray): Row of every PTM sequence in the shared store.
+        seqs (list of str): Unique sequences, to find the PTM's longest one.
+        directory (str): Feature store directory of the PTM.
+        chunk_mb (float): Memory budget of one chunk in MB (default: no
+            limit).
+
+    Returns:
+        str: Feature store directory of the PTM.
+    """
+    names = feature_store.read_meta(store)["names"]
+    max_len = max(len(seqs[row]) for row in rows)
+    width = min(len(names), max_len * batch_encoder.N_ATOMS)
+    limit = len(rows)
+    if chunk_mb is not None:
+        limit = feature_store.rows_within(chunk_mb, width)
+    os.makedirs(directory, exist_ok=True)
+    feature_store.clear(directory)
+
+    chunks = []
+    pieces = []
+    collected = 0
+    for matrix, shared_rows in feature_store.iter_chunks(store):
+        start, end = shared_rows[0], shared_rows[-1] + 1
+        positions = np.flatnonzero((rows >= start) & (rows < end))
+        if not len(positions):
+            continue
+        X = sp.csr_matrix(
+            matrix[rows[positions] - start][:, :width], dtype=np.float32
+        )
+        pieces.append((X, positions))
+        collected += len(positions)
+        while collected > limit:
+            X, positions = _merge(pieces)
+            chunks.append(
+                feature_store.write_chunk(
+                    directory, len(chunks), X[:limit], positions[:limit]
+                )
+            )
+            pieces = [(X[limit:], positions[limit:])]
+            collected -= limit
+
+    X, positions = _merge(pieces)
+    if not chunks:
+        return feature_store.save(
+            X[np.argsort(positions)], names[:width], directory
+        )
+    chunks.append(
+        feature_store.write_chunk(directory, len(chunks), X, positions)
+    )
+    return feature_store.save_chunked(directory, names[:width], chunks)
@@ -0,0 +1,192 @@
+"""
+Cached, cluster-aware cross-validation splits.
+
+Splits are stratified by class and, when the cluster of every sequence is
+known (groups.txt from joint clustering), keep all members of a cluster in the
+same fold. The fold indices of all repeats are stored as int32 arrays under a
+key derived from the labels, groups and split parameters, and are memory
+mapped on later runs, so repeated experiments on the same dataset reuse the
+same splits without recomputing them.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.model_selection import StratifiedGroupKFold, StratifiedKFold
+
+# Part of the split key; bumped when the same parameters give other folds.
+KEY_VERSION = 2
+
+
+def split_key(y, groups, n_splits, n_repeats, seed):
+    """
+    Content key of a set of splits.
+
+    Args:
+        y (np.ndarray): Integer class labels.
+        groups (np.ndarray): Cluster per sample, or None.
+        n_splits (int): Number of folds per repeat.
+        n_repeats (int): Number of repeats.
+        seed (int): Seed of the random state shared by the repeats.
+
+    Returns:
+        str: Hex digest identifying the splits.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(y, dtype=np.int32).tobytes())
+    if groups is not None:
+        h.update(np.ascontiguousarray(groups, dtype=np.int64).tobytes())
+    params = [KEY_VERSION, n_splits, n_repeats, seed, groups is not None]
+    h.update(json.dumps(params).encode())
+    return h.hexdigest()
+
+
+def make_splits(y, groups=None, n_splits=5, n_repeats=10, seed=42):
+    """
+    Compute repeated stratified (group) k-fold splits.
+
+    As in RepeatedStratifiedKFold, all repeats draw their shuffles from one
+    random state seeded once, so without groups the folds are identical to
+    RepeatedStratifiedKFold(n_splits, n_repeats, random_state=seed).
+
+    Args:
+        y (np.ndarray): Integer class labels.
+        groups (np.ndarray): Cluster per sample; if None, samples are split
+            individually.
+        n_splits (int): Number of folds per repeat.
+        n_repeats (int): Number of repeats.
+        seed (int): Seed of the random state shared by the repeats.
+
+    Returns:
+        list of tuple: (train indices, test indices) per fold as int32.
+    """
+    rng = np.random.RandomState(seed)
+    folds = []
+    for _ in range(n_repeats):
+        if groups is None:
+            cv = StratifiedKFold(n_splits, shuffle=True, random_state=rng)
+        else:
+            cv = StratifiedGroupKFold(n_splits, shuffle=True, random_state=rng)
+        for train, test in cv.split(np.zeros(len(y)), y, groups):
+            folds.append((train.astype(np.int32), test.astype(np.int32)))
+    return folds
+
+
+def save_splits(folds, directory):
+    """
+    Store folds as concatenated int32 index arrays with offsets.
+
+    Args:
+        folds (list of tuple): (train, test) index arrays per fold.
+        directory (str): Target directory, created if needed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for part, name in enumerate(("train", "test")):
+        arrays = [fold[part] for fold in folds]
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in arrays], out=offsets[1:])
+        tmp = os.path.join(directory, f"{name}.tmp.npy")
+        np.save(tmp, np.concatenate(arrays).astype(np.int32))
+        np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+        os.replace(tmp, os.path.join(directory, f"{name}.npy"))
+
+
+def load_splits(directory):
+    """
+    Memory map stored folds.
+
+    Args:
+        directory (str): Directory written by save_splits.
+
+    Returns:
+        list of tuple: (train, test) read-only int32 views per fold.
+    """
+    parts = []
+    for name in ("train", "test"):
+        indices = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        offsets = np.load(os.path.join(directory, f"{name}_offsets.npy"))
+        parts.append([
+            indices[start:end] for start, end in zip(offsets[:-1], offsets[1:])
+        ])
+    return list(zip(*parts))
+
+
+def get_splits(cache_dir, y, groups=None, n_splits=5, n_repeats=10, seed=42):
+    """
+    Load cached splits, computing and storing them on first use.
+
+    Args:
+        cache_dir (str): Directory holding one subdirectory per split key.
+        y (np.ndarray): Integer class labels.
+        groups (np.ndarray): Cluster per sample, or None.
+        n_splits (int): Number of folds per repeat.
+        n_repeats (int): Number of repeats.
+        seed (int): Seed of the random state shared by the repeats.
+
+    Returns:
+        list of tuple: (train, test) int32 index arrays per fold.
+    """
+    key = split_key(y, groups, n_splits, n_repeats, seed)
+    directory = os.path.join(cache_dir, key)
+    if not os.path.exists(os.path.join(directory, "test.npy")):
+        save_splits(
+            make_splits(y, groups, n_splits, n_repeats, seed), directory
+        )
+    return load_splits(directory)
+
+
+def read_groups(path):
+    """
+    Read the cluster of every sample from a groups.txt file.
+
+    Args:
+        path (str): Path to groups.txt, one cluster number per line.
+
+    Returns:
+        np.ndarray: Cluster per sample, or None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    return np.loadtxt(path, dtype=np.int64, ndmin=1)
+
+
+def take_rows(X, index, buffer):
+    """
+    Gather rows of X into a preallocated buffer.
+
+    Args:
+        X (np.ndarray or scipy.sparse.csr_matrix): Feature matrix.
+        index (np.ndarray): Row indices.
+        buffer (np.ndarray): Array with at least len(index) rows and the
+            columns and dtype of X, reused across folds; None for sparse X.
+
+    Returns:
+        np.ndarray or scipy.sparse.csr_matrix: View of the first len(index)
+        rows of buffer, or the selected rows of a sparse X.
+    """
+    if sp.issparse(X):
+        return X[index]
+    out = buffer[: len(index)]
+    np.take(X, index, axis=0, out=out)
+    return out
+
+
+def fold_buffers(X, folds):
+    """
+    Allocate train and test buffers large enough for every fold.
+
+    Args:
+        X (np.ndarray): Feature matrix.
+        folds (list of tuple): (train, test) index arrays per fold.
+
+    Returns:
+        tuple: (train buffer, test buffer), both None for sparse X whose rows
+        are selected without a dense copy.
+    """
+    if sp.issparse(X):
+        return None, None
+    rows = [max(len(fold[part]) for fold in folds) for part in (0, 1)]
+    return tuple(np.empty((n, X.shape[1]), dtype=X.dtype) for n in rows)
@@ -0,0 +1,122 @@
+"""
+Shared test setup.
+
+The pipeline modules are flat scripts that import their siblings by bare
+name, so the source directories are put on sys.path. iCAN is an external
+checkout under Source/ that is not part of this repository; the tests only
+exercise paths that never call it, so an empty module stands in for it when
+it is not importable.
+"""
+
+import os
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for name in ("data_preprocess", "rfc", "Source"):
+    sys.path.insert(0, os.path.join(ROOT, name))
+
+try:
+    import ican  # noqa: F401
+except ImportError:
+    sys.modules["ican"] = types.ModuleType("ican")
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def random_seqs(n, min_len=5, max_len=40, seed=0):
+    """Random protein sequences of varying length."""
+    rng = np.random.default_rng(seed)
+    return [
+        "".join(rng.choice(list(AMINO_ACIDS), rng.integers(min_len, max_len)))
+        for _ in range(n)
+    ]
+
+
+def write_fasta(path, seqs, prefix="P"):
+    """Write sequences to a multi-FASTA file."""
+    with open(path, "w") as f:
+        for i, seq in enumerate(seqs):
+            f.write(f">{prefix}{i}\n{seq}\n")
+    return str(path)
+
+
+@pytest.fixture
+def residue_table():
+    """A residue table with distinct values for every context and atom."""
+    import batch_encoder
+
+    rng = np.random.default_rng(0)
+    shape = (4, len(batch_encoder.RESIDUES), batch_encoder.N_ATOMS)
+    return rng.random(shape).astype(np.float32) + 0.1
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Local HTTP server standing in for the UniProt REST API.
+
+    Set ``server.respond`` to a function mapping the query parameters of a
+    request (dict of str) to a (status, body) pair; every request's
+    parameters are appended to ``server.requests``.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = {
+                key: values[0]
+                for key, values in parse_qs(urlparse(self.path).query).items()
+            }
+            server.requests.append(params)
+            status, body = server.respond(params)
+            self.send_response(status)
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = []
+    server.respond = lambda params: (404, "")
+    server.url = f"http://127.0.0.1:{server.server_port}/uniprotkb/stream"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def uniprot_tsv(entries, extra=()):
+    """
+    TSV body in the layout of accession_cache.FIELDS.
+
+    Args:
+        entries (list of dict): Column values per entry; missing columns
+            are left empty.
+        extra (tuple of str): Additional column names.
+    """
+    columns = [
+        "Entry",
+        "Entry Name",
+        "Reviewed",
+        "Protein names",
+        "Organism",
+        "Organism (ID)",
+        "Gene Names (primary)",
+        "Protein existence",
+        "Sequence version",
+        "Involvement in disease",
+        "Secondary accession",
+        "Sequence",
+        *extra,
+    ]
+    lines = ["\t".join(columns)]
+    for entry in entries:
+        lines.append("\t".join(entry.get(column, "") for column in columns))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,29 @@
+import accession_cache
+
+ROW = {
+    "Entry": "P04637",
+    "Entry Name": "P53_HUMAN",
+    "Reviewed": "reviewed",
+    "Protein names": "Cellular tumor antigen p53 (Antigen NY-CO-13) "
+    "(Phosphoprotein p53)",
+    "Organism": "Homo sapiens (Human)",
+    "Organism (ID)": "9606",
+    "Gene Names (primary)": "TP53",
+    "Protein existence": "Evidence at protein level",
+    "Sequence version": "4",
+}
+
+
+def test_header_matches_uniprot_fasta_layout():
+    assert accession_cache._header(ROW) == (
+        "sp|P04637|P53_HUMAN Cellular tumor antigen p53 OS=Homo sapiens "
+        "OX=9606 GN=TP53 PE=1 SV=4"
+    )
+
+
+def test_header_drops_cleaved_chains():
+    row = dict(
+        ROW,
+        **{"Protein names": "Insulin [Cleaved into: Insulin B chain]"},
+    )
+    assert accession_cache._header(row).split(" OS=")[0].endswith("Insulin")
@@ -0,0 +1,55 @@
+import batch_encoder
+import numpy as np
+import pytest
+from conftest import random_seqs
+
+
+def reference(seq, table):
+    """Per-residue lookup of one sequence, position by position."""
+    rows = []
+    for position, residue in enumerate(seq):
+        if len(seq) == 1:
+            context = batch_encoder.SINGLE
+        elif position == 0:
+            context = batch_encoder.N_TERM
+        elif position == len(seq) - 1:
+            context = batch_encoder.C_TERM
+        else:
+            context = batch_encoder.INTERNAL
+        rows.append(table[context, batch_encoder.RESIDUES.index(residue)])
+    return np.concatenate(rows)
+
+
+SEQS = ["M", "MK", "MKV", *random_seqs(40, 1, 60, seed=4)]
+
+
+def test_encode_batch_matches_residue_table(residue_table):
+    matrix = batch_encoder.encode_batch(SEQS, residue_table)
+    width = max(map(len, SEQS)) * batch_encoder.N_ATOMS
+    assert matrix.shape == (len(SEQS), width)
+    for row, seq in zip(matrix, SEQS):
+        expected = reference(seq, residue_table)
+        np.testing.assert_array_equal(row[: len(expected)], expected)
+        assert not row[len(expected) :].any()
+
+
+def test_encode_without_hydrogen_in_small_batches(residue_table):
+    rows = batch_encoder.encode(
+        SEQS, residue_table, with_hydrogen=False, batch_size=7
+    )
+    names = [f"f{i}" for i in range(batch_encoder.N_ATOMS)]
+    kept = [int(name[1:]) for name in batch_encoder.drop_hydrogen(names)]
+    assert len(kept) == batch_encoder.N_ATOMS - 2
+    for row, seq in zip(rows, SEQS):
+        expected = reference(seq, residue_table).reshape(len(seq), -1)
+        np.testing.assert_array_equal(row, expected[:, kept].ravel())
+
+
+def test_unknown_residues_are_rejected(residue_table):
+    assert batch_encoder.encodable(["MKV", "MXV", ""]).tolist() == [
+        True,
+        False,
+        False,
+    ]
+    with pytest.raises(ValueError):
+        batch_encoder.encode_batch(["MXV"], residue_table)
@@ -0,0 +1,61 @@
+import class_generator
+import cluster
+import fasta_reader
+import numpy as np
+from conftest import AMINO_ACIDS, random_seqs
+
+
+def mutants(seq, n, rng):
+    """Copies of a sequence with a few point substitutions each."""
+    copies = []
+    for _ in range(n):
+        residues = list(seq)
+        for i in rng.choice(len(seq), 3, replace=False):
+            residues[i] = rng.choice(list(AMINO_ACIDS))
+        copies.append("".join(residues))
+    return copies
+
+
+def test_groups_follow_joint_clusters_with_duplicate_ids(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(1)
+    # The longest families are positives, so no negative exceeds the cutoff.
+    roots = random_seqs(6, min_len=40, max_len=60, seed=1)
+    roots.sort(key=len, reverse=True)
+    family = {}
+    pos, neg = [], []
+    for i, root in enumerate(roots):
+        for seq in [root, *mutants(root, 2, rng)]:
+            family[seq] = i
+            (pos if i < 3 else neg).append(seq)
+
+    ptm_dir = tmp_path / "data" / "ptms" / "X"
+    no_ptm_dir = tmp_path / "data" / "no_ptm"
+    ptm_dir.mkdir(parents=True)
+    no_ptm_dir.mkdir()
+    # Every positive shares one id, so only record numbers tell them apart.
+    (ptm_dir / "merged.fasta").write_text(
+        "".join(f">sp|P0|DUP copy {i}\n{s}\n" for i, s in enumerate(pos))
+    )
+    (no_ptm_dir / "filtered_no_X.fasta").write_text(
+        "".join(f">sp|N{i}|NEG\n{s}\n" for i, s in enumerate(neg))
+    )
+
+    cluster.joint(
+        str(ptm_dir / "merged.fasta"), T=1, backend="native", members="all"
+    )
+    class_generator.main(
+        str(ptm_dir / "clustered.fasta"),
+        str(no_ptm_dir / "clustered_no_X.fasta"),
+        str(ptm_dir),
+        percentile=100,
+        membership=str(ptm_dir / "clusters.tsv"),
+    )
+
+    _, seqs = fasta_reader.read_batch(str(ptm_dir / "seqs.fasta"))
+    groups = (ptm_dir / "groups.txt").read_text().split()
+    assert len(seqs) == len(groups) == 18
+    pairs = {(family[seq], group) for seq, group in zip(seqs, groups)}
+    assert (
+        len(pairs) == len({f for f, _ in pairs}) == len({g for _, g in pairs})
+    )
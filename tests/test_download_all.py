@@ -0,0 +1,134 @@
+import collections
+import threading
+import time
+
+import download_all
+import pytest
+import uniprot_client
+from conftest import uniprot_tsv
+
+
+def test_get_uniprot_seqs_retries_and_keeps_order(
+    tmp_path, monkeypatch, stub_server
+):
+    monkeypatch.chdir(tmp_path)
+    ids = [f"Q{i:05d}" for i in range(1200)]
+    failed = set()
+
+    def respond(params):
+        accessions = [
+            term.split(":")[1] for term in params["query"].split(" OR ")
+        ]
+        # The second batch fails once with a transient error.
+        if ids[500] in accessions and not failed:
+            failed.add(ids[500])
+            return 503, ""
+        return 200, uniprot_tsv([
+            {
+                "Entry": acc,
+                "Entry Name": f"{acc}_HUMAN",
+                "Reviewed": "reviewed",
+                "Sequence": "MKV",
+            }
+            for acc in reversed(accessions)
+        ])
+
+    stub_server.respond = respond
+    path = tmp_path / "out.fasta"
+    download_all.get_uniprot_seqs(
+        ids,
+        str(path),
+        url=stub_server.url,
+        session=uniprot_client.make_session(backoff=0),
+    )
+
+    headers = [line for line in path.read_text().split() if line[0] == ">"]
+    assert [h.split("|")[1] for h in headers] == ids
+    assert failed and len(stub_server.requests) == 4
+
+
+def test_run_scheduled_respects_host_limits_and_reports_failures():
+    lock = threading.Lock()
+    active = collections.Counter()
+    peak = collections.Counter()
+
+    def task(host, fail):
+        with lock:
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+        time.sleep(0.05)
+        with lock:
+            active[host] -= 1
+        if fail:
+            raise OSError("connection reset")
+
+    tasks = [
+        (f"{host}/{i}", host, task, (host, host == "b" and i == 0))
+        for host in ("a", "b", None)
+        for i in range(6)
+    ]
+    results = download_all.run_scheduled(tasks, host_limits={"a": 2, "b": 1})
+
+    assert peak["a"] == 2 and peak["b"] == 1 and peak[None] == 6
+    assert sorted(label for label, _, _ in results) == sorted(
+        label for label, _, _, _ in tasks
+    )
+    errors = {label: error for label, _, error in results}
+    assert isinstance(errors.pop("b/0"), OSError)
+    assert all(error is None for error in errors.values())
+    with pytest.raises(RuntimeError, match="b/0"):
+        download_all.raise_failures(results, "Download")
+
+
+SEARCH_ROWS = (
+    "Entry\tGene Names\tProtein names\tReviewed\n"
+    "P04637\tTP53 P53\tCellular tumor antigen p53 (Antigen NY-CO-13)\t"
+    "reviewed\n"
+    "Q13315\tATM\tSerine-protein kinase ATM (EC 2.7.11.1) "
+    "(Ataxia telangiectasia mutated)\treviewed\n"
+    "Q9XXX1\tATMX\tATM interactor\tunreviewed\n"
+)
+
+
+def test_resolve_names_matches_whole_names(tmp_path, stub_server):
+    stub_server.respond = lambda params: (200, SEARCH_ROWS)
+    cache_path = str(tmp_path / "names.json")
+    names = ["P53", "Ataxia telangiectasia mutated", "antigen", "MDM2"]
+
+    def resolve(**kwargs):
+        return download_all.resolve_names(
+            names,
+            cache_path=cache_path,
+            url=stub_server.url,
+            session=uniprot_client.make_session(backoff=0),
+            **kwargs,
+        )
+
+    resolved, failed = resolve()
+    assert failed == 0
+    assert resolved == {
+        "P53": "P04637",
+        "Ataxia telangiectasia mutated": "Q13315",
+        "antigen": None,
+        "MDM2": None,
+    }
+    assert len(stub_server.requests) == 1
+
+    # Misses are cached until they expire.
+    assert resolve()[0] == resolved
+    assert len(stub_server.requests) == 1
+    assert resolve(ttl_days=0)[0] == resolved
+    assert "antigen" in stub_server.requests[-1]["query"]
+    assert "P53" not in stub_server.requests[-1]["query"]
+
+
+def test_best_accession_prefers_gene_names():
+    rows = [
+        {"Entry": "A", "Gene Names": "", "Protein names": "ATM"},
+        {"Entry": "B", "Gene Names": "ATM", "Protein names": "Kinase"},
+    ]
+    assert download_all._best_accession("atm", rows) == "B"
+    assert download_all._best_accession("kin", rows) is None
+    assert download_all._protein_names(
+        "Insulin [Cleaved into: Insulin B chain; Insulin A chain]"
+    ) == {"insulin", "insulin b chain", "insulin a chain"}
@@ -0,0 +1,30 @@
+import os
+
+import fasta_stats
+import numpy as np
+from conftest import write_fasta
+
+
+def test_stats_persist_across_processes(tmp_path, monkeypatch):
+    stats_dir = str(tmp_path / "stats")
+    path = write_fasta(tmp_path / "a.fasta", ["MKV", "ACDEFGHIKLMNP", "WY"])
+    stats = fasta_stats.get_stats(path, stats_dir=stats_dir)
+    assert stats["count"] == 3
+    assert stats["short_seqs"] == ["MKV", "WY"]
+    assert len(os.listdir(stats_dir)) == 1
+
+    # A new process starts with an empty in-memory cache.
+    monkeypatch.setattr(fasta_stats, "_CACHE", {})
+    monkeypatch.setattr(fasta_stats, "_scan", None)
+    cached = fasta_stats.get_stats(path, stats_dir=stats_dir)
+    np.testing.assert_array_equal(cached["lengths"], [3, 13, 2])
+    assert cached["short_seqs"] == ["MKV", "WY"]
+
+
+def test_rewritten_file_is_scanned_again(tmp_path, monkeypatch):
+    stats_dir = str(tmp_path / "stats")
+    path = write_fasta(tmp_path / "a.fasta", ["MKV"])
+    fasta_stats.get_stats(path, stats_dir=stats_dir)
+    write_fasta(tmp_path / "a.fasta", ["MKV", "ACDEFGHIKLMNP"])
+    monkeypatch.setattr(fasta_stats, "_CACHE", {})
+    assert fasta_stats.get_stats(path, stats_dir=stats_dir)["count"] == 2
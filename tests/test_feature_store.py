@@ -0,0 +1,62 @@
+import feature_store
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_chunked_store_loads_in_its_written_format(tmp_path, sparse):
+    rng = np.random.default_rng(0)
+    X = rng.random((50, 8)).astype(np.float32)
+    parts = np.array_split(rng.permutation(50), 4)
+    directory = str(tmp_path / "store")
+    chunks = [
+        feature_store.write_chunk(directory, number, X[rows], rows, sparse)
+        for number, rows in enumerate(parts)
+    ]
+    feature_store.save_chunked(directory, [f"f{i}" for i in range(8)], chunks)
+
+    matrix, names = feature_store.load(directory)
+    assert sp.issparse(matrix) == sparse
+    if sparse:
+        matrix = matrix.toarray()
+    assert matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix, X)
+    assert names == [f"f{i}" for i in range(8)]
+
+
+def padded(n_rows, width, seed=0):
+    """Matrix of positive values whose rows end in zero padding."""
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_rows, width)).astype(np.float32) + 0.1
+    lengths = rng.integers(1, width // 4, n_rows)
+    X[np.arange(width) >= lengths[:, None]] = 0
+    return X
+
+
+@pytest.mark.parametrize(
+    "X, sparse",
+    [
+        (padded(60, 40), True),
+        (np.random.default_rng(1).random((60, 40), dtype=np.float32), False),
+    ],
+)
+def test_auto_format_round_trips(tmp_path, X, sparse):
+    names = [f"f{i}" for i in range(X.shape[1])]
+    csv_path = str(tmp_path / "iCAN_level_2.csv")
+    pd.DataFrame(X, columns=names).to_csv(csv_path, index=False)
+
+    stores = [
+        feature_store.from_csv(csv_path, chunk_rows=7),
+        feature_store.save(X, names, str(tmp_path / "saved")),
+    ]
+    for directory in stores:
+        assert feature_store.read_meta(directory)["sparse"] == sparse
+        matrix, loaded_names = feature_store.load(directory)
+        assert sp.issparse(matrix) == sparse
+        if sparse:
+            matrix = matrix.toarray()
+        np.testing.assert_allclose(matrix, X, rtol=1e-6)
+        assert loaded_names == names
+    assert feature_store.is_current(stores[0], csv_path, sparse)
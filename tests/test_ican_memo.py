@@ -0,0 +1,68 @@
+import os
+
+import batch_encoder
+import ican_memo
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import random_seqs
+
+
+@pytest.fixture
+def fake_ican(tmp_path, monkeypatch, residue_table):
+    """Stand-in for iCAN encoding through the residue table; counts calls."""
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    def call_ican(args, **kwargs):
+        output_path = args[0].split("=", 1)[1]
+        with open(args[-1]) as f:
+            seqs = [line.strip() for line in f if not line.startswith(">")]
+        calls.append(seqs)
+        matrix = batch_encoder.encode_batch(seqs, residue_table)
+        names = [
+            f"p{i // batch_encoder.N_ATOMS}_a{i % batch_encoder.N_ATOMS}"
+            for i in range(matrix.shape[1])
+        ]
+        os.makedirs(output_path, exist_ok=True)
+        pd.DataFrame(matrix, columns=names).to_csv(
+            os.path.join(output_path, ican_memo.CSV_NAME), index=False
+        )
+
+    monkeypatch.setattr(ican_memo, "call_ican", call_ican)
+    return calls
+
+
+def test_prepare_calibrates_once(fake_ican, residue_table):
+    meta = ican_memo.prepare(5)
+    assert meta["valid"]
+    assert len(fake_ican) == 1
+    np.testing.assert_allclose(ican_memo.load_table(), residue_table)
+
+    assert ican_memo.prepare(5) == meta
+    assert ican_memo.feature_names(5)[:2] == ["p0_a0", "p0_a1"]
+    assert len(fake_ican) == 1
+
+    # Longer sequences only need one filler sequence for their names.
+    assert len(ican_memo.feature_names(80)) == 80 * batch_encoder.N_ATOMS
+    assert fake_ican[1] == [ican_memo.FILLER * 80]
+    ican_memo.prepare(80)
+    assert len(fake_ican) == 2
+
+
+def test_memo_hits_skip_the_table(fake_ican, residue_table):
+    seqs = random_seqs(10, seed=5)
+    rows = batch_encoder.encode(seqs, residue_table)
+    conn = ican_memo.connect()
+    try:
+        ican_memo.remember(conn, seqs[:4], [row + 1 for row in rows[:4]])
+        found = ican_memo.cached(conn, seqs)
+        assert sorted(found) == [0, 1, 2, 3]
+
+        memo = ican_memo.memoised(seqs + ["MXV"], conn, residue_table)
+    finally:
+        conn.close()
+    assert sorted(memo) == list(range(10))
+    for i, row in enumerate(rows):
+        np.testing.assert_array_equal(memo[i], row + 1 if i < 4 else row)
+    assert fake_ican == []
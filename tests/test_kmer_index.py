@@ -0,0 +1,39 @@
+import kmer_index
+import numpy as np
+from conftest import random_seqs
+
+MIN_LEN = kmer_index.K + kmer_index.W - 1
+
+
+def brute_force(seqs, query):
+    return [
+        i
+        for i, seq in enumerate(seqs)
+        if len(seq) >= MIN_LEN and (seq in query or query in seq)
+    ]
+
+
+def test_find_containing_matches_brute_force():
+    rng = np.random.default_rng(2)
+    seqs = random_seqs(200, min_len=5, max_len=80, seed=2)
+    queries = random_seqs(50, min_len=MIN_LEN, max_len=80, seed=3)
+    for seq in seqs[:60]:
+        start = rng.integers(0, max(1, len(seq) - MIN_LEN))
+        # fragments, extended precursors and exact copies of indexed entries
+        queries += [seq[start:], "MA" + seq + "GK", seq]
+    index = kmer_index.build_index(seqs)
+    found = 0
+    for query in queries:
+        if len(query) < MIN_LEN:
+            continue
+        expected = brute_force(seqs, query)
+        assert kmer_index.find_containing(index, query) == expected
+        found += len(expected)
+    assert found >= 100
+
+
+def test_short_sequences_are_not_indexed():
+    index = kmer_index.build_index(["MKV", "A" * MIN_LEN])
+    assert kmer_index.find_containing(index, "MKVA" * 10) == []
+    assert kmer_index.find_containing(index, "A" * (MIN_LEN + 3)) == [1]
+    assert kmer_index.find_containing(index, "MKV") == []
@@ -0,0 +1,34 @@
+import manifest
+import pytest
+
+
+def test_failing_stage_is_not_recorded(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    output = tmp_path / "out.txt"
+    state = {}
+
+    def fail():
+        output.write_text("partial")
+        raise RuntimeError("Download failed: data/ptms/x/databases/ncbi")
+
+    with pytest.raises(RuntimeError):
+        manifest.run_stage(
+            state, "download", fail, [], {}, [str(output)], path=path
+        )
+    assert "download" not in state
+    assert manifest.load(path) == {}
+
+    ran = manifest.run_stage(
+        state,
+        "download",
+        lambda: output.write_text("complete"),
+        [],
+        {},
+        [str(output)],
+        path=path,
+    )
+    assert ran
+    assert "download" in manifest.load(path)
+    assert not manifest.run_stage(
+        state, "download", None, [], {}, [str(output)], path=path
+    )
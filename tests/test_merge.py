@@ -0,0 +1,86 @@
+import disease
+import merge
+import pytest
+from conftest import write_fasta
+
+
+def failing_records(ids):
+    yield "P1", "A_HUMAN", "", "MKVLAAGIVALLLA"
+    raise ConnectionError("UniProt unavailable")
+
+
+def test_merge_streaming_removes_spool_on_error(tmp_path, monkeypatch):
+    path = write_fasta(tmp_path / "in.fasta", ["MKVLAAGIVALLLA"])
+    monkeypatch.setattr(disease, "iter_records", failing_records)
+    with pytest.raises(ConnectionError):
+        merge.merge_streaming([path], str(tmp_path / "merged.fasta"))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.fasta"]
+
+
+def test_merge_streaming_deduplicates(tmp_path, monkeypatch):
+    path = write_fasta(tmp_path / "in.fasta", ["MKV", "WYA"])
+    monkeypatch.setattr(
+        disease,
+        "iter_records",
+        lambda ids: iter([
+            ("P1", "A_HUMAN", "100", "MKV"),
+            ("P2", "B_HUMAN", "200", "MKV"),
+        ]),
+    )
+    merged = str(tmp_path / "merged.fasta")
+    lens, stats = merge.merge_streaming([path], merged)
+    assert list(lens) == [3, 3]
+    assert stats["duplicates"] == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "in.fasta",
+        "merged.fasta",
+    ]
+
+
+ENTRIES = {
+    "P1": ("A_HUMAN", "MIM:100", "MKVLAAGIVALLLA"),
+    "P2": ("B_HUMAN", "MIM:200 MIM:300", "MKVLAAGIVALLLA"),
+    "P3": ("C_HUMAN", "", "WYACDEFGHIK"),
+    "P4": ("D_HUMAN", "MIM:100", "PQRSTVW"),
+    "P5": ("E_HUMAN", "MIM:400", "PQRSTVW"),
+}
+
+
+def cached_entries(ids, **kwargs):
+    return {
+        acc: {
+            "accession": acc,
+            "entry_name": ENTRIES[acc][0],
+            "mims": ENTRIES[acc][1],
+            "sequence": ENTRIES[acc][2],
+        }
+        for acc in dict.fromkeys(ids)
+    }
+
+
+def test_in_memory_and_streaming_merges_agree(tmp_path, monkeypatch):
+    monkeypatch.setattr(disease.accession_cache, "get_entries", cached_entries)
+    files = [tmp_path / "a.fasta", tmp_path / "b.fasta"]
+    files[0].write_text(
+        ">sp|P1|A_HUMAN\nMKV\n>sp|P3|C_HUMAN\nW\n>other1 local\nWYACDEFGHIK\n"
+    )
+    files[1].write_text(
+        ">sp|P4|D_HUMAN\nP\n>sp|P2|B_HUMAN\nM\n>sp|P5|E_HUMAN\nP\n"
+        ">other2 local\nGGGGHHHH\n"
+    )
+    paths = [str(path) for path in files]
+
+    outputs = {}
+    for name, function in (
+        ("memory", merge.merge_in_memory),
+        ("streaming", merge.merge_streaming),
+    ):
+        merged = tmp_path / f"{name}.fasta"
+        lens, stats = function(paths, str(merged))
+        outputs[name] = (merged.read_text(), list(lens), stats)
+
+    assert outputs["memory"] == outputs["streaming"]
+    text = outputs["memory"][0]
+    assert ">P1|A_HUMAN MIM:100 MIM:200 MIM:300\n" in text
+    assert ">P4|D_HUMAN MIM:100 MIM:400\n" in text
+    assert outputs["memory"][2]["duplicates"] == 3
@@ -0,0 +1,60 @@
+import native_cluster
+import numpy as np
+import pytest
+from conftest import AMINO_ACIDS, random_seqs
+
+
+def families(n_families, n_copies, seed=0):
+    """Random sequences with point-mutated copies; family index per copy."""
+    rng = np.random.default_rng(seed)
+    seqs, family = [], []
+    for i, root in enumerate(random_seqs(n_families, 40, 80, seed=seed)):
+        for _ in range(n_copies):
+            residues = list(root)
+            for j in rng.choice(len(root), 3, replace=False):
+                residues[j] = rng.choice(list(AMINO_ACIDS))
+            seqs.append("".join(residues))
+            family.append(i)
+    order = rng.permutation(len(seqs))
+    return [seqs[i] for i in order], [family[i] for i in order]
+
+
+@pytest.mark.parametrize("threads", [1, 3])
+def test_families_form_one_cluster_each(threads):
+    seqs, family = families(10, 4)
+    seqs += ["MKVLA", "ACDEFGHIK"]  # below MIN_LENGTH, discarded
+    clusters = native_cluster.cluster_sequences(seqs, c=0.7, threads=threads)
+
+    assert len(clusters) == 10
+    members = [[m for m, _ in ms] for _, ms in clusters]
+    assert sorted(m for ms in members for m in ms) == list(range(40))
+    for rep, ms in clusters:
+        assert {family[m] for m, _ in ms} == {family[rep]}
+        assert len(seqs[rep]) == max(len(seqs[m]) for m, _ in ms)
+        assert all(identity >= 0.7 for _, identity in ms)
+
+
+def test_identity_of_a_sequence_with_itself_is_one():
+    codes = native_cluster.encode(random_seqs(1, 40, 41)[0])
+    identity = native_cluster.banded_identity(codes, [codes], np.array([0]))
+    assert identity[0] == pytest.approx(1.0)
+
+
+def test_output_round_trips_through_parse_clstr(tmp_path):
+    seqs, _ = families(5, 3, seed=1)
+    path = tmp_path / "in.fasta"
+    path.write_text("".join(f">S{i} x\n{s}\n" for i, s in enumerate(seqs)))
+    out = tmp_path / "out.fasta"
+    native_cluster.run(path, out, c=0.7)
+
+    clusters = native_cluster.cluster_sequences(seqs, c=0.7)
+    parsed = native_cluster.parse_clstr(f"{out}.clstr")
+    assert parsed == [
+        (f"S{rep}", [f"S{m}" for m, _ in sorted(ms)]) for rep, ms in clusters
+    ]
+    assert out.read_text().count(">") == len(clusters)
+
+
+def test_rejects_unsupported_word_length():
+    with pytest.raises(ValueError):
+        native_cluster.cluster_sequences(["M" * 20], n=4)
@@ -0,0 +1,57 @@
+import os
+
+import negatives
+import uniprot_client
+from conftest import uniprot_tsv
+
+LISTING = [
+    {"Entry": "P1", "Entry Name": "A_HUMAN", "Sequence": "MKTAYIAK"},
+    {
+        "Entry": "P2",
+        "Entry Name": "B_HUMAN",
+        "Sequence": "MSSHEGGK",
+        "Keyword ID": "KW-0325",
+    },
+    {
+        "Entry": "P3",
+        "Entry Name": "C_HUMAN",
+        "Sequence": "MDDLLQRR",
+        "Keyword ID": "KW-0007; KW-0488",
+    },
+]
+
+
+def test_dirs_follow_keywords():
+    assert [os.path.basename(d) for d in negatives.DIRS] == list(
+        negatives.KEYWORDS
+    )
+
+
+def test_listing_fills_cache_and_partitions_once(
+    tmp_path, monkeypatch, stub_server
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(uniprot_client, "STREAM_URL", stub_server.url)
+    monkeypatch.setattr(uniprot_client, "_session", None)
+    stub_server.respond = lambda params: (
+        200,
+        uniprot_tsv(LISTING, extra=("Keyword ID",)),
+    )
+    os.makedirs(negatives.NO_PTM_DIR)
+
+    files = [f"no_{ptm}.fasta" for ptm in negatives.KEYWORDS]
+    negatives.swiss_prot(files)
+
+    assert len(stub_server.requests) == 1
+    written = {}
+    for name in files:
+        with open(os.path.join(negatives.NO_PTM_DIR, name)) as f:
+            written[name] = [
+                line.split("|")[1] for line in f if line.startswith(">")
+            ]
+    assert written == {
+        "no_glycosylation.fasta": ["P1", "P3"],
+        "no_s_nitrosylation.fasta": ["P1", "P2", "P3"],
+        "no_acetylation.fasta": ["P1", "P2"],
+        "no_methylation.fasta": ["P1", "P2"],
+    }
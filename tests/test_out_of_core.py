@@ -0,0 +1,49 @@
+import feature_store
+import numpy as np
+import pytest
+import rfc_with_cv
+
+
+@pytest.fixture
+def chunked(tmp_path):
+    """A chunked store with rows in shuffled order and one single-class chunk."""
+    rng = np.random.default_rng(0)
+    y = np.array([0, 1] * 60)
+    X = rng.random((120, 6)).astype(np.float32)
+    X[:, 0] += y
+    # Chunk 0 holds only negatives, the others a shuffled mix.
+    negatives = np.flatnonzero(y == 0)
+    first = negatives[:20]
+    rest = rng.permutation(np.setdiff1d(np.arange(120), first))
+    parts = [first, *np.array_split(rest, 3)]
+    directory = str(tmp_path / "store")
+    chunks = [
+        feature_store.write_chunk(directory, number, X[rows], rows)
+        for number, rows in enumerate(parts)
+    ]
+    feature_store.save_chunked(directory, [f"f{i}" for i in range(6)], chunks)
+    return directory, X, y
+
+
+@pytest.mark.parametrize("n_trees", [1, 10, 11])
+def test_forest_has_exactly_n_trees(chunked, n_trees):
+    store, _, y = chunked
+    rfc = rfc_with_cv.fit_out_of_core(
+        store, y, np.arange(100), n_jobs=1, n_trees=n_trees
+    )
+    assert len(rfc.estimators_) == n_trees
+
+
+def test_predictions_follow_test_index_order(chunked):
+    store, X, y = chunked
+    test_index = np.array([110, 3, 57, 100, 0, 119, 64])
+    train_index = np.setdiff1d(np.arange(120), test_index)
+    rfc = rfc_with_cv.fit_out_of_core(store, y, train_index, n_jobs=1)
+    probas = rfc_with_cv.predict_proba_out_of_core(rfc, store, test_index)
+    np.testing.assert_allclose(probas, rfc.predict_proba(X[test_index]))
+
+
+def test_single_class_training_rows_are_rejected(chunked):
+    store, _, y = chunked
+    with pytest.raises(ValueError):
+        rfc_with_cv.fit_out_of_core(store, y, np.flatnonzero(y == 0))
@@ -0,0 +1,36 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import progress
+
+
+def report(counters, key, n):
+    """Increment a counter one step at a time from a worker process."""
+    for _ in range(n):
+        counters.put((key, 1))
+    progress.flush(counters)
+    return n
+
+
+def test_workers_add_to_shared_counters(capsys):
+    counters = progress.start({"a/encode": 300, "b/encode": 200})
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        jobs = [("a/encode", 100)] * 3 + [("b/encode", 50)] * 4
+        list(executor.map(report, [counters] * 7, *zip(*jobs)))
+    assert counters.values() == {"a/encode": 300, "b/encode": 200}
+    counters.close()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert "a/encode: 300/300 (100.0%)" in lines
+    assert "b/encode: 200/200 (100.0%)" in lines
+
+
+def test_log_lines_only_print_changes(capsys):
+    logged = {}
+    totals = {"a": 4, "b": 2}
+    progress.log_lines({"a": 1, "b": 0}, totals, logged)
+    progress.log_lines({"a": 1, "b": 2}, totals, logged)
+    assert capsys.readouterr().out.splitlines() == [
+        "a: 1/4 (25.0%)",
+        "b: 0/2 (0.0%)",
+        "b: 2/2 (100.0%)",
+    ]
@@ -0,0 +1,63 @@
+import batch_encoder
+import feature_store
+import ican_memo
+import numpy as np
+import pytest
+import shared_encoding
+from conftest import random_seqs, write_fasta
+
+
+@pytest.fixture
+def ptm_files(tmp_path, monkeypatch, residue_table):
+    """Two PTM datasets sharing sequences, encoded through the residue table."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ican_memo, "load_table", lambda: residue_table)
+    monkeypatch.setattr(
+        ican_memo,
+        "feature_names",
+        lambda n: [f"f{i}" for i in range(n * batch_encoder.N_ATOMS)],
+    )
+    seqs = random_seqs(30)
+    a, b = seqs[:20], seqs[10:] + seqs[:3]
+    return {
+        write_fasta(tmp_path / "a.fasta", a): a,
+        write_fasta(tmp_path / "b.fasta", b): b,
+    }
+
+
+@pytest.mark.parametrize("chunk_rows", [None, 1, 4])
+def test_ptm_store_matches_direct_encoding(
+    ptm_files, residue_table, chunk_rows
+):
+    unique, index = shared_encoding.collect(list(ptm_files))
+    store = shared_encoding.encode_unique(
+        unique, None, directory="encoding", chunk_seqs=7
+    )
+    assert feature_store.n_chunks(store) == 5
+
+    for path, seqs in ptm_files.items():
+        expected = batch_encoder.encode_batch(seqs, residue_table)
+        chunk_mb = None
+        if chunk_rows is not None:
+            chunk_mb = chunk_rows * expected.shape[1] * 4 / 2**20
+        directory = shared_encoding.ptm_store(
+            store, index[path], unique, path + "_store", chunk_mb=chunk_mb
+        )
+        X, names = feature_store.load(directory)
+        if chunk_rows is None:
+            assert feature_store.n_chunks(directory) == 1
+        else:
+            chunks = feature_store.read_meta(directory)["chunks"]
+            assert max(chunk["rows"] for chunk in chunks) <= chunk_rows
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        np.testing.assert_allclose(X, expected, rtol=1e-6)
+        assert names == [f"f{i}" for i in range(expected.shape[1])]
+
+
+def test_store_is_reused_until_sequences_change(ptm_files):
+    unique, _ = shared_encoding.collect(list(ptm_files))
+    shared_encoding.encode_unique(unique, None, directory="encoding")
+    assert shared_encoding.is_encoded(unique, "encoding")
+    assert not shared_encoding.is_encoded(unique[::-1], "encoding")
+    assert len(shared_encoding._fingerprint(unique)) == 64
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import splits
+from sklearn.model_selection import RepeatedStratifiedKFold
+
+
+@pytest.fixture
+def labels():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 2, 90), rng.integers(0, 25, 90)
+
+
+def test_folds_match_repeated_stratified_kfold(labels):
+    y, _ = labels
+    folds = splits.make_splits(y, n_splits=5, n_repeats=3, seed=7)
+    cv = RepeatedStratifiedKFold(n_splits=5, n_repeats=3, random_state=7)
+    expected = list(cv.split(np.zeros(len(y)), y))
+    assert len(folds) == len(expected)
+    for (train, test), (train_ref, test_ref) in zip(folds, expected):
+        np.testing.assert_array_equal(train, train_ref)
+        np.testing.assert_array_equal(test, test_ref)
+
+
+@pytest.mark.parametrize("grouped", [False, True])
+def test_cached_folds_partition_rows(tmp_path, labels, grouped):
+    y, groups = labels
+    groups = groups if grouped else None
+    folds = splits.get_splits(str(tmp_path), y, groups, n_repeats=2)
+    assert len(folds) == 10
+    for repeat in range(2):
+        tests = [test for _, test in folds[repeat * 5 : (repeat + 1) * 5]]
+        np.testing.assert_array_equal(
+            np.sort(np.concatenate(tests)), np.arange(len(y))
+        )
+    for train, test in folds:
+        assert train.dtype == test.dtype == np.int32
+        assert not np.intersect1d(train, test).size
+        assert len(train) + len(test) == len(y)
+        if grouped:
+            assert not np.intersect1d(groups[train], groups[test]).size
+
+    # The second call memory-maps the stored folds.
+    cached = splits.get_splits(str(tmp_path), y, groups, n_repeats=2)
+    assert isinstance(cached[0][0], np.memmap)
+    for (train, test), (train_c, test_c) in zip(folds, cached):
+        np.testing.assert_array_equal(train, train_c)
+        np.testing.assert_array_equal(test, test_c)
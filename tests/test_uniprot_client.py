@@ -0,0 +1,42 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import uniprot_client
+
+
+def fetch_batches(url):
+    """Fetch as many batches at once as one process is allowed to."""
+    params = [{"query": str(i)} for i in range(uniprot_client.MAX_WORKERS)]
+    session = uniprot_client.make_session(backoff=0)
+    return [
+        response.status_code
+        for _, response in uniprot_client.fetch_ordered(
+            params, url=url, session=session
+        )
+    ]
+
+
+def test_process_pool_shares_the_host_limit(stub_server):
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def respond(params):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.2)
+        with lock:
+            active[0] -= 1
+        return 200, ""
+
+    stub_server.respond = respond
+    with ProcessPoolExecutor(
+        max_workers=3,
+        initializer=uniprot_client.use_host_slots,
+        initargs=(uniprot_client.shared_host_slots([stub_server.url]),),
+    ) as executor:
+        results = list(executor.map(fetch_batches, [stub_server.url] * 3))
+
+    assert results == [[200] * uniprot_client.MAX_WORKERS] * 3
+    assert active[1] == uniprot_client.HOST_CONNECTIONS